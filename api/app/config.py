@@ -25,4 +25,92 @@ class Settings:
     AWS_ACCESS_KEY_ID: str = os.getenv("AWS_ACCESS_KEY_ID")
     AWS_SECRET_ACCESS_KEY: str = os.getenv("AWS_SECRET_ACCESS_KEY")
 
+    S3_MAX_POOL_CONNECTIONS: int = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+
+    # Database pool (per worker process)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+    # Startup warm-up: pre-open pool connections and load ANN index pages
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_POOL_CONNECTIONS: int = int(os.getenv("WARMUP_POOL_CONNECTIONS", "4"))
+    WARMUP_PREWARM_INDEXES: bool = os.getenv("WARMUP_PREWARM_INDEXES", "true").lower() == "true"
+    WARMUP_TIMEOUT_S: float = float(os.getenv("WARMUP_TIMEOUT_S", "15"))
+
+    # Vector search: size of the ANN candidate set that grouped (per-article)
+    # chunk search ranks from, and the hnsw.ef_search ceiling (pgvector caps
+    # ef_search at 1000; HNSW never returns more than ef_search rows).
+    VECTOR_SEARCH_CANDIDATES: int = int(os.getenv("VECTOR_SEARCH_CANDIDATES", "200"))
+    HNSW_EF_SEARCH_MAX: int = int(os.getenv("HNSW_EF_SEARCH_MAX", "1000"))
+
+    # Filtered vector search: filters matching at most this many rows are
+    # answered with an exact scan; larger ones use the ANN index with
+    # iterative scans (pgvector >= 0.8, "relaxed_order" | "strict_order" | "off")
+    # bounded by HNSW_MAX_SCAN_TUPLES.
+    VECTOR_SEARCH_EXACT_THRESHOLD: int = int(os.getenv("VECTOR_SEARCH_EXACT_THRESHOLD", "20000"))
+    HNSW_ITERATIVE_SCAN: str = os.getenv("HNSW_ITERATIVE_SCAN", "relaxed_order")
+    HNSW_MAX_SCAN_TUPLES: int = int(os.getenv("HNSW_MAX_SCAN_TUPLES", "20000"))
+
+    # Two-stage search for unfiltered queries: shortlist on a smaller HNSW
+    # index and re-rank on full precision. "halfvec" | "bit" (quantized,
+    # pgvector >= 0.7, schema version 0004), "short" (256-dimension
+    # embedding_short, schema version 0005) or "none" (full-precision index).
+    VECTOR_SEARCH_QUANTIZATION: str = os.getenv("VECTOR_SEARCH_QUANTIZATION", "none")
+    VECTOR_SEARCH_RERANK_CANDIDATES: int = int(os.getenv("VECTOR_SEARCH_RERANK_CANDIDATES", "400"))
+
+    # Search backend for unfiltered similarity queries: "pgvector" or "memory"
+    # (memory-mapped snapshots searched in-process, see core/vector_index.py).
+    VECTOR_SEARCH_BACKEND: str = os.getenv("VECTOR_SEARCH_BACKEND", "pgvector")
+    VECTOR_INDEX_DIR: str = os.getenv("VECTOR_INDEX_DIR", "/var/tmp/crypto_sentiment/vector_index")
+    VECTOR_INDEX_DTYPE: str = os.getenv("VECTOR_INDEX_DTYPE", "float32")
+    VECTOR_INDEX_REFRESH_S: float = float(os.getenv("VECTOR_INDEX_REFRESH_S", "60"))
+    VECTOR_INDEX_BATCH_SIZE: int = int(os.getenv("VECTOR_INDEX_BATCH_SIZE", "5000"))
+    VECTOR_INDEX_BLOCK_ROWS: int = int(os.getenv("VECTOR_INDEX_BLOCK_ROWS", "4096"))
+    VECTOR_INDEX_MAX_SEGMENTS: int = int(os.getenv("VECTOR_INDEX_MAX_SEGMENTS", "16"))
+
+    # Live feed (GET /feed/stream, see core/events.py). Each stream buffers up
+    # to LIVE_FEED_QUEUE_SIZE events before it is reset; keep-alive comments
+    # are sent every LIVE_FEED_HEARTBEAT_S seconds of silence.
+    LIVE_FEED_QUEUE_SIZE: int = int(os.getenv("LIVE_FEED_QUEUE_SIZE", "256"))
+    LIVE_FEED_HEARTBEAT_S: float = float(os.getenv("LIVE_FEED_HEARTBEAT_S", "15"))
+    LIVE_FEED_BATCH_SIZE: int = int(os.getenv("LIVE_FEED_BATCH_SIZE", "500"))
+
+    # Most ids accepted by the binary embedding batch endpoints.
+    EMBEDDING_BATCH_MAX_IDS: int = int(os.getenv("EMBEDDING_BATCH_MAX_IDS", "1000"))
+
+    # Response compression: "gzip", "brotli" (needs the optional brotli-asgi
+    # package, falls back to gzip) or "off". Responses smaller than
+    # RESPONSE_COMPRESSION_MIN_SIZE bytes and event streams are sent as is.
+    RESPONSE_COMPRESSION: str = os.getenv("RESPONSE_COMPRESSION", "gzip")
+    RESPONSE_COMPRESSION_MIN_SIZE: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1000"))
+    RESPONSE_COMPRESSION_LEVEL: int = int(os.getenv("RESPONSE_COMPRESSION_LEVEL", "5"))
+
+    # Abandoned searches (see core/cancellation.py). Search and similar
+    # handlers cap their statements at SEARCH_STATEMENT_TIMEOUT_MS (0 = no
+    # limit). GET requests whose path matches CANCEL_ON_DISCONNECT_PATHS are
+    # cancelled, together with their running queries, when the client
+    # disconnects before the response starts.
+    SEARCH_STATEMENT_TIMEOUT_MS: int = int(os.getenv("SEARCH_STATEMENT_TIMEOUT_MS", "10000"))
+    CANCEL_ON_DISCONNECT_PATHS: str = os.getenv(
+        "CANCEL_ON_DISCONNECT_PATHS",
+        r"^/(articles|article_chunks)/(search_by_similarity|search_by_chunk_similarity|\d+/similar)$",
+    )
+
+    # Rows fetched per server-side cursor round trip by the export endpoints.
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # Production server (app/serve.py)
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+
+    # Slow-query log (opt-in). Statements slower than the threshold are kept in
+    # an in-memory ring buffer (see /admin/slow_queries) and optionally appended
+    # to a local JSONL file.
+    SLOW_QUERY_LOG_ENABLED: bool = os.getenv("SLOW_QUERY_LOG_ENABLED", "false").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+    SLOW_QUERY_BUFFER_SIZE: int = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "200"))
+    SLOW_QUERY_EXPLAIN: bool = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+    SLOW_QUERY_LOG_PATH: str = os.getenv("SLOW_QUERY_LOG_PATH")
+
 settings = Settings()
@@ -0,0 +1,193 @@
+"""
+cancellation.py
+---------------
+Stops work nobody is waiting for: abandoned search requests and runaway
+queries.
+
+  - Statement timeout: the search handlers set a transaction-local
+    statement_timeout (SEARCH_STATEMENT_TIMEOUT_MS). A query that exceeds it
+    fails with SQLSTATE 57014, which is answered with a 503.
+
+  - Client disconnects: CancelOnDisconnect runs the handlers matching
+    CANCEL_ON_DISCONNECT_PATHS in their own task and listens for
+    http.disconnect until the response starts. If the client goes away first
+    (for example, the user typed a new query), the queries the request is
+    running on the server are cancelled, then the handler task, which also
+    aborts a pending embedding call. Cancelling the task alone is not
+    enough: through SQLAlchemy's asyncpg adapter, the statement keeps running
+    on the server after the coroutine is cancelled. Each pooled
+    connection's backend pid is therefore recorded while the request has it
+    checked out. On disconnect, pg_cancel_backend() is sent over a small
+    per-worker control connection, which takes no slot from the pool.
+
+Counters are served at GET /admin/cancellations.
+"""
+
+import asyncio
+import logging
+import re
+from contextvars import ContextVar
+from typing import Optional, Set
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+QUERY_CANCELED = "57014"
+
+stats = {
+    "disconnects": 0,             # handler tasks cancelled because the client left
+    "backend_cancels": 0,         # server-side queries cancelled on disconnect
+    "statement_timeouts": 0,      # queries stopped by statement_timeout
+}
+
+# Backend pids of the pooled connections the current request has checked out.
+_request_backends: ContextVar[Optional[Set[int]]] = ContextVar("request_backends", default=None)
+
+_control_conn = None
+_control_lock: Optional[asyncio.Lock] = None
+
+
+def track_backends(engine) -> None:
+    """
+    Records the backend pid of every connection checked out while a
+    CancelOnDisconnect request is running. Called when the engine is created.
+    """
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        backends = _request_backends.get()
+        if backends is not None:
+            pid = dbapi_connection.driver_connection.get_server_pid()
+            backends.add(pid)
+            connection_record.info["request_backend"] = (backends, pid)
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        entry = connection_record.info.pop("request_backend", None)
+        if entry is not None:
+            backends, pid = entry
+            backends.discard(pid)
+
+
+async def set_statement_timeout(db, timeout_ms: Optional[int] = None) -> None:
+    """
+    Caps every statement in the current transaction at `timeout_ms`
+    (default SEARCH_STATEMENT_TIMEOUT_MS; 0 disables).
+    """
+    timeout_ms = settings.SEARCH_STATEMENT_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    if timeout_ms > 0:
+        await db.execute(
+            text("SELECT set_config('statement_timeout', :value, true)"),
+            {"value": str(timeout_ms)},
+        )
+
+
+async def query_canceled_handler(request: Request, exc: DBAPIError):
+    """
+    Exception handler for DBAPIError: statement timeouts become 503s, and
+    anything else is re-raised as before.
+    """
+    if getattr(exc.orig, "sqlstate", None) != QUERY_CANCELED:
+        raise exc
+    stats["statement_timeouts"] += 1
+    logger.warning(f"Statement timeout on {request.url.path}")
+    return JSONResponse(status_code=503, content={"detail": "Query timed out, try a narrower search"})
+
+
+async def _cancel_backends(backends: Set[int]) -> None:
+    """
+    Cancels the queries running on a request's connections. `backends` is
+    the request's live set: a pid whose connection went back to the pool
+    meanwhile is skipped, since another request may be using it by now.
+    """
+    global _control_conn, _control_lock
+    import asyncpg
+
+    if _control_lock is None:
+        _control_lock = asyncio.Lock()
+    async with _control_lock:
+        for attempt in range(2):
+            try:
+                if _control_conn is None or _control_conn.is_closed():
+                    _control_conn = await asyncpg.connect(settings.DATABASE_URL)
+                for pid in sorted(backends):
+                    if pid in backends and await _control_conn.fetchval("SELECT pg_cancel_backend($1)", pid):
+                        stats["backend_cancels"] += 1
+                return
+            except Exception as e:
+                _control_conn = None
+                if attempt:
+                    logger.warning(f"Could not cancel backends {sorted(backends)}: {e!r}")
+
+
+async def close() -> None:
+    """Closes the control connection. Called on application shutdown."""
+    global _control_conn
+    if _control_conn is not None and not _control_conn.is_closed():
+        await _control_conn.close()
+    _control_conn = None
+
+
+class CancelOnDisconnect:
+    """
+    Pure ASGI middleware cancelling matching GET handlers (and their queries)
+    when the client disconnects before the response starts.
+    """
+
+    def __init__(self, app, paths: str) -> None:
+        self.app = app
+        self.paths = re.compile(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or not self.paths.match(scope["path"]):
+            return await self.app(scope, receive, send)
+
+        response_started = False
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        backends: Set[int] = set()
+        token = _request_backends.set(backends)
+        try:
+            # The handler task inherits the context (and so `backends`)
+            handler = asyncio.create_task(self.app(scope, receive, tracked_send))
+        finally:
+            _request_backends.reset(token)
+
+        async def watch_disconnect():
+            # GET handlers never read the body, so this is the only reader
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return True
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            done, _ = await asyncio.wait({handler, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if handler in done or response_started:
+                return await handler
+            stats["disconnects"] += 1
+            running = len(backends)
+            # Cancel the queries before the task: once cancelled, the handler
+            # returns its connections to the pool, where another request may
+            # pick one up and start a query on the same backend
+            if backends:
+                await _cancel_backends(backends)
+            handler.cancel()
+            try:
+                await handler
+            except (asyncio.CancelledError, Exception):
+                pass
+            logger.info(f"Client disconnected; cancelled {scope['path']} ({running} running queries)")
+        finally:
+            watcher.cancel()
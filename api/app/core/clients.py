@@ -0,0 +1,88 @@
+"""
+clients.py
+----------
+Lazily constructed, per-process clients for external services (OpenAI, S3).
+
+Nothing is built (or even imported) at import time: importing the app does not
+require credentials, open sockets or pay for loading the SDKs. Each client is
+created on first use and cached together with the PID of the process that
+built it, so a worker forked from a parent that already had clients builds its
+own instead of sharing the parent's connections.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+from ..config import settings
+
+_lock = threading.Lock()
+_clients: Dict[str, Tuple[int, Any]] = {}
+
+
+def _get_or_create(name: str, factory: Callable[[], Any]) -> Any:
+    pid = os.getpid()
+    entry = _clients.get(name)
+    if entry is not None and entry[0] == pid:
+        return entry[1]
+    with _lock:
+        entry = _clients.get(name)
+        if entry is None or entry[0] != pid:
+            entry = (pid, factory())
+            _clients[name] = entry
+    return entry[1]
+
+
+def set_client(name: str, client: Any) -> None:
+    """
+    Installs a client for the current process (used by tests and benchmarks to
+    swap in fakes). Valid names are "openai" and "s3".
+    """
+    with _lock:
+        _clients[name] = (os.getpid(), client)
+
+
+def _build_openai_client():
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+
+def _build_s3_client():
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        config=Config(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS),
+    )
+
+
+def get_openai_client():
+    """Returns the process-wide async OpenAI client."""
+    return _get_or_create("openai", _build_openai_client)
+
+
+def get_s3_client():
+    """Returns the process-wide boto3 S3 client (boto3 clients are thread-safe)."""
+    return _get_or_create("s3", _build_s3_client)
+
+
+def build_clients() -> None:
+    """Builds every client for this process (run off the event loop at startup)."""
+    get_openai_client()
+    get_s3_client()
+
+
+async def close_clients() -> None:
+    """Closes clients owned by this process. Called on application shutdown."""
+    pid = os.getpid()
+    with _lock:
+        owned = {name: client for name, (owner, client) in _clients.items() if owner == pid}
+        for name in owned:
+            _clients.pop(name, None)
+    openai_client = owned.get("openai")
+    if openai_client is not None and hasattr(openai_client, "close"):
+        await openai_client.close()
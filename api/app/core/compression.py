@@ -0,0 +1,56 @@
+"""
+compression.py
+--------------
+Response compression (RESPONSE_COMPRESSION). List and search pages are
+repetitive JSON and shrink several-fold with gzip, more with Brotli.
+
+Event streams are never compressed. The compressor buffers its output, which
+would hold server-sent events back until enough of them piled up. Requests
+for an event stream (Accept: text/event-stream, as EventSource sends) and
+paths under `exclude_prefixes` go straight to the app.
+"""
+
+import logging
+from typing import Sequence
+
+from starlette.middleware.gzip import GZipMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+def _build_compressor(app, mode: str, minimum_size: int, level: int):
+    if mode == "brotli":
+        try:
+            from brotli_asgi import BrotliMiddleware
+        except ImportError:
+            logger.warning("RESPONSE_COMPRESSION=brotli but brotli-asgi is not installed; using gzip.")
+        else:
+            # Falls back to gzip for clients that do not accept br
+            return BrotliMiddleware(app, quality=level, minimum_size=minimum_size, gzip_fallback=True)
+    return GZipMiddleware(app, minimum_size=minimum_size, compresslevel=level)
+
+
+class CompressionMiddleware:
+    """
+    Pure ASGI middleware compressing responses with gzip or Brotli, except
+    event streams.
+    """
+
+    def __init__(self, app, mode: str = "gzip", minimum_size: int = 1000, level: int = 5,
+                 exclude_prefixes: Sequence[str] = ()) -> None:
+        self.app = app
+        self.exclude_prefixes = tuple(exclude_prefixes)
+        self.compressed = _build_compressor(app, mode, minimum_size, level)
+
+    def _skip(self, scope) -> bool:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            return True
+        for name, value in scope["headers"]:
+            if name == b"accept" and b"text/event-stream" in value:
+                return True
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if self._skip(scope):
+            return await self.app(scope, receive, send)
+        await self.compressed(scope, receive, send)
@@ -0,0 +1,31 @@
+"""
+embeddings.py
+-------------
+Query embedding helper shared by the similarity search endpoints.
+"""
+
+import base64
+
+import numpy as np
+
+from .clients import get_openai_client
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+async def embed_query(text: str) -> np.ndarray:
+    """
+    Returns the embedding for a single query string as a float32 array. Uses
+    the async OpenAI client so the event loop is never blocked on the HTTP
+    round-trip.
+
+    The vector is requested base64-encoded and decoded straight into an array,
+    which is bound to queries in binary without becoming a list of floats.
+    """
+    response = await get_openai_client().embeddings.create(
+        input=text, model=EMBEDDING_MODEL, encoding_format="base64"
+    )
+    embedding = response.data[0].embedding
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+    return np.asarray(embedding, dtype=np.float32)
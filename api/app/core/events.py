@@ -0,0 +1,205 @@
+"""
+events.py
+---------
+Live feed of new articles and chunks, served at GET /feed/stream.
+
+Each worker keeps one dedicated asyncpg connection that LISTENs on the
+`article_events` channel. The notifications come from the insert triggers in
+scripts/schema/versions/0006 and carry only ids. Pending notifications are
+drained in batches, and the new rows are loaded with one query per table. Each
+event is then put on every subscriber's queue. Database load does not grow
+with the number of open dashboards.
+
+The listener starts with the first subscriber. If the connection drops, it
+reconnects with backoff. Notifications sent while it was disconnected are
+lost, so subscribers get a "reset" event and should reload their first page.
+A subscriber whose queue fills up (a stalled client) gets the same event
+rather than holding up the others.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "article_events"
+
+# Feed event names by source table.
+EVENT_TYPES = {"articles": "article", "article_chunks": "chunk"}
+
+
+class Subscriber:
+    """
+    One open stream. `types` limits which events it receives; "reset" is
+    always delivered.
+    """
+
+    def __init__(self, types: Iterable[str], queue_size: int):
+        self.types = set(types)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def reset(self) -> None:
+        """Drops anything queued and tells the client to reload."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(("reset", "{}"))
+
+
+class Broadcaster:
+    """
+    Fans events out to the subscribers of this worker. publish() never
+    blocks, and a full queue resets its subscriber.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers: Set[Subscriber] = set()
+        self.published = 0
+        self.resets = 0
+
+    def add(self, types: Iterable[str]) -> Subscriber:
+        subscriber = Subscriber(types, self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def remove(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    def publish(self, event: str, data: str) -> None:
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            if event not in subscriber.types:
+                continue
+            try:
+                subscriber.queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                self.resets += 1
+                subscriber.reset()
+
+    def reset_all(self) -> None:
+        for subscriber in list(self.subscribers):
+            subscriber.reset()
+
+
+broadcaster = Broadcaster(settings.LIVE_FEED_QUEUE_SIZE)
+_listener_task: Optional[asyncio.Task] = None
+
+
+def parse_notifications(payloads: List[str]) -> Dict[str, List[int]]:
+    """
+    Groups notification payloads into ids per table, in arrival order,
+    skipping duplicates and anything unrecognized.
+    """
+    ids: Dict[str, List[int]] = {table: [] for table in EVENT_TYPES}
+    for payload in payloads:
+        try:
+            message = json.loads(payload)
+            table_ids = ids[message["table"]]
+            row_id = int(message["id"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Ignoring malformed {CHANNEL} notification: {payload!r}")
+            continue
+        if row_id not in table_ids:
+            table_ids.append(row_id)
+    return ids
+
+
+async def load_events(ids: Dict[str, List[int]]) -> List[Tuple[str, str]]:
+    """
+    Loads the notified rows (one query per table) and renders them as
+    (event, JSON data) pairs. Articles come before chunks, since chunks are
+    written after their article. Rows deleted in the meantime are skipped.
+    """
+    from sqlalchemy import select
+
+    from ..database import AsyncSessionLocal
+    from ..models import Article, ArticleChunk
+    from ..schemas import ArticleChunkResponse, ArticleResponse
+
+    events = []
+    async with AsyncSessionLocal() as db:
+        for table, model, schema in (
+            ("articles", Article, ArticleResponse),
+            ("article_chunks", ArticleChunk, ArticleChunkResponse),
+        ):
+            if not ids.get(table):
+                continue
+            # Only the response columns, never the embeddings
+            columns = [getattr(model, field) for field in schema.__fields__ if hasattr(model, field)]
+            result = await db.execute(select(*columns).where(model.id.in_(ids[table])).order_by(model.id))
+            for row in result.all():
+                events.append((EVENT_TYPES[table], schema(**row._mapping).json()))
+    return events
+
+
+async def _listen() -> None:
+    import asyncpg
+
+    backoff = 1.0
+    first_connect = True
+    while True:
+        pending: asyncio.Queue = asyncio.Queue()
+        try:
+            conn = await asyncpg.connect(settings.DATABASE_URL)
+        except Exception as e:
+            logger.warning(f"Live feed: LISTEN connection failed ({e!r}); retrying in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+            continue
+        try:
+            # None wakes the dispatch loop when the connection goes away
+            conn.add_termination_listener(lambda _conn: pending.put_nowait(None))
+            await conn.add_listener(CHANNEL, lambda _conn, _pid, _channel, payload: pending.put_nowait(payload))
+            if not first_connect:
+                broadcaster.reset_all()
+            first_connect, backoff = False, 1.0
+            logger.info(f"Live feed: listening on {CHANNEL}")
+            while True:
+                payload = await pending.get()
+                if payload is None or conn.is_closed():
+                    break
+                payloads = [payload]
+                while not pending.empty() and len(payloads) < settings.LIVE_FEED_BATCH_SIZE:
+                    payloads.append(pending.get_nowait())
+                if None in payloads:
+                    break
+                try:
+                    for event, data in await load_events(parse_notifications(payloads)):
+                        broadcaster.publish(event, data)
+                except Exception as e:
+                    logger.warning(f"Live feed: loading {len(payloads)} events failed: {e!r}")
+                    broadcaster.reset_all()
+            logger.warning("Live feed: LISTEN connection lost; reconnecting")
+        finally:
+            if not conn.is_closed():
+                await conn.close()
+
+
+def subscribe(types: Iterable[str]) -> Subscriber:
+    """
+    Registers a stream, starting this worker's listener on first use.
+    """
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.create_task(_listen())
+    return broadcaster.add(types)
+
+
+def unsubscribe(subscriber: Subscriber) -> None:
+    broadcaster.remove(subscriber)
+
+
+async def stop() -> None:
+    """Stops the listener. Called on application shutdown."""
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+    _listener_task = None
@@ -0,0 +1,102 @@
+"""
+export.py
+---------
+Streams query results as NDJSON or CSV (the /articles/export and
+/article_chunks/export endpoints).
+
+A full export is one statement, read through a server-side cursor
+(`yield_per`) in batches of EXPORT_BATCH_SIZE rows. Each batch is encoded and
+sent before the next one is fetched. Memory stays constant, and a slow client
+slows the cursor down rather than piling rows up in the worker.
+
+Embeddings are selected as text. pgvector's text form ("[0.1,0.2,...]") is
+already a JSON array and a CSV field, so vectors are passed through without
+being parsed into floats and formatted again.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional
+
+from sqlalchemy import Text, cast, select
+
+from ..config import settings
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def response_fields(model, schema) -> List[str]:
+    """Fields of a response schema that are columns of `model`."""
+    return [field for field in schema.__fields__ if hasattr(model, field)]
+
+
+def export_columns(model, fields: List[str], include_embedding: bool) -> list:
+    """
+    The response columns of `model`, plus the embedding as text if requested.
+    """
+    columns = [getattr(model, field) for field in fields]
+    if include_embedding:
+        columns.append(cast(model.embedding, Text).label("embedding"))
+    return columns
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_ndjson(rows, fields: List[str], include_embedding: bool) -> str:
+    lines = []
+    for row in rows:
+        line = json.dumps(dict(zip(fields, row)), default=_json_default)
+        if include_embedding:
+            # Splice the vector text in as-is (it is a JSON array)
+            line = f'{line[:-1]}, "embedding": {row[-1] or "null"}}}'
+        lines.append(line)
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def encode_csv(rows, header: Optional[List[str]] = None) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(header)
+    writer.writerows(
+        [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row]
+        for row in rows
+    )
+    return buffer.getvalue()
+
+
+async def stream_export(stmt, fields: List[str], fmt: str, include_embedding: bool) -> AsyncIterator[str]:
+    """
+    Runs `stmt` on its own session and yields encoded batches. The session is
+    opened when the response starts streaming and closed when it ends, or
+    when the client disconnects and the generator is cancelled.
+    """
+    from ..database import AsyncSessionLocal
+
+    header = fields + (["embedding"] if include_embedding else [])
+    if fmt == "csv":
+        yield encode_csv([], header)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            if fmt == "csv":
+                yield encode_csv(rows)
+            else:
+                yield encode_ndjson(rows, fields, include_embedding)
+
+
+def export_statement(model, fields: List[str], conditions: list, include_embedding: bool):
+    """
+    SELECT of the export columns, filtered and ordered by primary key so
+    repeated exports come out in the same order.
+    """
+    stmt = select(*export_columns(model, fields, include_embedding))
+    if conditions:
+        stmt = stmt.where(*conditions)
+    return stmt.order_by(model.id)
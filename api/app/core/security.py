@@ -7,13 +7,18 @@ as password hashing and verification (if needed).
 
 import time
 from typing import Optional
-from jose import jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
 from passlib.context import CryptContext
 from ..config import settings
 
 # Create a password context for hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Bearer token scheme pointing at the login endpoint
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
 def create_access_token(data: dict, expires_delta: Optional[int] = None) -> str:
     """
     Creates a JWT access token with an optional expiration time in minutes.
@@ -38,3 +43,22 @@ def get_password_hash(password: str) -> str:
     Returns the bcrypt hash of the given password.
     """
     return pwd_context.hash(password)
+
+def get_current_user(token: str = Depends(oauth2_scheme)) -> str:
+    """
+    Dependency that decodes the bearer token and returns its subject.
+    Raises 401 if the token is missing, expired or invalid.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    username = payload.get("sub")
+    if username is None:
+        raise credentials_exception
+    return username
@@ -0,0 +1,236 @@
+"""
+slow_query.py
+-------------
+An opt-in slow-query recorder for the async SQLAlchemy engine.
+
+Every statement executed through the engine is timed with cursor events. When a
+statement takes longer than the configured threshold, an entry is recorded with
+the SQL text, the *shape* of its bound parameters (query vectors are reduced to
+their dimension so 1536 floats never end up in the log), the duration and,
+for read-only statements, an `EXPLAIN (ANALYZE, BUFFERS)` plan captured on a
+separate connection. Entries are kept in a ring buffer and can optionally be
+appended to a local JSONL file.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Execution option used to keep the recorder from timing its own EXPLAIN runs.
+SKIP_OPTION = "skip_slow_query_log"
+
+# Statements that are safe to re-run under EXPLAIN ANALYZE.
+_READ_ONLY_PREFIXES = ("SELECT", "WITH")
+_WRITE_KEYWORDS = ("INSERT ", "UPDATE ", "DELETE ", "MERGE ")
+
+
+def describe_parameter(value: Any) -> str:
+    """
+    Returns a short description of a bound parameter without its value.
+    Vectors (pgvector text literals, lists or arrays of floats) are reduced to
+    their dimension.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        if value.startswith("[") and value.endswith("]") and "," in value:
+            return f"vector({value.count(',') + 1})"
+        return f"str(len={len(value)})"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"bytes(len={len(value)})"
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(v, float) for v in value[:8]):
+            return f"vector({len(value)})"
+        return f"{type(value).__name__}(len={len(value)})"
+    shape = getattr(value, "shape", None)
+    if shape is not None:
+        return f"array{tuple(shape)}"
+    dimensions = getattr(value, "dimensions", None)
+    if callable(dimensions):
+        return f"vector({dimensions()})"
+    return type(value).__name__
+
+
+def describe_parameters(parameters: Any) -> Any:
+    """Applies `describe_parameter` to positional or named parameters."""
+    if parameters is None:
+        return []
+    if isinstance(parameters, dict):
+        return {key: describe_parameter(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [describe_parameter(value) for value in parameters]
+    return describe_parameter(parameters)
+
+
+def is_read_only(statement: str) -> bool:
+    """True if the statement can be re-executed under EXPLAIN ANALYZE safely."""
+    normalized = " ".join(statement.split()).upper()
+    if not normalized.startswith(_READ_ONLY_PREFIXES):
+        return False
+    return not any(keyword in normalized for keyword in _WRITE_KEYWORDS)
+
+
+class SlowQueryRecorder:
+    """
+    Records statements slower than `threshold_ms` into a ring buffer.
+
+    Attach it to an async engine with `attach(engine)`; entries are available
+    through `entries()`. EXPLAIN plans are captured asynchronously so the
+    request that triggered the slow query is not delayed further.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 500.0,
+        buffer_size: int = 200,
+        explain: bool = True,
+        log_path: Optional[str] = None,
+        explain_cooldown_s: float = 60.0,
+    ) -> None:
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.log_path = log_path
+        self.explain_cooldown_s = explain_cooldown_s
+        self._entries: deque = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        # statement -> when it was last explained, oldest first; bounded like the buffer
+        self._last_explained: OrderedDict[str, float] = OrderedDict()
+        self._explained_size = buffer_size
+        self._tasks: set = set()
+        self._engine: Optional[AsyncEngine] = None
+
+    # ------------------------------------------------------------------
+    # Engine wiring
+    # ------------------------------------------------------------------
+    def attach(self, engine: AsyncEngine) -> None:
+        """Registers cursor events on the engine's underlying sync engine."""
+        self._engine = engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine.sync_engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("slow_query_start")
+        if not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000.0
+        if duration_ms < self.threshold_ms:
+            return
+        if context is not None and context.execution_options.get(SKIP_OPTION):
+            return
+        self.record(statement, parameters, duration_ms, executemany=executemany)
+
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its start time.
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("slow_query_start"):
+            conn.info["slow_query_start"].pop()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def record(self, statement: str, parameters: Any, duration_ms: float, executemany: bool = False) -> dict:
+        """Adds an entry to the buffer and schedules plan capture if enabled."""
+        entry = {
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration_ms, 3),
+            "statement": statement,
+            "parameters": describe_parameters(parameters[0] if executemany and parameters else parameters),
+            "executemany": executemany,
+            "plan": None,
+        }
+        with self._lock:
+            self._entries.append(entry)
+
+        if self._should_explain(statement, executemany):
+            self._schedule_explain(entry, statement, parameters)
+        else:
+            self._write_line(entry)
+        logger.warning(f"Slow query ({entry['duration_ms']} ms): {' '.join(statement.split())[:200]}")
+        return entry
+
+    def entries(self, limit: Optional[int] = None) -> list[dict]:
+        """Returns recorded entries, newest first."""
+        with self._lock:
+            items = list(self._entries)
+        items.reverse()
+        return items[:limit] if limit else items
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    # ------------------------------------------------------------------
+    # EXPLAIN capture
+    # ------------------------------------------------------------------
+    def _should_explain(self, statement: str, executemany: bool) -> bool:
+        if not self.explain or executemany or self._engine is None or not is_read_only(statement):
+            return False
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_explained.get(statement)
+            if last is not None and now - last < self.explain_cooldown_s:
+                return False
+            self._last_explained[statement] = now
+            self._last_explained.move_to_end(statement)
+            # Drop statements whose cooldown is over, then the oldest beyond the cap
+            while self._last_explained:
+                oldest = next(iter(self._last_explained.values()))
+                if now - oldest < self.explain_cooldown_s and len(self._last_explained) <= self._explained_size:
+                    break
+                self._last_explained.popitem(last=False)
+        return True
+
+    def _schedule_explain(self, entry: dict, statement: str, parameters: Any) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_line(entry)
+            return
+        task = loop.create_task(self._explain(entry, statement, parameters))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _explain(self, entry: dict, statement: str, parameters: Any) -> None:
+        try:
+            async with self._engine.connect() as conn:
+                conn = await conn.execution_options(**{SKIP_OPTION: True})
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}",
+                    tuple(parameters) if isinstance(parameters, list) else parameters,
+                )
+                plan = result.scalar()
+                # The connection is rolled back on close, so nothing the
+                # statement touched is kept.
+            entry["plan"] = json.loads(plan) if isinstance(plan, str) else plan
+        except Exception as e:
+            entry["plan_error"] = str(e)
+            logger.error(f"Failed to capture EXPLAIN for slow query: {e}")
+        self._write_line(entry)
+
+    # ------------------------------------------------------------------
+    # JSONL output
+    # ------------------------------------------------------------------
+    def _write_line(self, entry: dict) -> None:
+        if not self.log_path:
+            return
+        try:
+            line = json.dumps(entry, default=str)
+            with self._file_lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.error(f"Failed to write slow query log to {self.log_path}: {e}")
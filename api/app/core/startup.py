@@ -0,0 +1,60 @@
+"""
+startup.py
+----------
+Cold-start bookkeeping for the current worker process: how long the app took
+to import, how long the lifespan warm-up took, and when the first successful
+response was sent. Exposed at /admin/startup.
+"""
+
+import os
+import time
+
+# Captured as early as possible: main.py imports this module before anything else.
+IMPORT_STARTED = time.perf_counter()
+
+stats = {
+    "pid": os.getpid(),
+    "import_s": None,
+    "lifespan_s": None,
+    "warmed_connections": 0,
+    "prewarmed_indexes": [],
+    "ready_s": None,
+    "first_response_s": None,
+}
+
+
+def mark_imported() -> None:
+    stats["import_s"] = round(time.perf_counter() - IMPORT_STARTED, 4)
+
+
+def mark_ready(lifespan_started: float) -> None:
+    now = time.perf_counter()
+    stats["lifespan_s"] = round(now - lifespan_started, 4)
+    stats["ready_s"] = round(now - IMPORT_STARTED, 4)
+
+
+class FirstResponseTimer:
+    """
+    Pure ASGI middleware recording the time from import to the first 2xx
+    response. After that it is a single attribute check per request.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self.done = False
+
+    async def __call__(self, scope, receive, send):
+        if self.done or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def timed_send(message):
+            if (
+                not self.done
+                and message["type"] == "http.response.start"
+                and 200 <= message["status"] < 300
+            ):
+                self.done = True
+                stats["first_response_s"] = round(time.perf_counter() - IMPORT_STARTED, 4)
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
@@ -0,0 +1,185 @@
+"""
+vector_codec.py
+---------------
+Compact encodings for returning embeddings to clients.
+
+A 1536-dimension embedding as a JSON array of floats is about 30 KB. The API
+offers two denser forms instead:
+
+  - base64 (`include_embedding=float32|float16` on the list, search and
+    similar endpoints): the vector's little-endian bytes in the
+    `embedding_b64` field. float32 is 8 KB of text per vector, float16 4 KB.
+    Decode with `np.frombuffer(base64.b64decode(s), "<f4")` (or "<f2").
+
+  - binary batches (GET /articles/embeddings, /article_chunks/embeddings):
+    an application/octet-stream body holding many vectors at once, laid out
+    so a client can read it without copying:
+
+        magic    4 bytes   b"VECB"
+        version  uint8     1
+        dtype    uint8     1 = float16, 2 = float32
+        reserved uint16
+        count    uint32
+        dim      uint32
+        ids      count x int64
+        vectors  count x dim x float16|float32
+
+    All integers and floats are little-endian. Requested ids without an
+    embedding are left out, so read the ids from the body.
+
+It also holds the binary codec for the `vector` type on the async engine.
+pgvector's SQLAlchemy type formats every bound vector as a text literal
+("[0.1,0.2,...]"), which Postgres then parses, and parses results back from
+text. register_vector_codec() instead makes asyncpg exchange vectors in
+pgvector's binary format (vector_send/vector_recv). BinaryVector columns pass
+values through to it: query vectors are bound straight from NumPy arrays
+(lists and pgvector Vectors also work), and embeddings come back as float32
+arrays. COPY (copy_records_to_table) uses the same codec.
+"""
+
+import base64
+import logging
+import struct
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import func, select
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAGIC = b"VECB"
+BATCH_VERSION = 1
+BATCH_MEDIA_TYPE = "application/octet-stream"
+
+# dtype name -> (code in the batch header, little-endian numpy dtype)
+DTYPES = {"float16": (1, "<f2"), "float32": (2, "<f4")}
+
+_BATCH_HEADER = struct.Struct("<4sBBHII")
+
+# pgvector's binary representation: int16 dimensions, int16 unused, then
+# big-endian float4 values
+_VECTOR_HEADER = struct.Struct(">HH")
+
+
+def encode_base64(embedding, dtype: str) -> Optional[str]:
+    """Base64 of the vector's little-endian `dtype` bytes (None stays None)."""
+    if embedding is None:
+        return None
+    return base64.b64encode(np.asarray(embedding, dtype=DTYPES[dtype][1]).tobytes()).decode("ascii")
+
+
+def decode_base64(data: str, dtype: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=DTYPES[dtype][1])
+
+
+def with_embedding(schema, row, dtype: Optional[str]):
+    """
+    `schema.from_orm(row)`, with `embedding_b64` filled in when `dtype` is
+    given. Endpoints offering include_embedding use
+    response_model_exclude_unset, so the field is omitted otherwise.
+    """
+    item = schema.from_orm(row)
+    if dtype:
+        item.embedding_b64 = encode_base64(row.embedding, dtype)
+    return item
+
+
+def from_vector_send(raw: bytes) -> np.ndarray:
+    """
+    Decodes pgvector's binary representation (what `vector_send(embedding)`
+    returns): int16 dimensions, int16 unused, then big-endian float4 values.
+    """
+    return np.frombuffer(raw, dtype=">f4", offset=4)
+
+
+def to_vector_binary(value) -> bytes:
+    """
+    Encodes a vector (NumPy array, list of floats, pgvector Vector or text
+    literal) in pgvector's binary representation.
+    """
+    if isinstance(value, str):
+        value = value.strip("[]").split(",")
+    elif hasattr(value, "to_numpy"):
+        value = value.to_numpy()
+    array = np.asarray(value, dtype=">f4")
+    if array.ndim != 1:
+        raise ValueError(f"Expected a 1-dimensional vector, got shape {array.shape}")
+    return _VECTOR_HEADER.pack(len(array), 0) + array.tobytes()
+
+
+def from_vector_binary(raw: bytes) -> np.ndarray:
+    """Decodes pgvector's binary representation into a native float32 array."""
+    return from_vector_send(raw).astype(np.float32)
+
+
+async def register_vector_codec(conn) -> None:
+    """
+    Makes an asyncpg connection send and receive `vector` values in binary.
+    Does nothing (with a warning) if the extension is not installed yet.
+    """
+    try:
+        await conn.set_type_codec(
+            "vector",
+            schema="public",
+            encoder=to_vector_binary,
+            decoder=from_vector_binary,
+            format="binary",
+        )
+    except ValueError as e:
+        logger.warning(f"Binary vector codec not registered: {e}")
+
+
+class BinaryVector(Vector):
+    """
+    pgvector column type for connections with register_vector_codec(): values
+    are handed to the driver as they are instead of being formatted as text,
+    and results are the float32 arrays the codec returns.
+    """
+
+    cache_ok = True
+
+    def bind_processor(self, dialect):
+        return None
+
+    def result_processor(self, dialect, coltype):
+        return None
+
+
+def encode_batch(ids: Iterable[int], vectors: np.ndarray, dtype: str) -> bytes:
+    """Packs ids and a (count x dim) matrix into the binary batch format."""
+    code, np_dtype = DTYPES[dtype]
+    ids = np.asarray(list(ids), dtype="<i8")
+    if len(ids):
+        vectors = np.asarray(vectors, dtype=np_dtype).reshape(len(ids), -1)
+    else:
+        vectors = np.empty((0, 0), dtype=np_dtype)
+    header = _BATCH_HEADER.pack(BATCH_MAGIC, BATCH_VERSION, code, 0, len(ids), vectors.shape[1])
+    return header + ids.tobytes() + vectors.tobytes()
+
+
+def decode_batch(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Reads a binary batch back into (ids, vectors) without copying."""
+    magic, version, code, _, count, dim = _BATCH_HEADER.unpack_from(data)
+    if magic != BATCH_MAGIC or version != BATCH_VERSION:
+        raise ValueError("Not a vector batch")
+    np_dtype = next(d for c, d in DTYPES.values() if c == code)
+    offset = _BATCH_HEADER.size
+    ids = np.frombuffer(data, dtype="<i8", count=count, offset=offset)
+    vectors = np.frombuffer(data, dtype=np_dtype, count=count * dim, offset=offset + 8 * count)
+    return ids, vectors.reshape(count, dim)
+
+
+async def load_batch(db, model, ids: List[int], dtype: str) -> bytes:
+    """
+    Loads the embeddings of `ids` (in request order, duplicates dropped) as a
+    binary batch. The vectors are selected with vector_send(), so they arrive
+    in binary and are never parsed from text.
+    """
+    stmt = select(model.id, func.vector_send(model.embedding)).where(
+        model.id.in_(ids), model.embedding.is_not(None)
+    )
+    found = dict((await db.execute(stmt)).all())
+    ordered = [i for i in dict.fromkeys(ids) if i in found]
+    vectors = np.stack([from_vector_send(found[i]) for i in ordered]) if ordered else np.empty((0, 0))
+    return encode_batch(ordered, vectors, dtype)
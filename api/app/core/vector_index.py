@@ -0,0 +1,419 @@
+"""
+vector_index.py
+---------------
+Optional in-process vector search engine (VECTOR_SEARCH_BACKEND=memory).
+
+Embeddings of `articles` and `article_chunks` are snapshotted to disk as
+immutable, L2-normalized .npy segments plus an int64 id array per segment,
+described by a manifest.json per table. float32 (the default) is searched
+directly by BLAS; float16 halves the memory but every query widens the
+blocks to float32, which is several times slower.
+
+    <VECTOR_INDEX_DIR>/<table>/manifest.json
+    <VECTOR_INDEX_DIR>/<table>/seg_000001.vectors.npy
+    <VECTOR_INDEX_DIR>/<table>/seg_000001.ids.npy
+
+Workers memory-map the segments read-only, so every uvicorn worker on the host
+shares the same page-cache copy. A top-k cosine query is a blocked
+matrix-vector product per segment with argpartition keeping the best k of each
+block; Postgres then only hydrates the winning rows.
+
+Snapshots are refreshed incrementally: rows with an id above the manifest's
+watermark are appended as a new segment, and rows at or below it that were
+embedded after the watermark moved past them (the embedding job does not run in
+id order) are found by diffing their ids against the snapshot's. One worker at a time refreshes
+(guarded by an flock on <table>/.lock); the others reload the manifest when its
+version changes. Segments are merged once there are more than
+VECTOR_INDEX_MAX_SEGMENTS. Rows deleted in Postgres drop out at hydration;
+re-embedded rows are only picked up by a rebuild (delete the table's directory).
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+LOCK = ".lock"
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(vectors: np.ndarray, ids: np.ndarray, query: np.ndarray, k: int, block_rows: int):
+    """
+    Returns (ids, scores) of the k rows of `vectors` with the highest dot
+    product with `query`, best first. Rows are processed in blocks so a
+    float16 matrix is only ever widened to float32 one block at a time.
+    """
+    candidate_ids, candidate_scores = [], []
+    for start in range(0, len(ids), block_rows):
+        block = vectors[start:start + block_rows]
+        if block.dtype != np.float32:
+            block = block.astype(np.float32)
+        scores = block @ query
+        if len(scores) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+            candidate_ids.append(ids[start:start + block_rows][best])
+            candidate_scores.append(scores[best])
+        else:
+            candidate_ids.append(np.asarray(ids[start:start + block_rows]))
+            candidate_scores.append(scores)
+    if not candidate_ids:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    all_ids = np.concatenate(candidate_ids)
+    all_scores = np.concatenate(candidate_scores)
+    order = np.argsort(-all_scores, kind="stable")[:k]
+    return all_ids[order], all_scores[order]
+
+
+class VectorSnapshot:
+    """
+    A memory-mapped snapshot of one table's embeddings.
+    """
+
+    def __init__(self, root: str, table: str, dtype: str = "float32", block_rows: int = 4096):
+        self.table = table
+        self.path = os.path.join(root, table)
+        self.dtype = np.dtype(dtype)
+        self.block_rows = block_rows
+        self.manifest: Optional[dict] = None
+        self.segments: List[Tuple[np.ndarray, np.ndarray]] = []
+
+    # --------------------------------------------------------------------------
+    # Reading
+    # --------------------------------------------------------------------------
+    @property
+    def size(self) -> int:
+        return self.manifest["rows"] if self.manifest else 0
+
+    @property
+    def watermark(self) -> int:
+        return self.manifest["watermark"] if self.manifest else 0
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        if manifest.get("dtype") != self.dtype.name:
+            # Written with another VECTOR_INDEX_DTYPE: ignore it and rebuild.
+            return None
+        return manifest
+
+    def load(self) -> bool:
+        """
+        (Re)maps the segments if the manifest changed. Returns True if it did.
+        """
+        manifest = self._read_manifest()
+        if manifest is None or (self.manifest and manifest["version"] == self.manifest["version"]):
+            return False
+        segments = []
+        for segment in manifest["segments"]:
+            base = os.path.join(self.path, segment["name"])
+            segments.append((
+                np.load(base + ".ids.npy", mmap_mode="r"),
+                np.load(base + ".vectors.npy", mmap_mode="r"),
+            ))
+        self.manifest, self.segments = manifest, segments
+        return True
+
+    def missing(self, embedded_ids: np.ndarray) -> np.ndarray:
+        """
+        Returns the ids in `embedded_ids` that are not in the snapshot, ascending.
+        """
+        indexed = [ids for ids, _ in self.segments]
+        if not indexed:
+            return np.unique(np.asarray(embedded_ids, dtype=np.int64))
+        return np.setdiff1d(np.asarray(embedded_ids, dtype=np.int64), np.concatenate(indexed))
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """
+        Returns up to k (id, cosine distance) pairs, nearest first.
+        """
+        if k <= 0 or not self.segments:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        segments = self.segments  # a reload swaps the list, never mutates it
+        results = [top_k(vectors, ids, query, k, self.block_rows) for ids, vectors in segments]
+        ids = np.concatenate([r[0] for r in results])
+        scores = np.concatenate([r[1] for r in results])
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(int(i), float(1.0 - s)) for i, s in zip(ids[order], scores[order])]
+
+    # --------------------------------------------------------------------------
+    # Writing (only while holding the table lock)
+    # --------------------------------------------------------------------------
+    def _write_array(self, name: str, array: np.ndarray) -> None:
+        final = os.path.join(self.path, name)
+        tmp = final + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, final)
+
+    def _write_manifest(self, segments: List[dict], watermark: int, dim: int) -> None:
+        # Unique across rebuilds, so a reader never mistakes a fresh manifest
+        # for the one it already has mapped.
+        version = max(time.time_ns(), (self.manifest["version"] if self.manifest else 0) + 1)
+        manifest = {
+            "table": self.table,
+            "dtype": self.dtype.name,
+            "dim": dim,
+            "rows": sum(s["rows"] for s in segments),
+            "watermark": watermark,
+            "segments": segments,
+            "version": version,
+            "updated_at": time.time(),
+        }
+        tmp = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+
+    def _next_segment_name(self) -> str:
+        names = [s["name"] for s in self.manifest["segments"]] if self.manifest else []
+        number = max((int(n.split("_")[1]) for n in names), default=0) + 1
+        return f"seg_{number:06d}"
+
+    def append(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Writes a new segment and publishes it. `ids` must be ascending; the
+        watermark never moves back, so late-embedded rows below it can be
+        appended too.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        name = self._next_segment_name()
+        self._write_array(name + ".ids.npy", np.asarray(ids, dtype=np.int64))
+        self._write_array(name + ".vectors.npy", normalize_rows(np.asarray(vectors, dtype=np.float32)).astype(self.dtype))
+        segments = (self.manifest["segments"] if self.manifest else []) + [{"name": name, "rows": len(ids)}]
+        self._write_manifest(segments, max(int(ids[-1]), self.watermark), int(vectors.shape[1]))
+        self.load()
+
+    def compact(self) -> None:
+        """
+        Merges all segments into one. Old files are unlinked; workers that still
+        map them keep reading them until they reload.
+        """
+        if not self.manifest or len(self.manifest["segments"]) < 2:
+            return
+        old = [s["name"] for s in self.manifest["segments"]]
+        name = self._next_segment_name()
+        self._write_array(name + ".ids.npy", np.concatenate([ids for ids, _ in self.segments]))
+        self._write_array(name + ".vectors.npy", np.concatenate([vectors for _, vectors in self.segments]))
+        self._write_manifest([{"name": name, "rows": self.size}], self.watermark, self.manifest["dim"])
+        self.load()
+        for segment in old:
+            for suffix in (".ids.npy", ".vectors.npy"):
+                try:
+                    os.unlink(os.path.join(self.path, segment + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def try_lock(self):
+        """
+        Returns an open, exclusively locked file if no other process is
+        refreshing this table, otherwise None.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        lock = open(os.path.join(self.path, LOCK), "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+        return lock
+
+
+# ------------------------------------------------------------------------------
+# Per-process engine
+# ------------------------------------------------------------------------------
+_snapshots: Dict[str, VectorSnapshot] = {}
+_refresh_task: Optional[asyncio.Task] = None
+
+
+def _models():
+    from ..models import Article, ArticleChunk
+
+    return {"articles": Article, "article_chunks": ArticleChunk}
+
+
+def enabled() -> bool:
+    return settings.VECTOR_SEARCH_BACKEND == "memory"
+
+
+async def _embedded_above(db, model, watermark: int, limit: int) -> list:
+    from sqlalchemy import select
+
+    stmt = (
+        select(model.id, model.embedding)
+        .where(model.id > watermark, model.embedding.is_not(None))
+        .order_by(model.id)
+        .limit(limit)
+    )
+    return (await db.execute(stmt)).all()
+
+
+async def _embedded_ids(db, model, watermark: int) -> np.ndarray:
+    from sqlalchemy import select
+
+    stmt = select(model.id).where(model.id <= watermark, model.embedding.is_not(None))
+    return np.fromiter((await db.execute(stmt)).scalars(), dtype=np.int64)
+
+
+async def _embedded_rows(db, model, ids: List[int]) -> list:
+    from sqlalchemy import select
+
+    stmt = (
+        select(model.id, model.embedding)
+        .where(model.id.in_(ids), model.embedding.is_not(None))
+        .order_by(model.id)
+    )
+    return (await db.execute(stmt)).all()
+
+
+async def _append_rows(snapshot: VectorSnapshot, rows: list) -> None:
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    vectors = np.stack([np.asarray(row[1], dtype=np.float32) for row in rows])
+    await asyncio.to_thread(snapshot.append, ids, vectors)
+
+
+async def refresh(snapshot: VectorSnapshot, model, batch_size: int) -> int:
+    """
+    Appends rows above the snapshot's watermark, then any rows below it that
+    were embedded since they were passed over. If another worker holds the
+    table lock, just picks up its latest manifest. Returns rows appended.
+    """
+    lock = snapshot.try_lock()
+    if lock is None:
+        snapshot.load()
+        return 0
+    try:
+        from ..database import AsyncSessionLocal
+
+        snapshot.load()
+        added, watermark = 0, snapshot.watermark
+        async with AsyncSessionLocal() as db:
+            while True:
+                rows = await _embedded_above(db, model, watermark, batch_size)
+                if not rows:
+                    break
+                await _append_rows(snapshot, rows)
+                added += len(rows)
+                watermark = int(rows[-1][0])
+            missing = snapshot.missing(await _embedded_ids(db, model, watermark))
+            for start in range(0, len(missing), batch_size):
+                rows = await _embedded_rows(db, model, missing[start:start + batch_size].tolist())
+                if rows:
+                    await _append_rows(snapshot, rows)
+                    added += len(rows)
+        if snapshot.manifest and len(snapshot.manifest["segments"]) > settings.VECTOR_INDEX_MAX_SEGMENTS:
+            await asyncio.to_thread(snapshot.compact)
+        return added
+    finally:
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+
+
+async def _refresh_loop() -> None:
+    models = _models()
+    while True:
+        for table, snapshot in _snapshots.items():
+            try:
+                added = await refresh(snapshot, models[table], settings.VECTOR_INDEX_BATCH_SIZE)
+                if added:
+                    logger.info(f"Vector index {table}: appended {added} rows ({snapshot.size} total)")
+            except Exception as e:
+                logger.warning(f"Vector index refresh for {table} failed: {e!r}")
+        await asyncio.sleep(settings.VECTOR_INDEX_REFRESH_S)
+
+
+def start() -> None:
+    """
+    Maps the existing snapshots and starts the refresh loop for this worker.
+    Called from the application lifespan when the memory backend is enabled.
+    """
+    global _refresh_task
+    for table in _models():
+        snapshot = VectorSnapshot(
+            settings.VECTOR_INDEX_DIR,
+            table,
+            dtype=settings.VECTOR_INDEX_DTYPE,
+            block_rows=settings.VECTOR_INDEX_BLOCK_ROWS,
+        )
+        snapshot.load()
+        _snapshots[table] = snapshot
+    _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+async def stop() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
+    _refresh_task = None
+    _snapshots.clear()
+
+
+def size(table: str) -> int:
+    snapshot = _snapshots.get(table)
+    return snapshot.size if snapshot else 0
+
+
+async def search(table: str, query_embedding, k: int) -> Optional[List[Tuple[int, float]]]:
+    """
+    Top-k (id, cosine distance) pairs from the in-process index, or None when
+    the memory backend is disabled or the table has no snapshot yet (callers
+    then fall back to pgvector).
+    """
+    snapshot = _snapshots.get(table)
+    if not enabled() or snapshot is None or snapshot.size == 0:
+        return None
+    # NumPy releases the GIL in the matrix products
+    return await asyncio.to_thread(snapshot.search, np.asarray(query_embedding, dtype=np.float32), k)
+
+
+async def hydrate(db, model, matches: List[Tuple[int, float]]) -> list:
+    """
+    Loads the rows for `matches` in one query and returns (row, distance) pairs
+    in match order. Rows deleted since the snapshot are dropped.
+    """
+    if not matches:
+        return []
+    from sqlalchemy import select
+
+    result = await db.execute(select(model).where(model.id.in_([i for i, _ in matches])))
+    rows = {row.id: row for row in result.scalars().all()}
+    return [(rows[i], distance) for i, distance in matches if i in rows]
+
+
+def stats() -> dict:
+    return {
+        "enabled": enabled(),
+        "tables": {
+            table: {
+                "rows": snapshot.size,
+                "watermark": snapshot.watermark,
+                "segments": len(snapshot.segments),
+                "version": snapshot.manifest["version"] if snapshot.manifest else None,
+                "dtype": snapshot.dtype.name,
+            }
+            for table, snapshot in _snapshots.items()
+        },
+    }
@@ -0,0 +1,218 @@
+"""
+vector_search.py
+----------------
+Shared helpers for pgvector similarity queries.
+
+Filtered searches pick one of two plans:
+  - exact: the filter matches few rows (VECTOR_SEARCH_EXACT_THRESHOLD), so the
+    matching rows are scanned through their btree indexes and sorted by
+    distance. The distance is ordered as `distance + 0` so the planner cannot
+    choose the ANN index and post-filter its top-k.
+  - ann: the HNSW index is scanned with iterative scans enabled (pgvector
+    >= 0.8), so it keeps walking the graph until enough rows pass the filter,
+    bounded by hnsw.max_scan_tuples. On older pgvector, ef_search is raised as
+    far as allowed instead.
+
+Unfiltered searches can run in two stages (VECTOR_SEARCH_QUANTIZATION): a
+shortlist from a smaller HNSW index (halfvec or binary expression indexes, or
+the 256-dimension embedding_short column), then an exact re-rank of the
+shortlist on the full-precision vectors.
+
+An HNSW scan returns at most ef_search rows, so unfiltered pages deeper than
+HNSW_EF_SEARCH_MAX rows are ranked exactly. If the index scan comes back with
+fewer rows than the count says the page should hold, the page is recomputed
+exactly, so results stay correct.
+"""
+
+import logging
+import math
+from datetime import date
+from typing import Optional
+
+from pgvector.sqlalchemy import BIT, HALFVEC
+from sqlalchemy import and_, bindparam, cast, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 1536
+SHORT_EMBEDDING_DIM = 256
+
+# pgvector's default hnsw.ef_search.
+HNSW_EF_SEARCH_DEFAULT = 40
+
+# Cached per process: whether the installed pgvector supports iterative scans.
+_iterative_scan_supported: Optional[bool] = None
+
+
+def candidate_limit(page: int, page_size: int, candidates: int) -> int:
+    """
+    Number of nearest chunks to pull so that `page` can be filled with
+    distinct articles. Beyond within_ann_limit they are ranked exactly.
+    """
+    return max(candidates, page * page_size * 4)
+
+
+def within_ann_limit(rows: int) -> bool:
+    """
+    Whether an unfiltered HNSW scan can return `rows` rows: it returns at most
+    ef_search, which is capped at HNSW_EF_SEARCH_MAX.
+    """
+    return rows <= settings.HNSW_EF_SEARCH_MAX
+
+
+def attribute_conditions(
+    model,
+    publish_date_from: Optional[date] = None,
+    publish_date_to: Optional[date] = None,
+    content_vertical: Optional[str] = None,
+    content_type: Optional[str] = None,
+    tags: Optional[str] = None,
+) -> list:
+    """
+    Builds the article-attribute filters shared by the similarity endpoints.
+    `model` is Article or ArticleChunk (chunks carry denormalized copies).
+
+    content_vertical is rendered as a literal rather than a bind parameter so
+    the planner can match the per-vertical partial HNSW indexes.
+    """
+    conditions = []
+    if publish_date_from:
+        conditions.append(model.publish_datetime >= publish_date_from)
+    if publish_date_to:
+        conditions.append(model.publish_datetime <= publish_date_to)
+    if content_vertical:
+        conditions.append(
+            model.content_vertical == bindparam("content_vertical", content_vertical, literal_execute=True)
+        )
+    if content_type:
+        conditions.append(model.content_type == content_type)
+    if tags:
+        conditions.append(model.tags.ilike(f"%{tags}%"))
+    return conditions
+
+
+def use_exact_search(conditions: list, matching_rows: int) -> bool:
+    """
+    True when a filtered search should skip the ANN index and rank every
+    matching row exactly.
+    """
+    return bool(conditions) and matching_rows <= settings.VECTOR_SEARCH_EXACT_THRESHOLD
+
+
+def expected_rows(total: int, offset: int, page_size: int) -> int:
+    """Rows a correct page must contain given the filtered total."""
+    return max(0, min(page_size, total - offset))
+
+
+async def count_up_to(db: AsyncSession, model, conditions: list) -> int:
+    """
+    Counts rows matching `conditions`, stopping just past the exact-search
+    threshold (enough to choose the plan without a full count).
+    """
+    matching = select(model.id).where(and_(*conditions)).limit(settings.VECTOR_SEARCH_EXACT_THRESHOLD + 1)
+    return await db.scalar(select(func.count()).select_from(matching.subquery()))
+
+
+def exact_order(distance):
+    """
+    Orders by distance without letting the planner use the ANN index.
+    """
+    return distance + 0
+
+
+def binary_quantize(embedding) -> str:
+    """
+    Python equivalent of pgvector's binary_quantize(): one bit per dimension,
+    set when the component is positive.
+    """
+    return "".join("1" if x > 0 else "0" for x in embedding)
+
+
+def shorten_embedding(embedding, dims: int = SHORT_EMBEDDING_DIM) -> list:
+    """
+    Matryoshka shortening of a text-embedding-3 vector: keep the first `dims`
+    components and re-normalize to unit length.
+    """
+    head = [float(x) for x in embedding[:dims]]
+    norm = math.sqrt(sum(x * x for x in head)) or 1.0
+    return [x / norm for x in head]
+
+
+def shortlist_size(offset: int, page_size: int) -> int:
+    """
+    Rows taken from the quantized index before re-ranking. Pages beyond
+    within_ann_limit must not use a shortlist, since it is capped there.
+    """
+    return min(max(settings.VECTOR_SEARCH_RERANK_CANDIDATES, offset + page_size), settings.HNSW_EF_SEARCH_MAX)
+
+
+def quantized_shortlist(model, query_embedding, quantization: str, size: int):
+    """
+    Ids of the `size` nearest rows according to the shortlist index. The
+    halfvec/bit expressions must match the indexes in
+    scripts/schema/versions/0004 exactly for the planner to use them.
+    """
+    if quantization == "halfvec":
+        indexed = cast(model.embedding, HALFVEC(EMBEDDING_DIM))
+        coarse = indexed.cosine_distance(bindparam("query_halfvec", query_embedding, type_=HALFVEC(EMBEDDING_DIM)))
+    elif quantization == "bit":
+        indexed = cast(func.binary_quantize(model.embedding), BIT(EMBEDDING_DIM))
+        coarse = indexed.hamming_distance(
+            bindparam("query_bit", binary_quantize(query_embedding), type_=BIT(EMBEDDING_DIM))
+        )
+    elif quantization == "short":
+        coarse = model.embedding_short.cosine_distance(shorten_embedding(query_embedding))
+    else:
+        raise ValueError(f"Unknown quantization: {quantization!r}")
+    return select(model.id).order_by(coarse).limit(size)
+
+
+async def set_hnsw_ef_search(db: AsyncSession, limit: int) -> None:
+    """
+    Raises hnsw.ef_search for the current transaction so an index scan can
+    return `limit` rows. Has no effect on exact (sequential) scans.
+    """
+    ef_search = max(HNSW_EF_SEARCH_DEFAULT, min(limit, settings.HNSW_EF_SEARCH_MAX))
+    await db.execute(
+        text("SELECT set_config('hnsw.ef_search', :value, true)"),
+        {"value": str(ef_search)},
+    )
+
+
+async def iterative_scan_supported(db: AsyncSession) -> bool:
+    """
+    Whether the installed pgvector (>= 0.8.0) supports iterative index scans.
+    Checked once per process.
+    """
+    global _iterative_scan_supported
+    if _iterative_scan_supported is None:
+        version = await db.scalar(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+        parts = tuple(int(p) for p in (version or "0").split(".")[:2] if p.isdigit())
+        _iterative_scan_supported = parts >= (0, 8)
+        if not _iterative_scan_supported:
+            logger.info(f"pgvector {version} has no iterative index scans; filtered ANN search post-filters.")
+    return _iterative_scan_supported
+
+
+async def configure_filtered_ann_scan(db: AsyncSession, limit: int) -> None:
+    """
+    Prepares the current transaction for a filtered HNSW scan returning
+    `limit` rows: enables iterative scans (bounded by max_scan_tuples) when
+    available, otherwise raises ef_search as far as allowed.
+    """
+    mode = settings.HNSW_ITERATIVE_SCAN
+    if mode != "off" and await iterative_scan_supported(db):
+        await set_hnsw_ef_search(db, limit)
+        await db.execute(
+            text(
+                "SELECT set_config('hnsw.iterative_scan', :mode, true), "
+                "set_config('hnsw.max_scan_tuples', :max_tuples, true)"
+            ),
+            {"mode": mode, "max_tuples": str(settings.HNSW_MAX_SCAN_TUPLES)},
+        )
+    else:
+        await set_hnsw_ef_search(db, settings.HNSW_EF_SEARCH_MAX)
+
@@ -3,25 +3,119 @@ database.py
 -----------
 Sets up the database engine and session for the FastAPI application using SQLAlchemy.
 This example uses the async engine/session pattern introduced in SQLAlchemy 1.4+.
+
+The engine is created lazily, once per process, on first use. Importing the app
+therefore never opens sockets, and workers forked from a parent process build
+their own connection pool instead of inheriting the parent's.
 """
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import asyncio
+import logging
+import os
+import threading
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from .config import settings
+from .core.cancellation import track_backends
+from .core.slow_query import SlowQueryRecorder
+from .core.vector_codec import register_vector_codec
+
+logger = logging.getLogger(__name__)
+
+
+def async_db_url() -> str:
+    # For async connections, the URL scheme is usually 'postgresql+asyncpg://'
+    # If you're using the default psycopg, you might need 'postgresql+psycopg://'
+    # Make sure your DATABASE_URL matches the async driver if you want truly async DB operations
+    if not settings.DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set")
+    return settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
+
+
+# Optional slow-query recorder (see core/slow_query.py and /admin/slow_queries).
+# It is attached to the engine when the engine is created.
+slow_query_recorder = None
+if settings.SLOW_QUERY_LOG_ENABLED:
+    slow_query_recorder = SlowQueryRecorder(
+        threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+        buffer_size=settings.SLOW_QUERY_BUFFER_SIZE,
+        explain=settings.SLOW_QUERY_EXPLAIN,
+        log_path=settings.SLOW_QUERY_LOG_PATH,
+    )
+
+_lock = threading.Lock()
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+_engine_pid: Optional[int] = None
+
+
+def _on_connect(dbapi_connection, connection_record) -> None:
+    dbapi_connection.run_async(register_vector_codec)
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Returns the process-wide async engine, creating it on first use.
+    """
+    global _engine, _sessionmaker, _engine_pid
+    if _engine is not None and _engine_pid == os.getpid():
+        return _engine
+    with _lock:
+        if _engine is None or _engine_pid != os.getpid():
+            if _engine is not None:
+                # Inherited from a parent process: drop the pool without
+                # touching the parent's sockets.
+                _engine.sync_engine.dispose(close=False)
+            _engine = create_async_engine(
+                async_db_url(),
+                echo=False,
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+            )
+            # Vectors go over the wire in binary (core/vector_codec.py)
+            event.listen(_engine.sync_engine, "connect", _on_connect)
+            if slow_query_recorder is not None:
+                slow_query_recorder.attach(_engine)
+            # Backend pids for cancelling abandoned searches (core/cancellation.py)
+            track_backends(_engine)
+            # Create an async session factory
+            _sessionmaker = async_sessionmaker(
+                bind=_engine,
+                expire_on_commit=False,
+                autoflush=False
+            )
+            _engine_pid = os.getpid()
+    return _engine
+
+
+def AsyncSessionLocal():
+    """
+    Returns a new AsyncSession bound to the process-wide engine.
+    """
+    get_engine()
+    return _sessionmaker()
 
-# For async connections, the URL scheme is usually 'postgresql+asyncpg://'
-# If you're using the default psycopg, you might need 'postgresql+psycopg://'
-# Make sure your DATABASE_URL matches the async driver if you want truly async DB operations
-ASYNC_DB_URL = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 
-engine = create_async_engine(ASYNC_DB_URL, echo=False)
+async def get_db():
+    """
+    FastAPI dependency that yields a database session per request.
+    """
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def dispose_engine() -> None:
+    """
+    Closes all pooled connections owned by this process.
+    """
+    global _engine, _sessionmaker, _engine_pid
+    if _engine is not None and _engine_pid == os.getpid():
+        await _engine.dispose()
+    _engine, _sessionmaker, _engine_pid = None, None, None
 
-# Create an async session factory
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
-    expire_on_commit=False,
-    autoflush=False
-)
 
 class Base(DeclarativeBase):
     """
@@ -34,5 +128,65 @@ async def init_db():
     Utility function to initialize the database (create tables, if needed).
     Ideally used for migrations via Alembic, but can be used for quick setups.
     """
-    async with engine.begin() as conn:
+    async with get_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+# ------------------------------------------------------------------------------
+# Warm-up
+# ------------------------------------------------------------------------------
+async def warm_pool(connections: int) -> int:
+    """
+    Opens `connections` pooled connections concurrently so the first requests
+    do not pay for TCP/TLS/auth handshakes. Returns the number warmed.
+    """
+    engine = get_engine()
+    # Every ping holds its connection until all of them have one, so they end
+    # up as distinct pool entries instead of reusing the first connection.
+    barrier = asyncio.Barrier(connections)
+
+    async def ping():
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                await barrier.wait()
+        except Exception:
+            await barrier.abort()
+            raise
+
+    results = await asyncio.gather(*(ping() for _ in range(connections)), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    for failure in failures[:1]:
+        logger.warning(f"Pool warm-up connection failed: {failure!r}")
+    return connections - len(failures)
+
+
+async def prewarm_vector_indexes() -> list:
+    """
+    Loads the ANN (hnsw/ivfflat) indexes on the embedding tables into shared
+    buffers with pg_prewarm, if the extension is installed. Returns the names of
+    the indexes that were prewarmed.
+    """
+    warmed = []
+    async with get_engine().connect() as conn:
+        has_prewarm = await conn.scalar(
+            text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_prewarm')")
+        )
+        if not has_prewarm:
+            logger.info("pg_prewarm is not installed; skipping ANN index prewarm.")
+            return warmed
+        rows = await conn.execute(text(
+            """
+            SELECT indexname FROM pg_indexes
+            WHERE tablename IN ('articles', 'article_chunks')
+              AND (indexdef ILIKE '%USING hnsw%' OR indexdef ILIKE '%USING ivfflat%')
+            """
+        ))
+        for (index_name,) in rows.all():
+            try:
+                async with conn.begin_nested():
+                    await conn.execute(text("SELECT pg_prewarm(CAST(:name AS regclass))"), {"name": index_name})
+                warmed.append(index_name)
+            except Exception as e:
+                logger.warning(f"Failed to prewarm index {index_name}: {e}")
+    return warmed
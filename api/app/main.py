@@ -4,11 +4,71 @@ main.py
 Entry point of the FastAPI application. It creates the FastAPI app instance,
 includes routers, and starts the server. This file is referenced by uvicorn
 when the container starts.
+
+Shared clients and the database engine are created lazily per worker; the
+lifespan below builds them up front and warms the connection pool and the ANN
+index pages so the first real request does not pay for it.
 """
 
+# Imported first so its timestamp marks the start of the app import.
+from .core import startup
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from sqlalchemy.exc import DBAPIError
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import auth, articles, article_chunks
+from .config import settings
+from .core import cancellation, events, vector_index
+from .core.clients import build_clients, close_clients
+from .core.compression import CompressionMiddleware
+from .database import dispose_engine, prewarm_vector_indexes, warm_pool
+from .routers import admin, auth, articles, article_chunks, feed
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up() -> None:
+    """
+    Pre-opens pool connections and prewarms ANN index pages. Failures are
+    logged but never prevent the worker from starting.
+    """
+    try:
+        startup.stats["warmed_connections"] = await warm_pool(settings.WARMUP_POOL_CONNECTIONS)
+        if settings.WARMUP_PREWARM_INDEXES:
+            startup.stats["prewarmed_indexes"] = await prewarm_vector_indexes()
+    except Exception as e:
+        logger.warning(f"Database warm-up failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Per-worker startup and shutdown.
+    """
+    lifespan_started = time.perf_counter()
+    # Importing and configuring the SDKs is CPU-bound; do it in a thread while
+    # the pool warms up instead of serially on the event loop.
+    clients_ready = asyncio.create_task(asyncio.to_thread(build_clients))
+    if settings.WARMUP_ENABLED:
+        try:
+            await asyncio.wait_for(warm_up(), timeout=settings.WARMUP_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up did not finish within {settings.WARMUP_TIMEOUT_S}s; continuing.")
+    await clients_ready
+    if vector_index.enabled():
+        vector_index.start()
+    startup.mark_ready(lifespan_started)
+    logger.info(f"Worker ready: {startup.stats}")
+    yield
+    await events.stop()
+    await cancellation.close()
+    await vector_index.stop()
+    await close_clients()
+    await dispose_engine()
 
 
 def create_app() -> FastAPI:
@@ -18,7 +78,8 @@ def create_app() -> FastAPI:
     app = FastAPI(
         title="Crypto News Sentiment Analysis API",
         description="Provides endpoints to manage and retrieve crypto news articles, with sentiment analysis features.",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan,
     )
 
     # Define the list of origins allowed to make requests.
@@ -37,6 +98,32 @@ def create_app() -> FastAPI:
     )
 
 
+    # gzip/Brotli for large list and search responses (not event streams)
+    if settings.RESPONSE_COMPRESSION != "off":
+        app.add_middleware(
+            CompressionMiddleware,
+            mode=settings.RESPONSE_COMPRESSION,
+            minimum_size=settings.RESPONSE_COMPRESSION_MIN_SIZE,
+            level=settings.RESPONSE_COMPRESSION_LEVEL,
+            exclude_prefixes=("/feed/",),
+        )
+
+    # Cancels searches (and their queries) whose client has disconnected
+    app.add_middleware(cancellation.CancelOnDisconnect, paths=settings.CANCEL_ON_DISCONNECT_PATHS)
+
+    # Statement timeouts (SQLSTATE 57014) become 503s
+    app.add_exception_handler(DBAPIError, cancellation.query_canceled_handler)
+
+    # Records time-to-first-successful-response for /admin/startup
+    app.add_middleware(startup.FirstResponseTimer)
+
+    @app.get("/healthz", tags=["health"])
+    async def healthz():
+        """
+        Liveness probe. Does not touch the database.
+        """
+        return {"status": "ok"}
+
     # Include your routers
     app.include_router(auth.router, prefix="/auth", tags=["auth"])
     app.include_router(articles.router, prefix="/articles", tags=["articles"])
@@ -44,7 +131,14 @@ def create_app() -> FastAPI:
     # Register the new article_chunks router
     app.include_router(article_chunks.router, prefix="/article_chunks", tags=["article_chunks"])
 
+    # Server-sent events for new articles and chunks
+    app.include_router(feed.router, prefix="/feed", tags=["feed"])
+
+    # Operational endpoints (slow-query log)
+    app.include_router(admin.router, prefix="/admin", tags=["admin"])
+
     return app
 
 # Create a global instance of the app
 app = create_app()
+startup.mark_imported()
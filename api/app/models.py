@@ -4,8 +4,8 @@ models.py
 Contains SQLAlchemy models for database tables. Each class inherits from 'Base'.
 """
 
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, UniqueConstraint
-from pgvector.sqlalchemy import Vector
+from sqlalchemy import Column, Integer, SmallInteger, Float, Text, DateTime, ForeignKey, UniqueConstraint
+from .core.vector_codec import BinaryVector
 from .database import Base
 
 class Article(Base):
@@ -30,7 +30,10 @@ class Article(Base):
     authors = Column(Text, nullable=True)
     content_tier = Column(Text, nullable=True)
     article_s3_url = Column(Text, nullable=True)
-    embedding = Column(Vector(1536), nullable=True)
+    embedding = Column(BinaryVector(1536), nullable=True)
+    # First 256 dimensions of `embedding`, re-normalized (text-embedding-3
+    # vectors are Matryoshka). Used to shortlist before re-ranking.
+    embedding_short = Column(BinaryVector(256), nullable=True)
 
     # Additional columns and relationships can be added here as needed.
 
@@ -44,8 +47,42 @@ class ArticleChunk(Base):
     article_id = Column(Integer, ForeignKey("articles.id"), nullable=False)
     chunk_text = Column(Text, nullable=False)
     token_size = Column(Integer, nullable=False)
-    embedding = Column(Vector(1536), nullable=True)
+    embedding = Column(BinaryVector(1536), nullable=True)
+    embedding_short = Column(BinaryVector(256), nullable=True)  # see Article.embedding_short
+
+    # Denormalized from the parent article so similarity searches can filter
+    # without a join. Kept in sync by triggers (scripts/schema/versions/0002).
+    publish_datetime = Column(DateTime, nullable=True, index=True)
+    content_vertical = Column(Text, nullable=True, index=True)
+    content_type = Column(Text, nullable=True)
+    tags = Column(Text, nullable=True)
 
     # The UNIQUE constraint (article_id, chunk_text, token_size) is defined at the DB level
     # but you could add a __table_args__ for it if you want:
-    __table_args__ = (UniqueConstraint('article_id', 'chunk_text', 'token_size'),)
\ No newline at end of file
+    __table_args__ = (UniqueConstraint('article_id', 'chunk_text', 'token_size'),)
+
+
+class ArticleNeighbor(Base):
+    """
+    Precomputed nearest neighbors of an article, mapped to the article_neighbors
+    table. Rebuilt incrementally by scripts/neighbor_builder.
+    """
+    __tablename__ = "article_neighbors"
+
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(SmallInteger, primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=False, index=True)
+    distance = Column(Float(precision=24), nullable=False)
+
+
+class ArticleChunkNeighbor(Base):
+    """
+    Precomputed nearest neighbors of an article chunk (excluding chunks of the
+    same article), mapped to the article_chunk_neighbors table.
+    """
+    __tablename__ = "article_chunk_neighbors"
+
+    chunk_id = Column(Integer, ForeignKey("article_chunks.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(SmallInteger, primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("article_chunks.id", ondelete="CASCADE"), nullable=False, index=True)
+    distance = Column(Float(precision=24), nullable=False)
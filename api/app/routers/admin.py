@@ -0,0 +1,77 @@
+"""
+admin.py
+--------
+Operational endpoints (slow-query log, startup timings, vector index,
+cancellations, etc.). All routes
+require a valid bearer token.
+"""
+
+import os
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+
+from ..config import settings
+from ..core import cancellation, startup, vector_index
+from ..core.security import get_current_user
+from ..database import slow_query_recorder
+from ..schemas import CancellationStats, SlowQueryLog, StartupStats, VectorIndexStats
+
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+
+@router.get("/slow_queries", response_model=SlowQueryLog)
+async def list_slow_queries(
+    limit: Optional[int] = Query(50, ge=1, le=1000, description="Maximum number of entries to return"),
+):
+    """
+    Return the most recent slow queries, newest first.
+    Enable the recorder with SLOW_QUERY_LOG_ENABLED=true.
+    """
+    if slow_query_recorder is None:
+        return {"enabled": False, "items": []}
+    return {
+        "enabled": True,
+        "threshold_ms": slow_query_recorder.threshold_ms,
+        "items": slow_query_recorder.entries(limit),
+    }
+
+
+@router.delete("/slow_queries", status_code=204)
+async def clear_slow_queries():
+    """
+    Clear the in-memory slow-query buffer (the JSONL file is left untouched).
+    """
+    if slow_query_recorder is not None:
+        slow_query_recorder.clear()
+
+
+@router.get("/startup", response_model=StartupStats)
+async def startup_stats():
+    """
+    Cold-start timings of the worker that serves this request (seconds since
+    the app module started importing).
+    """
+    return startup.stats
+
+
+@router.get("/vector_index", response_model=VectorIndexStats)
+async def vector_index_stats():
+    """
+    Snapshot state of the in-process vector index in the worker that serves
+    this request (VECTOR_SEARCH_BACKEND=memory).
+    """
+    return vector_index.stats()
+
+
+@router.get("/cancellations", response_model=CancellationStats)
+async def cancellation_stats():
+    """
+    Abandoned-search counters of the worker that serves this request: handlers
+    cancelled because the client disconnected, server-side queries cancelled
+    with them, and statements stopped by the search statement_timeout.
+    """
+    return {
+        "pid": os.getpid(),
+        "statement_timeout_ms": settings.SEARCH_STATEMENT_TIMEOUT_MS,
+        **cancellation.stats,
+    }
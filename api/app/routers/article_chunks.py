@@ -1,32 +1,41 @@
-from openai import OpenAI
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import Optional
+from fastapi.responses import Response, StreamingResponse
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select, and_, text
+from sqlalchemy.orm import aliased
 from datetime import date
 
-from ..database import AsyncSessionLocal
-from ..models import ArticleChunk
+from ..config import settings
+from ..core import vector_index
+from ..core.cancellation import set_statement_timeout
+from ..core.embeddings import embed_query
+from ..core.export import MEDIA_TYPES, export_statement, response_fields, stream_export
+from ..core.vector_codec import BATCH_MEDIA_TYPE, load_batch, with_embedding
+from ..core.vector_search import (
+    attribute_conditions,
+    configure_filtered_ann_scan,
+    exact_order,
+    expected_rows,
+    quantized_shortlist,
+    set_hnsw_ef_search,
+    shortlist_size,
+    use_exact_search,
+    within_ann_limit,
+)
+from ..database import get_db
+from ..models import ArticleChunk, ArticleChunkNeighbor
 from ..schemas import (
     ArticleChunkCreate,
     ArticleChunkResponse,
     PaginatedArticleChunks,
     ArticleChunkSearchResult,
     ArticleChunkSearchResponse,
+    SimilarArticleChunks,
     PaginatedArticleChunkSearchResults
 )
-from ..config import settings
 router = APIRouter()
 
-# Generate embeddings per chunk
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-embedding_model = "text-embedding-3-small"
-
-# Dependency: get DB session
-async def get_db():
-    async with AsyncSessionLocal() as session:
-        yield session
-
 @router.post("/", response_model=ArticleChunkResponse)
 async def create_article_chunk(
     chunk_data: ArticleChunkCreate,
@@ -56,17 +65,39 @@ async def get_article_chunk(
         raise HTTPException(status_code=404, detail="Article chunk not found")
     return chunk
 
-@router.get("/", response_model=PaginatedArticleChunks)
+def article_chunk_filters(
+    article_id: Optional[int] = Query(None, description="Filter by article_id"),
+    min_token_size: Optional[int] = Query(None, description="Filter by minimum token size"),
+    max_token_size: Optional[int] = Query(None, description="Filter by maximum token size"),
+    chunk_text: Optional[str] = Query(None, description="Partial match on chunk_text"),
+) -> list:
+    """
+    Filter conditions shared by the chunk list and export endpoints.
+    """
+    conditions = []
+    if article_id is not None:
+        conditions.append(ArticleChunk.article_id == article_id)
+    if min_token_size is not None:
+        conditions.append(ArticleChunk.token_size >= min_token_size)
+    if max_token_size is not None:
+        conditions.append(ArticleChunk.token_size <= max_token_size)
+    if chunk_text:
+        conditions.append(ArticleChunk.chunk_text.ilike(f"%{chunk_text}%"))
+    return conditions
+
+@router.get("/", response_model=PaginatedArticleChunks, response_model_exclude_unset=True)
 async def list_article_chunks(
     db: AsyncSession = Depends(get_db),
     # Pagination
     page: int = Query(1, ge=1, description="Page number, must be >= 1"),
     page_size: int = Query(10, ge=1, le=100, description="Number of items per page"),
     # Filters
-    article_id: Optional[int] = Query(None, description="Filter by article_id"),
-    min_token_size: Optional[int] = Query(None, description="Filter by minimum token size"),
-    max_token_size: Optional[int] = Query(None, description="Filter by maximum token size"),
-    chunk_text: Optional[str] = Query(None, description="Partial match on chunk_text"),
+    conditions: list = Depends(article_chunk_filters),
+    include_embedding: Optional[str] = Query(
+        None,
+        regex="^(float32|float16)$",
+        description="Include each embedding as base64 little-endian float32 or float16 (embedding_b64)",
+    ),
     # Sorting
     sort_by: Optional[str] = Query(
         None, 
@@ -83,17 +114,6 @@ async def list_article_chunks(
     Retrieve a paginated, filterable, and sortable list of article chunks.
     """
     stmt = select(ArticleChunk)
-    conditions = []
-
-    # Build filter conditions
-    if article_id is not None:
-        conditions.append(ArticleChunk.article_id == article_id)
-    if min_token_size is not None:
-        conditions.append(ArticleChunk.token_size >= min_token_size)
-    if max_token_size is not None:
-        conditions.append(ArticleChunk.token_size <= max_token_size)
-    if chunk_text:
-        conditions.append(ArticleChunk.chunk_text.ilike(f"%{chunk_text}%"))
 
     # Apply filtering
     if conditions:
@@ -127,60 +147,219 @@ async def list_article_chunks(
     chunks = results.scalars().all()
 
     return {
-        "items": chunks,
+        "items": [with_embedding(ArticleChunkResponse, chunk, include_embedding) for chunk in chunks],
         "total": total_count,
         "page": page,
         "page_size": page_size,
     }
 
-@router.get("/search_by_similarity", response_model=PaginatedArticleChunkSearchResults)
+@router.get("/export")
+async def export_article_chunks(
+    conditions: list = Depends(article_chunk_filters),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$", description="Output format: ndjson or csv"),
+    include_embedding: bool = Query(False, description="Include the embedding vector of each chunk"),
+):
+    """
+    Stream every chunk matching the filters (same as the list endpoint), in id
+    order, as NDJSON or CSV, from a single server-side cursor.
+    """
+    fields = response_fields(ArticleChunk, ArticleChunkResponse)
+    stmt = export_statement(ArticleChunk, fields, conditions, include_embedding)
+    return StreamingResponse(
+        stream_export(stmt, fields, format, include_embedding),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="article_chunks.{format}"'},
+    )
+
+@router.get("/embeddings", response_class=Response)
+async def get_article_chunk_embeddings(
+    db: AsyncSession = Depends(get_db),
+    ids: List[int] = Query(..., description="Chunk ids (repeat the parameter), e.g. from a search"),
+    dtype: str = Query("float32", regex="^(float32|float16)$", description="Element type: float32 or float16"),
+):
+    """
+    Embeddings of the requested chunks as one binary batch
+    (application/octet-stream, format in core/vector_codec.py). Chunks
+    without an embedding are left out.
+    """
+    if len(ids) > settings.EMBEDDING_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.EMBEDDING_BATCH_MAX_IDS} ids per request")
+    return Response(content=await load_batch(db, ArticleChunk, ids, dtype), media_type=BATCH_MEDIA_TYPE)
+
+@router.get("/{chunk_id:int}/similar", response_model=SimilarArticleChunks, response_model_exclude_unset=True)
+async def get_similar_chunks(
+    chunk_id: int,
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(10, ge=1, le=100, description="Number of similar chunks to return"),
+    include_embedding: Optional[str] = Query(
+        None,
+        regex="^(float32|float16)$",
+        description="Include each embedding as base64 little-endian float32 or float16 (embedding_b64)",
+    ),
+):
+    """
+    Retrieve the chunks of other articles most similar to a stored chunk, using
+    its stored embedding (no embedding call).
+
+    Served from the precomputed article_chunk_neighbors lists when they hold at
+    least `limit` entries; otherwise computed with an ANN query.
+    """
+    await set_statement_timeout(db)
+    stmt = (
+        select(ArticleChunk, ArticleChunkNeighbor.distance)
+        .join(ArticleChunkNeighbor, ArticleChunkNeighbor.neighbor_id == ArticleChunk.id)
+        .where(ArticleChunkNeighbor.chunk_id == chunk_id)
+        .order_by(ArticleChunkNeighbor.rank)
+        .limit(limit)
+    )
+    rows = (await db.execute(stmt)).all()
+    source = "precomputed"
+
+    if len(rows) < limit:
+        result = await db.execute(
+            select(ArticleChunk.article_id, ArticleChunk.embedding.is_not(None)).where(ArticleChunk.id == chunk_id)
+        )
+        found = result.one_or_none()
+        if found is None:
+            raise HTTPException(status_code=404, detail="Chunk not found")
+        source_article_id, has_embedding = found
+        if not has_embedding:
+            raise HTTPException(status_code=404, detail="Chunk has no embedding")
+
+        stored_embedding = select(ArticleChunk.embedding).where(ArticleChunk.id == chunk_id).scalar_subquery()
+        distance = ArticleChunk.embedding.cosine_distance(stored_embedding)
+        # Chunks of the same article are filtered out after the index scan,
+        # so leave the scan room for them
+        await configure_filtered_ann_scan(db, limit + 50)
+        stmt = select(ArticleChunk, distance.label("distance")).where(
+            ArticleChunk.article_id != source_article_id, ArticleChunk.embedding.is_not(None)
+        )
+        # Iterative scans may return rows slightly out of order; take the
+        # candidates and re-sort them.
+        nearest = stmt.order_by(distance).limit(limit).subquery("nearest")
+        chunk = aliased(ArticleChunk, nearest)
+        rows = (await db.execute(select(chunk, nearest.c.distance).order_by(nearest.c.distance))).all()
+        if len(rows) < limit:
+            # The index scan gave up before finding enough chunks of other articles
+            rows = (await db.execute(stmt.order_by(exact_order(distance)).limit(limit))).all()
+        source = "live"
+
+    items = [
+        ArticleChunkSearchResult(chunk=with_embedding(ArticleChunkResponse, chunk, include_embedding), distance=distance)
+        for chunk, distance in rows
+    ]
+    return {"chunk_id": chunk_id, "source": source, "items": items}
+
+
+@router.get("/search_by_similarity", response_model=PaginatedArticleChunkSearchResults, response_model_exclude_unset=True)
 async def search_chunks_by_similarity(
     db: AsyncSession = Depends(get_db),
     # Pagination
     page: int = Query(1, ge=1, description="Page number, must be >= 1"),
     page_size: int = Query(10, ge=1, le=100, description="Number of items per page"),
+    include_embedding: Optional[str] = Query(
+        None,
+        regex="^(float32|float16)$",
+        description="Include each embedding as base64 little-endian float32 or float16 (embedding_b64)",
+    ),
     # Filters
     q: str = Query(..., description="Query text to embed for similarity search"),
     article_id: Optional[int] = Query(None, description="Filter by article_id"),
+    publish_date_from: Optional[date] = Query(None, description="Only chunks of articles published after this date"),
+    publish_date_to: Optional[date] = Query(None, description="Only chunks of articles published before this date"),
+    content_vertical: Optional[str] = Query(None, description="Filter by content vertical"),
+    content_type: Optional[str] = Query(None, description="Filter by content type"),
+    tags: Optional[str] = Query(None, description="Filter by tags (partial match)"),
 ):
     """
-    Retrieve a paginated list of article chunks by similarity
+    Retrieve a paginated list of article chunks by similarity.
+
+    Filters are applied inside the search rather than to an unfiltered top-k:
+    selective filters are answered exactly, broader ones through the ANN index
+    with iterative scans (see core/vector_search.py).
     """
     # 1) Generate embedding for the user query
-    response = client.embeddings.create(input=q, model=embedding_model)
-    query_embedding = response.data[0].embedding  # list of floats
+    query_embedding = await embed_query(q)  # float32 array, bound in binary
 
-    # 2) Build the query with similarity calculation
-    stmt = (
-        select(
-            ArticleChunk,
-            (ArticleChunk.embedding.cosine_distance(query_embedding)).label("distance")
-        )
-        .order_by("distance")  # ascending distance => most similar first
+    # 2) Build the filter conditions
+    conditions = attribute_conditions(
+        ArticleChunk, publish_date_from, publish_date_to, content_vertical, content_type, tags
     )
-
-    # 3) Conditionally add the filter if article_id is provided
     if article_id is not None:
-        stmt = stmt.where(ArticleChunk.article_id == article_id)
+        conditions.append(ArticleChunk.article_id == article_id)
 
-    # 4) Calculate pagination offset
+    # 3) Calculate pagination offset
     offset = (page - 1) * page_size
 
-    # 5) Count total matching items, applying the same filter if necessary
-    total_stmt = select(func.count(ArticleChunk.id))
-    if article_id is not None:
-        total_stmt = total_stmt.where(ArticleChunk.article_id == article_id)
-    total_count = await db.scalar(total_stmt)
+    if not conditions:
+        # In-process index (VECTOR_SEARCH_BACKEND=memory); None when disabled or not built yet
+        matches = await vector_index.search("article_chunks", query_embedding, offset + page_size)
+    else:
+        matches = None
 
-    # 6) Apply pagination limits
-    stmt = stmt.offset(offset).limit(page_size)
-    results = await db.execute(stmt)
-    rows = results.all()  # each row: (ArticleChunk, distance)
+    if matches is not None:
+        total_count = vector_index.size("article_chunks")
+        rows = await vector_index.hydrate(db, ArticleChunk, matches[offset:])
+    else:
+        await set_statement_timeout(db)
+        # 4) Count total matching items, applying the same filters
+        total_stmt = select(func.count(ArticleChunk.id))
+        if conditions:
+            total_stmt = total_stmt.where(and_(*conditions))
+        total_count = await db.scalar(total_stmt)
+
+        # 5) Build the query with similarity calculation
+        distance = ArticleChunk.embedding.cosine_distance(query_embedding)
+        stmt = select(ArticleChunk, distance.label("distance"))
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+        exact_stmt = stmt.order_by(exact_order(distance)).offset(offset).limit(page_size)
+
+        # 6) Fetch the page: exactly when the filter is selective, otherwise
+        #    through the ANN index
+        if use_exact_search(conditions, total_count):
+            rows = (await db.execute(exact_stmt)).all()
+        elif not conditions and not within_ann_limit(offset + page_size):
+            # Deeper than an HNSW scan can reach
+            rows = (await db.execute(exact_stmt)).all()
+        elif conditions:
+            # Iterative scans may return rows slightly out of order; take the
+            # candidates for this page and re-sort them.
+            await configure_filtered_ann_scan(db, offset + page_size)
+            nearest = stmt.order_by(distance).limit(offset + page_size).subquery("nearest")
+            chunk = aliased(ArticleChunk, nearest)
+            ann_stmt = (
+                select(chunk, nearest.c.distance)
+                .order_by(nearest.c.distance)
+                .offset(offset)
+                .limit(page_size)
+            )
+            rows = (await db.execute(ann_stmt)).all()
+            if len(rows) < expected_rows(total_count, offset, page_size):
+                # The index scan gave up before finding enough matching rows
+                rows = (await db.execute(exact_stmt)).all()
+        elif settings.VECTOR_SEARCH_QUANTIZATION != "none":
+            # Shortlist on the smaller index, then re-rank exactly on full precision
+            size = shortlist_size(offset, page_size)
+            await set_hnsw_ef_search(db, size)
+            shortlist = quantized_shortlist(ArticleChunk, query_embedding, settings.VECTOR_SEARCH_QUANTIZATION, size)
+            stmt = stmt.where(ArticleChunk.id.in_(shortlist)).order_by(exact_order(distance)).offset(offset).limit(page_size)
+            rows = (await db.execute(stmt)).all()
+            if len(rows) < expected_rows(total_count, offset, page_size):
+                # The shortlist came back with fewer rows than the page needs
+                rows = (await db.execute(exact_stmt)).all()
+        else:
+            await set_hnsw_ef_search(db, offset + page_size)
+            rows = (await db.execute(stmt.order_by(distance).offset(offset).limit(page_size))).all()
+            if len(rows) < expected_rows(total_count, offset, page_size):
+                # The index scan returned fewer rows than the table holds
+                rows = (await db.execute(exact_stmt)).all()
+    # each row: (ArticleChunk, distance)
 
     # 7) Build response items
     items = [
         ArticleChunkSearchResult(
-            chunk=ArticleChunkResponse.from_orm(chunk),
+            chunk=with_embedding(ArticleChunkResponse, chunk, include_embedding),
             distance=distance
         )
         for chunk, distance in rows
@@ -1,53 +1,53 @@
-from openai import OpenAI
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func
 from sqlalchemy import select, and_, or_
 from sqlalchemy.future import select
-from typing import Optional
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.orm import aliased
+from typing import List, Optional
 from datetime import date
-import boto3
 from botocore.exceptions import ClientError
 from starlette.concurrency import run_in_threadpool
+from ..core.clients import get_s3_client
 from ..config import settings
-from ..database import AsyncSessionLocal
-from ..models import Article
+from ..core import vector_index
+from ..core.cancellation import set_statement_timeout
+from ..core.embeddings import embed_query
+from ..core.export import MEDIA_TYPES, export_statement, response_fields, stream_export
+from ..core.vector_codec import BATCH_MEDIA_TYPE, load_batch, with_embedding
+from ..core.vector_search import (
+    attribute_conditions,
+    candidate_limit,
+    configure_filtered_ann_scan,
+    count_up_to,
+    exact_order,
+    expected_rows,
+    quantized_shortlist,
+    set_hnsw_ef_search,
+    shortlist_size,
+    use_exact_search,
+    within_ann_limit,
+)
+from ..database import get_db
+from ..models import Article, ArticleChunk, ArticleNeighbor
 from ..schemas import (
     ArticleCreate,
     ArticleResponse,
     ArticleContentResponse,
     PaginatedArticles,
     ArticleSearchResult,
-    PaginatedArticleSearchResults
+    PaginatedArticleSearchResults,
+    SimilarArticles,
+    ArticleChunkGroupResult,
+    PaginatedArticleChunkGroupResults
 )
 import gzip
 
-# Generate embeddings per chunk
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-embedding_model = "text-embedding-3-small"
-
 router = APIRouter()
 
-# Initialize the S3 client at module level (ensure your settings has the AWS credentials and bucket)
-s3_client = boto3.client(
-    "s3",
-    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-)
-
-# Dependency for getting DB session
-async def get_db():
-    async with AsyncSessionLocal() as session:
-        yield session
-
-@router.get("/", response_model=PaginatedArticles)
-async def list_articles(
-    # Session
-    db: AsyncSession = Depends(get_db),
-    # Pagination
-    page: int = Query(1, ge=1, description="Page number, must be >= 1"),
-    page_size: int = Query(10, ge=1, le=100, description="Number of items per page"),
-    # Filters
+def article_filters(
     id: Optional[int] = Query(None, description="Filter by specific article ID"),
     content_title: Optional[str] = Query(None, description="Search by content title (partial match)"),
     og_title: Optional[str] = Query(None, description="Search by OG title (partial match)"),
@@ -60,26 +60,10 @@ async def list_articles(
     publish_date_to: Optional[date] = Query(None, description="Get articles published before this date"),
     last_modified_from: Optional[date] = Query(None, description="Get articles modified after this date"),
     last_modified_to: Optional[date] = Query(None, description="Get articles modified before this date"),
-    # Sorting
-    sort_by: Optional[str] = Query(
-        None,
-        regex="^(publish_datetime|last_modified_datetime|content_title)$",
-        description="Sort by: publish_datetime, last_modified_datetime, or content_title",
-    ),
-    order: Optional[str] = Query(
-        None,
-        regex="^(asc|desc)$",
-        description="Sorting order: asc or desc"
-    )
-):
+) -> list:
     """
-    Retrieve a paginated, filterable list of articles.
-    Supports many optional query parameters for filtering and sorting.
+    Filter conditions shared by the article list and export endpoints.
     """
-    # Base query
-    stmt = select(Article)
-
-    # Build dynamic filter conditions
     conditions = []
 
     if id is not None:
@@ -111,6 +95,42 @@ async def list_articles(
     if last_modified_to:
         conditions.append(Article.last_modified_datetime <= last_modified_to)
 
+    return conditions
+
+
+@router.get("/", response_model=PaginatedArticles, response_model_exclude_unset=True)
+async def list_articles(
+    # Session
+    db: AsyncSession = Depends(get_db),
+    # Pagination
+    page: int = Query(1, ge=1, description="Page number, must be >= 1"),
+    page_size: int = Query(10, ge=1, le=100, description="Number of items per page"),
+    # Filters
+    conditions: list = Depends(article_filters),
+    include_embedding: Optional[str] = Query(
+        None,
+        regex="^(float32|float16)$",
+        description="Include each embedding as base64 little-endian float32 or float16 (embedding_b64)",
+    ),
+    # Sorting
+    sort_by: Optional[str] = Query(
+        None,
+        regex="^(publish_datetime|last_modified_datetime|content_title)$",
+        description="Sort by: publish_datetime, last_modified_datetime, or content_title",
+    ),
+    order: Optional[str] = Query(
+        None,
+        regex="^(asc|desc)$",
+        description="Sorting order: asc or desc"
+    )
+):
+    """
+    Retrieve a paginated, filterable list of articles.
+    Supports many optional query parameters for filtering and sorting.
+    """
+    # Base query
+    stmt = select(Article)
+
     # Apply filtering
     if conditions:
         stmt = stmt.where(and_(*conditions))
@@ -143,13 +163,49 @@ async def list_articles(
     articles = results.scalars().all()
 
     return {
-        "items": articles,
+        "items": [with_embedding(ArticleResponse, article, include_embedding) for article in articles],
         "total": total_count,
         "page": page,
         "page_size": page_size,
     }
 
 
+@router.get("/export")
+async def export_articles(
+    conditions: list = Depends(article_filters),
+    format: str = Query("ndjson", regex="^(ndjson|csv)$", description="Output format: ndjson or csv"),
+    include_embedding: bool = Query(False, description="Include the embedding vector of each article"),
+):
+    """
+    Stream every article matching the filters (same as the list endpoint), in
+    id order, as NDJSON or CSV. One query read through a server-side cursor,
+    instead of paging the list endpoint.
+    """
+    fields = response_fields(Article, ArticleResponse)
+    stmt = export_statement(Article, fields, conditions, include_embedding)
+    return StreamingResponse(
+        stream_export(stmt, fields, format, include_embedding),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="articles.{format}"'},
+    )
+
+
+@router.get("/embeddings", response_class=Response)
+async def get_article_embeddings(
+    db: AsyncSession = Depends(get_db),
+    ids: List[int] = Query(..., description="Article ids (repeat the parameter), e.g. from a search"),
+    dtype: str = Query("float32", regex="^(float32|float16)$", description="Element type: float32 or float16"),
+):
+    """
+    Embeddings of the requested articles as one binary batch
+    (application/octet-stream, format in core/vector_codec.py). Articles
+    without an embedding are left out.
+    """
+    if len(ids) > settings.EMBEDDING_BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.EMBEDDING_BATCH_MAX_IDS} ids per request")
+    return Response(content=await load_batch(db, Article, ids, dtype), media_type=BATCH_MEDIA_TYPE)
+
+
 @router.post("/", response_model=ArticleResponse)
 async def create_article(article_data: ArticleCreate, db: AsyncSession = Depends(get_db)):
     new_article = Article(**article_data.dict())
@@ -187,7 +243,7 @@ async def fetch_article_from_s3(article_id: int, db: AsyncSession = Depends(get_
     try:
         # Wrap the blocking S3 call inside a synchronous function
         def fetch():
-            response = s3_client.get_object(Bucket=bucket_name, Key=file_key)
+            response = get_s3_client().get_object(Bucket=bucket_name, Key=file_key)
             # Read the response body and decode from bytes to a UTF-8 string
             with gzip.GzipFile(fileobj=response["Body"]) as f:
                 raw_content = f.read().decode("utf-8")
@@ -207,49 +263,169 @@ async def fetch_article_from_s3(article_id: int, db: AsyncSession = Depends(get_
         else:
             raise HTTPException(status_code=500, detail=f"Error fetching article: {e}")
 
-@router.get("/search_by_similarity", response_model=PaginatedArticleSearchResults)
+@router.get("/{article_id:int}/similar", response_model=SimilarArticles, response_model_exclude_unset=True)
+async def get_similar_articles(
+    article_id: int,
+    db: AsyncSession = Depends(get_db),
+    limit: int = Query(10, ge=1, le=100, description="Number of similar articles to return"),
+    include_embedding: Optional[str] = Query(
+        None,
+        regex="^(float32|float16)$",
+        description="Include each embedding as base64 little-endian float32 or float16 (embedding_b64)",
+    ),
+):
+    """
+    Retrieve the articles most similar to a stored article, using its stored
+    embedding (no embedding call).
+
+    Served from the precomputed article_neighbors lists (scripts/neighbor_builder)
+    when they hold at least `limit` entries; otherwise computed with an ANN
+    query against the stored vector.
+    """
+    await set_statement_timeout(db)
+    stmt = (
+        select(Article, ArticleNeighbor.distance)
+        .join(ArticleNeighbor, ArticleNeighbor.neighbor_id == Article.id)
+        .where(ArticleNeighbor.article_id == article_id)
+        .order_by(ArticleNeighbor.rank)
+        .limit(limit)
+    )
+    rows = (await db.execute(stmt)).all()
+    source = "precomputed"
+
+    if len(rows) < limit:
+        has_embedding = await db.scalar(select(Article.embedding.is_not(None)).where(Article.id == article_id))
+        if has_embedding is None:
+            raise HTTPException(status_code=404, detail="Article not found")
+        if not has_embedding:
+            raise HTTPException(status_code=404, detail="Article has no embedding")
+
+        # The stored vector is used in place (an InitPlan), so it never leaves the database
+        stored_embedding = select(Article.embedding).where(Article.id == article_id).scalar_subquery()
+        distance = Article.embedding.cosine_distance(stored_embedding)
+        await set_hnsw_ef_search(db, limit + 1)
+        stmt = (
+            select(Article, distance.label("distance"))
+            .where(Article.id != article_id, Article.embedding.is_not(None))
+            .order_by(distance)
+            .limit(limit)
+        )
+        rows = (await db.execute(stmt)).all()
+        source = "live"
+
+    items = [
+        ArticleSearchResult(article=with_embedding(ArticleResponse, article, include_embedding), distance=distance)
+        for (article, distance) in rows
+    ]
+    return {"article_id": article_id, "source": source, "items": items}
+
+@router.get("/search_by_similarity", response_model=PaginatedArticleSearchResults, response_model_exclude_unset=True)
 async def search_articles_by_similarity(
     db: AsyncSession = Depends(get_db),
     # Paginations
     page: int = Query(1, ge=1, description="Page number, must be >= 1"),
     page_size: int = Query(10, ge=1, le=100, description="Number of items per page"),
+    include_embedding: Optional[str] = Query(
+        None,
+        regex="^(float32|float16)$",
+        description="Include each embedding as base64 little-endian float32 or float16 (embedding_b64)",
+    ),
     # Filters
     q: str = Query(..., description="Query text to embed for similarity search"),
+    publish_date_from: Optional[date] = Query(None, description="Get articles published after this date"),
+    publish_date_to: Optional[date] = Query(None, description="Get articles published before this date"),
+    content_vertical: Optional[str] = Query(None, description="Filter by content vertical"),
+    content_type: Optional[str] = Query(None, description="Filter by content type"),
+    tags: Optional[str] = Query(None, description="Filter by tags (partial match)"),
 ):
     """
-    Retrieve a paginated, list of articles by similarity
+    Retrieve a paginated, list of articles by similarity.
+    Filters are applied inside the search (see core/vector_search.py).
     """
 
     # 1) Generate embedding for the user query
-    response = client.embeddings.create(input=q, model=embedding_model)
-    query_embedding = response.data[0].embedding  # list of floats
+    query_embedding = await embed_query(q)  # float32 array, bound in binary
 
-    stmt = (
-        select(
-            Article,
-            # Label distance so we can return it if we want
-            (Article.embedding.cosine_distance(query_embedding)).label("distance")
-        )
-        .order_by("distance")  # ascending distance => most similar first
+    conditions = attribute_conditions(
+        Article, publish_date_from, publish_date_to, content_vertical, content_type, tags
     )
 
     # Pagination offset
     offset = (page - 1) * page_size
 
-    # Count total
-    total_stmt = select(func.count(Article.id))
-    total_count = await db.scalar(total_stmt)
+    if not conditions:
+        # In-process index (VECTOR_SEARCH_BACKEND=memory); None when disabled or not built yet
+        matches = await vector_index.search("articles", query_embedding, offset + page_size)
+    else:
+        matches = None
 
-    # Fetch subset
-    stmt = stmt.offset(offset).limit(page_size)
-    results = await db.execute(stmt)
-    rows = results.all()  # each row: (Article, distance)
+    if matches is not None:
+        total_count = vector_index.size("articles")
+        rows = await vector_index.hydrate(db, Article, matches[offset:])
+    else:
+        await set_statement_timeout(db)
+        # Count total
+        total_stmt = select(func.count(Article.id))
+        if conditions:
+            total_stmt = total_stmt.where(and_(*conditions))
+        total_count = await db.scalar(total_stmt)
+
+        distance = Article.embedding.cosine_distance(query_embedding)
+        stmt = select(
+            Article,
+            # Label distance so we can return it if we want
+            distance.label("distance")
+        )
+        if conditions:
+            stmt = stmt.where(and_(*conditions))
+        exact_stmt = stmt.order_by(exact_order(distance)).offset(offset).limit(page_size)
+
+        # Fetch subset
+        if use_exact_search(conditions, total_count):
+            rows = (await db.execute(exact_stmt)).all()
+        elif not conditions and not within_ann_limit(offset + page_size):
+            # Deeper than an HNSW scan can reach
+            rows = (await db.execute(exact_stmt)).all()
+        elif conditions:
+            # Iterative scans may return rows slightly out of order; take the
+            # candidates for this page and re-sort them.
+            await configure_filtered_ann_scan(db, offset + page_size)
+            nearest = stmt.order_by(distance).limit(offset + page_size).subquery("nearest")
+            article = aliased(Article, nearest)
+            ann_stmt = (
+                select(article, nearest.c.distance)
+                .order_by(nearest.c.distance)
+                .offset(offset)
+                .limit(page_size)
+            )
+            rows = (await db.execute(ann_stmt)).all()
+            if len(rows) < expected_rows(total_count, offset, page_size):
+                # The index scan gave up before finding enough matching rows
+                rows = (await db.execute(exact_stmt)).all()
+        elif settings.VECTOR_SEARCH_QUANTIZATION != "none":
+            # Shortlist on the smaller index, then re-rank exactly on full precision
+            size = shortlist_size(offset, page_size)
+            await set_hnsw_ef_search(db, size)
+            shortlist = quantized_shortlist(Article, query_embedding, settings.VECTOR_SEARCH_QUANTIZATION, size)
+            stmt = stmt.where(Article.id.in_(shortlist)).order_by(exact_order(distance)).offset(offset).limit(page_size)
+            rows = (await db.execute(stmt)).all()
+            if len(rows) < expected_rows(total_count, offset, page_size):
+                # The shortlist came back with fewer rows than the page needs
+                rows = (await db.execute(exact_stmt)).all()
+        else:
+            await set_hnsw_ef_search(db, offset + page_size)
+            stmt = stmt.order_by(distance).offset(offset).limit(page_size)  # ascending distance => most similar first
+            rows = (await db.execute(stmt)).all()
+            if len(rows) < expected_rows(total_count, offset, page_size):
+                # The index scan returned fewer rows than the table holds
+                rows = (await db.execute(exact_stmt)).all()
+    # each row: (Article, distance)
 
     items = []
     for (article, distance) in rows:
        items.append(
            ArticleSearchResult(
-               article=ArticleResponse.from_orm(article),
+               article=with_embedding(ArticleResponse, article, include_embedding),
                distance=distance
             )
         ) 
@@ -259,4 +435,168 @@ async def search_articles_by_similarity(
         "total": total_count,
         "page": page,
         "page_size": page_size,
-    } 
\ No newline at end of file
+    }
+
+
+async def chunk_groups_page(
+    db: AsyncSession, nearest, score: str, chunks_per_article: int, offset: int, page_size: int
+):
+    """
+    Groups the candidate chunks selected by `nearest` by article and returns
+    (rows, total articles among the candidates, candidate chunks found); each
+    row is (Article, distance, chunks, total).
+    """
+    nearest = nearest.cte("nearest")
+    ranked = select(
+        nearest,
+        func.row_number().over(
+            partition_by=nearest.c.article_id,
+            order_by=(nearest.c.distance, nearest.c.id),
+        ).label("rank"),
+    ).subquery("ranked")
+
+    article_distance = func.min(ranked.c.distance) if score == "max" else func.avg(ranked.c.distance)
+    grouped = (
+        select(
+            ranked.c.article_id,
+            article_distance.label("distance"),
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "id", ranked.c.id,
+                        "chunk_text", ranked.c.chunk_text,
+                        "token_size", ranked.c.token_size,
+                        "distance", ranked.c.distance,
+                    ),
+                    ranked.c.rank,
+                ),
+                type_=JSON,
+            ).label("chunks"),
+            func.count().over().label("total"),
+        )
+        .where(ranked.c.rank <= chunks_per_article)
+        .group_by(ranked.c.article_id)
+        .subquery("grouped")
+    )
+
+    stmt = (
+        select(Article, grouped.c.distance, grouped.c.chunks, grouped.c.total)
+        .join(grouped, Article.id == grouped.c.article_id)
+        .order_by(grouped.c.distance, Article.id)
+        .offset(offset)
+        .limit(page_size)
+    )
+    rows = (await db.execute(stmt)).all()
+    if len(rows) == page_size:
+        return rows, rows[0].total, None
+    # Short page or past the end of the candidate set; count what it did contain
+    total_count, found = (
+        await db.execute(select(func.count(func.distinct(nearest.c.article_id)), func.count()))
+    ).one()
+    return rows, total_count, found
+
+
+@router.get("/search_by_chunk_similarity", response_model=PaginatedArticleChunkGroupResults)
+async def search_articles_by_chunk_similarity(
+    db: AsyncSession = Depends(get_db),
+    # Paginations
+    page: int = Query(1, ge=1, description="Page number, must be >= 1"),
+    page_size: int = Query(10, ge=1, le=100, description="Number of articles per page"),
+    # Filters
+    q: str = Query(..., description="Query text to embed for similarity search"),
+    # Ranking
+    score: str = Query(
+        "max",
+        regex="^(max|topk_avg)$",
+        description="Rank articles by their best chunk (max) or the average of their top chunks (topk_avg)",
+    ),
+    chunks_per_article: int = Query(3, ge=1, le=10, description="Best-matching chunks returned per article"),
+    candidates: int = Query(
+        settings.VECTOR_SEARCH_CANDIDATES,
+        ge=10,
+        le=1000,
+        description="Nearest chunks fetched from the ANN index before grouping by article",
+    ),
+    # Filters
+    publish_date_from: Optional[date] = Query(None, description="Get articles published after this date"),
+    publish_date_to: Optional[date] = Query(None, description="Get articles published before this date"),
+    content_vertical: Optional[str] = Query(None, description="Filter by content vertical"),
+    content_type: Optional[str] = Query(None, description="Filter by content type"),
+    tags: Optional[str] = Query(None, description="Filter by tags (partial match)"),
+):
+    """
+    Retrieve a paginated list of articles ranked by the distance of their
+    chunks to the query.
+
+    A single statement pulls the nearest `candidates` chunks from the ANN index,
+    ranks chunks within each article with a window function, and aggregates
+    each article's top chunks, so every page holds distinct articles. Pages
+    needing more candidates than an HNSW scan returns are ranked exactly.
+    """
+    query_embedding = await embed_query(q)
+    await set_statement_timeout(db)
+
+    limit = candidate_limit(page, page_size, candidates)
+    conditions = attribute_conditions(
+        ArticleChunk, publish_date_from, publish_date_to, content_vertical, content_type, tags
+    )
+
+    distance = ArticleChunk.embedding.cosine_distance(query_embedding)
+    candidates_stmt = select(
+        ArticleChunk.id,
+        ArticleChunk.article_id,
+        ArticleChunk.chunk_text,
+        ArticleChunk.token_size,
+        distance.label("distance"),
+    )
+    if conditions:
+        candidates_stmt = candidates_stmt.where(and_(*conditions))
+    exact_nearest = candidates_stmt.order_by(exact_order(distance)).limit(limit)
+
+    if not conditions and not within_ann_limit(limit):
+        # Deeper than an HNSW scan can reach
+        nearest, exact = exact_nearest, True
+    elif not conditions and settings.VECTOR_SEARCH_QUANTIZATION != "none":
+        # Shortlist on the smaller index, then rank the candidates exactly
+        size = min(max(limit, settings.VECTOR_SEARCH_RERANK_CANDIDATES), settings.HNSW_EF_SEARCH_MAX)
+        await set_hnsw_ef_search(db, size)
+        shortlist = quantized_shortlist(ArticleChunk, query_embedding, settings.VECTOR_SEARCH_QUANTIZATION, size)
+        nearest = candidates_stmt.where(ArticleChunk.id.in_(shortlist)).order_by(exact_order(distance)).limit(limit)
+        exact = False
+    elif not conditions:
+        await set_hnsw_ef_search(db, limit)
+        nearest, exact = candidates_stmt.order_by(distance).limit(limit), False
+    elif use_exact_search(conditions, await count_up_to(db, ArticleChunk, conditions)):
+        nearest, exact = exact_nearest, True
+    else:
+        await configure_filtered_ann_scan(db, limit)
+        nearest, exact = candidates_stmt.order_by(distance).limit(limit), False
+
+    # Pagination offset
+    offset = (page - 1) * page_size
+
+    rows, total_count, found = await chunk_groups_page(
+        db, nearest, score, chunks_per_article, offset, page_size
+    )
+    if not exact and len(rows) < page_size and found < limit:
+        # The index scan returned fewer candidates than asked for; the page
+        # may be short only because of that, so rank the candidates exactly
+        rows, total_count, _ = await chunk_groups_page(
+            db, exact_nearest, score, chunks_per_article, offset, page_size
+        )
+
+    items = [
+        ArticleChunkGroupResult(
+            article=ArticleResponse.from_orm(article),
+            distance=article_distance,
+            chunks=chunks,
+        )
+        for (article, article_distance, chunks, _) in rows
+    ]
+
+    return {
+        "items": items,
+        "total": total_count,
+        "page": page,
+        "page_size": page_size,
+    }
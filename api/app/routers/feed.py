@@ -0,0 +1,70 @@
+"""
+feed.py
+-------
+Server-sent events stream of new articles and chunks (see core/events.py).
+Replaces polling the article list: one long-lived request per dashboard
+instead of a COUNT plus a page query every few seconds.
+"""
+
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from ..config import settings
+from ..core import events
+
+router = APIRouter()
+
+
+def format_event(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@router.get("/stream")
+async def stream_feed(
+    types: Optional[str] = Query(
+        "article,chunk",
+        description="Comma-separated event types to receive: article, chunk",
+    ),
+):
+    """
+    Streams `article` and `chunk` events as rows are inserted
+    (text/event-stream). The data is the same JSON as the list endpoints
+    return. A `reset` event means events may have been missed (the worker
+    reconnected to the database, or the client fell behind), so the client
+    should reload its first page.
+    """
+    requested = {t.strip() for t in types.split(",") if t.strip()}
+    unknown = requested - set(events.EVENT_TYPES.values())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown event types: {', '.join(sorted(unknown))}")
+    if not requested:
+        raise HTTPException(status_code=400, detail="No event types requested")
+
+    subscriber = events.subscribe(requested)
+
+    async def stream():
+        try:
+            # Tells EventSource how long to wait before reconnecting (ms)
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=settings.LIVE_FEED_HEARTBEAT_S
+                    )
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_event(event, data)
+        finally:
+            # Runs when the client disconnects and Starlette cancels the stream
+            events.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
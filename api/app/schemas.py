@@ -4,7 +4,7 @@ schemas.py
 Defines Pydantic models (schemas) for request and response validation.
 """
 
-from typing import Optional, List
+from typing import Any, Dict, List, Optional, Union
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -33,6 +33,8 @@ class ArticleCreate(BaseModel):
 
 class ArticleResponse(ArticleCreate):
     id: int
+    # Only with ?include_embedding=float32|float16 (see core/vector_codec.py)
+    embedding_b64: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -68,6 +70,45 @@ class PaginatedArticleSearchResults(BaseModel):
     total: int
     page: int
     page_size: int
+
+
+class SimilarArticles(BaseModel):
+    """
+    Articles nearest to a stored article. `source` is "precomputed" when served
+    from article_neighbors, "live" when computed with an ANN query.
+    """
+    article_id: int
+    source: str
+    items: List[ArticleSearchResult]
+
+
+class ArticleChunkMatch(BaseModel):
+    """
+    A chunk of an article that matched a chunk-level similarity search.
+    """
+    id: int
+    chunk_text: str
+    token_size: int
+    distance: float
+
+
+class ArticleChunkGroupResult(BaseModel):
+    """
+    An article ranked by its chunk distances, with its best-matching chunks.
+    """
+    article: ArticleResponse
+    distance: float
+    chunks: List[ArticleChunkMatch]
+
+
+class PaginatedArticleChunkGroupResults(BaseModel):
+    """
+    `total` is the number of distinct articles in the ANN candidate set.
+    """
+    items: List[ArticleChunkGroupResult]
+    total: int
+    page: int
+    page_size: int
 """
 ------------------------------------------------------------------------------
     article_chunks
@@ -85,9 +126,11 @@ class ArticleChunkCreate(BaseModel):
 class ArticleChunkResponse(ArticleChunkCreate):
     """
     Schema for reading article chunk data.
-    Includes the ID and possibly the embedding if you want to expose it.
+    Includes the ID and, with ?include_embedding=, the embedding as base64
+    (see core/vector_codec.py).
     """
     id: int
+    embedding_b64: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -120,9 +163,69 @@ class ArticleChunkSearchResponse(BaseModel):
     class Config:
         orm_mode = True
 
+class SimilarArticleChunks(BaseModel):
+    """
+    Chunks of other articles nearest to a stored chunk (see SimilarArticles).
+    """
+    chunk_id: int
+    source: str
+    items: List[ArticleChunkSearchResult]
+
 class PaginatedArticleChunkSearchResults(BaseModel):
 
     items: List[ArticleChunkSearchResult]
     total: int
     page: int
-    page_size: int
\ No newline at end of file
+    page_size: int
+
+
+"""
+------------------------------------------------------------------------------
+    admin
+------------------------------------------------------------------------------
+"""
+
+class SlowQueryEntry(BaseModel):
+    """
+    A statement recorded by the slow-query log.
+    `parameters` holds the shapes of the bound parameters, never their values.
+    """
+    recorded_at: datetime
+    duration_ms: float
+    statement: str
+    parameters: Union[List[str], Dict[str, str], str]
+    executemany: bool = False
+    plan: Optional[Any] = None
+    plan_error: Optional[str] = None
+
+class SlowQueryLog(BaseModel):
+    enabled: bool
+    threshold_ms: Optional[float] = None
+    items: List[SlowQueryEntry]
+
+class StartupStats(BaseModel):
+    pid: int
+    import_s: Optional[float] = None
+    lifespan_s: Optional[float] = None
+    ready_s: Optional[float] = None
+    first_response_s: Optional[float] = None
+    warmed_connections: int = 0
+    prewarmed_indexes: List[str] = []
+
+class CancellationStats(BaseModel):
+    pid: int
+    statement_timeout_ms: int
+    disconnects: int
+    backend_cancels: int
+    statement_timeouts: int
+
+class VectorIndexTableStats(BaseModel):
+    rows: int
+    watermark: int
+    segments: int
+    version: Optional[int] = None
+    dtype: str
+
+class VectorIndexStats(BaseModel):
+    enabled: bool
+    tables: Dict[str, VectorIndexTableStats] = {}
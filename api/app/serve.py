@@ -0,0 +1,31 @@
+"""
+serve.py
+--------
+Production entry point: runs uvicorn with multiple worker processes.
+
+    python -m app.serve
+
+Each worker imports the app on its own and builds its database pool and
+external clients lazily in the lifespan, so nothing is shared across processes.
+Configure with HOST, PORT and WEB_CONCURRENCY (defaults to the CPU count).
+"""
+
+import uvicorn
+
+from .config import settings
+
+
+def main() -> None:
+    uvicorn.run(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=settings.WEB_CONCURRENCY,
+        proxy_headers=True,
+        lifespan="on",
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+cold_start.py
+-------------
+Measures cold start: the wall time from spawning a server process to its first
+200 response on a real endpoint, repeated a few times.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.cold_start --runs 5 --workers 2
+
+By default the production entry point (`python -m app.serve`) is started;
+`--command` runs anything else (e.g. a plain single-process uvicorn) instead.
+"""
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def wait_for_200(url: str, timeout_s: float) -> float:
+    """Polls `url` until it answers 200; returns the elapsed seconds."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout_s:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"No 200 from {url} within {timeout_s}s")
+
+
+def measure_once(command: list, url: str, env: dict, timeout_s: float) -> float:
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return wait_for_200(url, timeout_s)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Measure API cold start to first 200.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2, help="WEB_CONCURRENCY for app.serve")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/articles/?page_size=1", help="Endpoint that must answer 200")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--command", default=None, help="Server command to run instead of app.serve")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, PORT=str(args.port), HOST="127.0.0.1", WEB_CONCURRENCY=str(args.workers))
+    command = args.command.split() if args.command else [sys.executable, "-m", "app.serve"]
+    url = f"http://127.0.0.1:{args.port}{args.path}"
+
+    samples = [measure_once(command, url, env, args.timeout) for _ in range(args.runs)]
+    report = {
+        "command": " ".join(command),
+        "workers": args.workers,
+        "path": args.path,
+        "runs": args.runs,
+        "samples_s": [round(s, 3) for s in samples],
+        "median_s": round(statistics.median(samples), 3),
+        "min_s": round(min(samples), 3),
+        "max_s": round(max(samples), 3),
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
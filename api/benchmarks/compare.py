@@ -0,0 +1,42 @@
+"""
+compare.py
+----------
+Compares two benchmark reports written by `benchmarks.run`.
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+
+import json
+import sys
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_rps"]
+
+
+def compare(before: dict, after: dict) -> list:
+    rows = []
+    for name, new in after["endpoints"].items():
+        old = before["endpoints"].get(name)
+        if old is None:
+            continue
+        row = {"endpoint": name}
+        for metric in METRICS:
+            if metric in old and metric in new and old[metric]:
+                row[metric] = (old[metric], new[metric], (new[metric] - old[metric]) / old[metric] * 100.0)
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m benchmarks.compare BEFORE.json AFTER.json")
+    with open(sys.argv[1]) as f:
+        before = json.load(f)
+    with open(sys.argv[2]) as f:
+        after = json.load(f)
+    for row in compare(before, after):
+        cells = [f"{row['endpoint']:>24}"]
+        for metric in METRICS:
+            if metric in row:
+                old, new, pct = row[metric]
+                cells.append(f"{metric}: {old} -> {new} ({pct:+.1f}%)")
+        print("  ".join(cells))
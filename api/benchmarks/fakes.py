@@ -0,0 +1,76 @@
+"""
+fakes.py
+--------
+Stand-ins for the external services the API talks to, so benchmarks measure
+the API and the database rather than OpenAI or S3 round-trips.
+
+- FakeEmbeddingsClient mimics `AsyncOpenAI().embeddings.create(...)` and
+  returns deterministic unit vectors derived from the input text.
+- FilesystemS3Client mimics the subset of the boto3 S3 client the API uses and
+  serves objects from a local directory laid out as <root>/<bucket>/<key>.
+"""
+
+import hashlib
+import io
+import os
+from types import SimpleNamespace
+from typing import List, Union
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+EMBEDDING_DIM = 1536
+
+
+def text_to_embedding(text: str, dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Returns a deterministic, L2-normalized float32 vector for the text."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class _FakeEmbeddings:
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+
+    async def create(self, input: Union[str, List[str]], model: str, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        data = [
+            SimpleNamespace(index=i, embedding=text_to_embedding(text, self.dim).tolist())
+            for i, text in enumerate(texts)
+        ]
+        return SimpleNamespace(data=data, model=model)
+
+
+class FakeEmbeddingsClient:
+    """Drop-in replacement for `openai.AsyncOpenAI` limited to `embeddings.create`."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM) -> None:
+        self.embeddings = _FakeEmbeddings(dim)
+
+
+class FilesystemS3Client:
+    """Serves `get_object`/`put_object` from a local directory."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def _path(self, bucket: str, key: str) -> str:
+        return os.path.join(self.root, bucket, key)
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(Body)
+        return {}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> dict:
+        path = self._path(Bucket, Key)
+        if not os.path.exists(path):
+            raise ClientError(
+                {"Error": {"Code": "NoSuchKey", "Message": f"{Key} not found"}},
+                "GetObject",
+            )
+        with open(path, "rb") as f:
+            return {"Body": io.BytesIO(f.read())}
@@ -0,0 +1,152 @@
+"""
+seed.py
+-------
+Seeds a local Postgres/pgvector database with a synthetic corpus for the
+benchmark suite: articles, article chunks and their embeddings, plus gzipped
+article bodies written to the filesystem S3 stand-in.
+
+Embeddings are drawn around a fixed number of random "topic" centroids so
+similarity searches behave like they would on real clustered data rather than
+on uniform noise.
+
+Rows are loaded with binary COPY; embeddings go in as NumPy arrays through
+the engine's binary vector codec (app/core/vector_codec.py).
+"""
+
+import gzip
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+from .fakes import EMBEDDING_DIM, FilesystemS3Client
+
+VERTICALS = ["markets", "policy", "tech", "finance", "business", "web3"]
+TAGS = ["bitcoin", "ethereum", "solana", "etf", "regulation", "defi", "stablecoins", "mining"]
+WORDS = (
+    "bitcoin ether price market rally crash exchange regulator token stablecoin "
+    "etf fund trader miner protocol network fee yield lending bank reserve"
+).split()
+S3_BUCKET = "bench-articles"
+
+
+@dataclass
+class CorpusConfig:
+    articles: int = 2000
+    chunks_per_article: int = 8
+    topics: int = 64
+    days: int = 365
+    noise: float = 0.8
+    seed: int = 42
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=-1, keepdims=True)
+
+
+def _shorten(vector: np.ndarray, dims: int = 256) -> np.ndarray:
+    """Matryoshka shortening, as stored in embedding_short."""
+    return _normalize(vector[:dims])
+
+
+def _sentence(rng: np.random.Generator, words: int) -> str:
+    return " ".join(rng.choice(WORDS, size=words)).capitalize() + "."
+
+
+def build_corpus(config: CorpusConfig):
+    """
+    Generates article rows, chunk rows and article bodies in memory.
+
+    Returns:
+        tuple: (articles, chunks, bodies) where bodies maps S3 keys to text.
+    """
+    rng = np.random.default_rng(config.seed)
+    centroids = _normalize(rng.standard_normal((config.topics, EMBEDDING_DIM)).astype(np.float32))
+    now = datetime(2025, 6, 1)
+
+    articles, chunks, bodies = [], [], {}
+    for article_id in range(1, config.articles + 1):
+        topic = int(rng.integers(config.topics))
+        noise = rng.standard_normal((config.chunks_per_article, EMBEDDING_DIM)).astype(np.float32)
+        chunk_vectors = _normalize(centroids[topic] + config.noise * noise / np.sqrt(EMBEDDING_DIM))
+        article_vector = _normalize(chunk_vectors.mean(axis=0))
+        chunk_texts = [_sentence(rng, int(rng.integers(30, 80))) for _ in range(config.chunks_per_article)]
+
+        publish = now - timedelta(minutes=int(rng.integers(config.days * 24 * 60)))
+        key = f"coindesk/{publish:%Y/%m/%d}/bench_article_{article_id}.txt.gz"
+        bodies[key] = " ".join(chunk_texts)
+        title = _sentence(rng, 8)
+        articles.append({
+            "id": article_id,
+            "display_datetime": publish,
+            "last_modified_datetime": publish + timedelta(hours=1),
+            "publish_datetime": publish,
+            "create_datetime": publish,
+            "content_vertical": VERTICALS[topic % len(VERTICALS)],
+            "og_description": _sentence(rng, 20),
+            "content_type": "article",
+            "page_url": f"https://www.coindesk.com/bench/{article_id}",
+            "og_title": title,
+            "content_title": title,
+            "og_site_name": "CoinDesk",
+            "tags": ",".join(rng.choice(TAGS, size=3, replace=False)),
+            "authors": f"Author {article_id % 50}",
+            "content_tier": "free",
+            "article_s3_url": f"s3://{S3_BUCKET}/{key}",
+            "embedding": article_vector,
+            "embedding_short": _shorten(article_vector),
+        })
+        for chunk_text, vector in zip(chunk_texts, chunk_vectors):
+            chunks.append({
+                "article_id": article_id,
+                "chunk_text": chunk_text,
+                "token_size": len(chunk_text.split()),
+                "embedding": vector,
+                "embedding_short": _shorten(vector),
+            })
+    return articles, chunks, bodies
+
+
+async def seed(engine, s3_root: str, config: CorpusConfig) -> dict:
+    """
+    Creates the schema if needed, truncates the tables and loads the synthetic
+    corpus with COPY. Only point this at a dedicated benchmark database.
+    Returns a summary of what was loaded.
+    """
+    from app.database import Base
+    from app import models  # noqa: F401  (register tables on Base.metadata)
+    from app.core.vector_codec import register_vector_codec
+
+    articles, chunks, bodies = build_corpus(config)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("TRUNCATE article_chunks, articles RESTART IDENTITY CASCADE"))
+
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        # The extension may have just been created on this connection
+        await driver.reload_schema_state()
+        await register_vector_codec(driver)
+        for table, rows in (("articles", articles), ("article_chunks", chunks)):
+            columns = list(rows[0].keys())
+            await driver.copy_records_to_table(
+                table, records=[tuple(row[c] for c in columns) for row in rows], columns=columns
+            )
+        await conn.execute(text("SELECT setval('articles_id_seq', (SELECT MAX(id) FROM articles))"))
+        await conn.execute(text("ANALYZE articles"))
+        await conn.execute(text("ANALYZE article_chunks"))
+
+    s3 = FilesystemS3Client(s3_root)
+    for key, body in bodies.items():
+        s3.put_object(Bucket=S3_BUCKET, Key=key, Body=gzip.compress(body.encode("utf-8")))
+
+    return {
+        "articles": len(articles),
+        "chunks": len(chunks),
+        "s3_objects": len(bodies),
+        "s3_root": os.path.abspath(s3_root),
+    }
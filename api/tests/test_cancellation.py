@@ -0,0 +1,101 @@
+# tests/test_cancellation.py
+import asyncio
+
+from app.core import cancellation
+from app.core.cancellation import CancelOnDisconnect, _request_backends, stats
+
+PATHS = r"^/articles/search_by_similarity$"
+
+
+def _run(path, disconnect_after=None):
+    """
+    Runs one GET through CancelOnDisconnect, the client disconnecting after
+    `disconnect_after` seconds (or never). Returns (sent messages, handler state).
+    """
+    state = {"finished": False, "cancelled": False}
+
+    async def handler(scope, receive, send):
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        state["finished"] = True
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def main():
+        sent = []
+
+        async def receive():
+            if disconnect_after is None:
+                await asyncio.Event().wait()
+            await asyncio.sleep(disconnect_after)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+        await asyncio.wait_for(CancelOnDisconnect(handler, PATHS)(scope, receive, send), timeout=1)
+        return sent
+
+    return asyncio.run(main()), state
+
+
+def test_disconnect_cancels_matching_handler():
+    before = stats["disconnects"]
+    sent, state = _run("/articles/search_by_similarity", 0.01)
+    assert sent == []
+    assert state == {"finished": False, "cancelled": True}
+    assert stats["disconnects"] == before + 1
+
+
+def test_connected_client_gets_the_response():
+    sent, state = _run("/articles/search_by_similarity")
+    assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+    assert state["finished"]
+
+
+def test_other_paths_are_not_watched():
+    # The disconnect is never read, so the handler runs to completion
+    sent, state = _run("/articles/", 0.01)
+    assert state == {"finished": True, "cancelled": False}
+    assert len(sent) == 2
+
+
+
+def test_backends_are_cancelled_before_the_handler(monkeypatch):
+    # Once cancelled, the handler gives its connection back to the pool, where
+    # another request's query may already be running on the same backend
+    cancelled = []
+    checked_out = set()
+
+    async def handler(scope, receive, send):
+        backends = _request_backends.get()
+        backends.add(4242)
+        checked_out.add(4242)
+        try:
+            await asyncio.sleep(1)
+        finally:
+            backends.discard(4242)
+            checked_out.discard(4242)
+
+    async def cancel_backends(backends):
+        await asyncio.sleep(0)  # connecting the control connection
+        cancelled.extend(pid for pid in backends if pid in checked_out)
+
+    async def main():
+        async def receive():
+            await asyncio.sleep(0.01)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            pass
+
+        scope = {"type": "http", "method": "GET", "path": "/articles/search_by_similarity", "headers": []}
+        await asyncio.wait_for(CancelOnDisconnect(handler, PATHS)(scope, receive, send), timeout=1)
+
+    monkeypatch.setattr(cancellation, "_cancel_backends", cancel_backends)
+    asyncio.run(main())
+    assert cancelled == [4242]
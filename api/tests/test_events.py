@@ -0,0 +1,43 @@
+# tests/test_events.py
+import json
+
+from app.core.events import Broadcaster, parse_notifications
+
+
+def _drain(subscriber):
+    items = []
+    while not subscriber.queue.empty():
+        items.append(subscriber.queue.get_nowait())
+    return items
+
+
+def test_publish_filters_by_type_and_resets_slow_subscribers():
+    broadcaster = Broadcaster(queue_size=2)
+    everything = broadcaster.add({"article", "chunk"})
+    articles_only = broadcaster.add({"article"})
+
+    broadcaster.publish("article", '{"id": 1}')
+    broadcaster.publish("chunk", '{"id": 10}')
+    assert _drain(everything) == [("article", '{"id": 1}'), ("chunk", '{"id": 10}')]
+    assert _drain(articles_only) == [("article", '{"id": 1}')]
+
+    for i in range(3):
+        broadcaster.publish("chunk", json.dumps({"id": i}))
+    # The third event overflowed the queue: the backlog is replaced by a reset
+    assert _drain(everything) == [("reset", "{}")]
+    assert broadcaster.resets == 1
+
+    broadcaster.remove(everything)
+    broadcaster.publish("article", '{"id": 2}')
+    assert everything.queue.empty()
+
+
+def test_parse_notifications_groups_and_dedupes():
+    payloads = [
+        json.dumps({"table": "articles", "id": 5, "article_id": 5}),
+        json.dumps({"table": "article_chunks", "id": 7, "article_id": 5}),
+        json.dumps({"table": "article_chunks", "id": 7, "article_id": 5}),
+        json.dumps({"table": "sentiment", "id": 1}),
+        "not json",
+    ]
+    assert parse_notifications(payloads) == {"articles": [5], "article_chunks": [7]}
@@ -1,10 +1,34 @@
 # tests/test_articles.py
+from types import SimpleNamespace
+
 from fastapi.testclient import TestClient
+from app.database import get_db
 from app.main import app
 
 client = TestClient(app)
 
+
+class EmptySession:
+    """Stands in for the database session: a table with no rows."""
+
+    async def scalar(self, stmt):
+        return 0
+
+    async def execute(self, stmt, params=None):
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: []))
+
+
+async def empty_db():
+    yield EmptySession()
+
+
 def test_get_articles():
-    response = client.get("/articles/")
+    app.dependency_overrides[get_db] = empty_db
+    try:
+        response = client.get("/articles/")
+    finally:
+        app.dependency_overrides.pop(get_db, None)
     assert response.status_code == 200
-    assert isinstance(response.json(), list)
+    body = response.json()
+    assert body["items"] == []
+    assert {"total", "page", "page_size"} <= body.keys()
@@ -0,0 +1,31 @@
+# tests/test_export.py
+import csv
+import io
+import json
+from datetime import datetime
+
+from app.core.export import encode_csv, encode_ndjson
+
+FIELDS = ["id", "publish_datetime", "og_title"]
+ROWS = [
+    (1, datetime(2025, 1, 2, 3, 4), 'ETF "approved", finally', "[0.5,-0.25]"),
+    (2, None, "no embedding yet", None),
+]
+
+
+def test_ndjson_passes_vector_text_through_as_json_array():
+    lines = encode_ndjson(ROWS, FIELDS, include_embedding=True).splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": 1, "publish_datetime": "2025-01-02T03:04:00", "og_title": 'ETF "approved", finally', "embedding": [0.5, -0.25]},
+        {"id": 2, "publish_datetime": None, "og_title": "no embedding yet", "embedding": None},
+    ]
+    assert encode_ndjson([], FIELDS, include_embedding=True) == ""
+
+
+def test_csv_quotes_fields_and_formats_datetimes():
+    text = encode_csv([], FIELDS + ["embedding"]) + encode_csv(ROWS)
+    assert list(csv.reader(io.StringIO(text))) == [
+        ["id", "publish_datetime", "og_title", "embedding"],
+        ["1", "2025-01-02T03:04:00", 'ETF "approved", finally', "[0.5,-0.25]"],
+        ["2", "", "no embedding yet", ""],
+    ]
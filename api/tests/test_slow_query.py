@@ -0,0 +1,45 @@
+# tests/test_slow_query.py
+import json
+
+from app.core.slow_query import SlowQueryRecorder, describe_parameters, is_read_only
+
+
+def test_vector_parameters_are_reduced_to_their_dimension():
+    vector_literal = "[" + ",".join(["0.1"] * 1536) + "]"
+    shapes = describe_parameters((vector_literal, 10, "markets", None, [0.5] * 256))
+    assert shapes == ["vector(1536)", "int", "str(len=7)", "null", "vector(256)"]
+
+
+def test_only_read_only_statements_are_explained():
+    assert is_read_only("SELECT id FROM articles WHERE id = $1")
+    assert is_read_only("  with c as (select 1) select * from c")
+    assert not is_read_only("INSERT INTO articles (page_url) VALUES ($1)")
+    assert not is_read_only("WITH d AS (DELETE FROM articles RETURNING id) SELECT * FROM d")
+
+
+def test_ring_buffer_and_jsonl_output(tmp_path):
+    log_path = tmp_path / "slow.jsonl"
+    recorder = SlowQueryRecorder(threshold_ms=1, buffer_size=2, explain=False, log_path=str(log_path))
+    for i in range(3):
+        recorder.record(f"SELECT {i}", ("[1.0,2.0]",), duration_ms=10 + i)
+
+    entries = recorder.entries()
+    assert [e["statement"] for e in entries] == ["SELECT 2", "SELECT 1"]
+    assert entries[0]["parameters"] == ["vector(2)"]
+
+    lines = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert len(lines) == 3
+    assert "1.0" not in log_path.read_text()
+
+
+def test_explain_cooldowns_are_bounded():
+    recorder = SlowQueryRecorder(threshold_ms=1, buffer_size=3, explain_cooldown_s=60)
+    recorder._engine = object()  # as if attached
+    for i in range(10):
+        assert recorder._should_explain(f"SELECT {i}", executemany=False)
+    assert list(recorder._last_explained) == ["SELECT 7", "SELECT 8", "SELECT 9"]
+    assert not recorder._should_explain("SELECT 9", executemany=False)
+
+    recorder.explain_cooldown_s = 0
+    assert recorder._should_explain("SELECT 9", executemany=False)
+    assert len(recorder._last_explained) == 0
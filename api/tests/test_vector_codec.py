@@ -0,0 +1,54 @@
+# tests/test_vector_codec.py
+import struct
+
+import numpy as np
+import pytest
+
+from pgvector import Vector
+
+from app.core.vector_codec import (
+    decode_base64,
+    decode_batch,
+    encode_base64,
+    encode_batch,
+    from_vector_binary,
+    from_vector_send,
+    to_vector_binary,
+)
+
+
+def test_base64_round_trip():
+    vector = np.random.default_rng(0).standard_normal(1536).astype(np.float32)
+    assert np.array_equal(decode_base64(encode_base64(vector, "float32"), "float32"), vector)
+    half = decode_base64(encode_base64(vector.tolist(), "float16"), "float16")
+    assert half.dtype == np.float16 and np.allclose(half, vector, atol=1e-2)
+    assert encode_base64(None, "float32") is None
+
+
+def test_batch_round_trip_and_vector_send_decoding():
+    vectors = np.arange(12, dtype=np.float32).reshape(3, 4)
+    # pgvector's binary form: int16 dims, int16 unused, big-endian float4
+    raw = [struct.pack(">hh", 4, 0) + row.astype(">f4").tobytes() for row in vectors]
+    decoded = np.stack([from_vector_send(r) for r in raw])
+    assert np.array_equal(decoded, vectors)
+
+    for dtype in ("float32", "float16"):
+        ids, matrix = decode_batch(encode_batch([7, 3, 9], decoded, dtype))
+        assert ids.tolist() == [7, 3, 9]
+        assert np.array_equal(matrix.astype(np.float32), vectors)
+
+    ids, matrix = decode_batch(encode_batch([], np.empty((0, 0)), "float32"))
+    assert len(ids) == 0 and matrix.shape == (0, 0)
+    with pytest.raises(ValueError):
+        decode_batch(b"JUNK" + bytes(12))
+
+
+def test_vector_binary_matches_pgvector():
+    vector = np.random.default_rng(1).standard_normal(1536).astype(np.float32)
+    raw = Vector(vector).to_binary()
+    for value in (vector, vector.tolist(), Vector(vector), Vector(vector).to_text()):
+        assert to_vector_binary(value) == raw
+    decoded = from_vector_binary(raw)
+    assert decoded.dtype == np.float32 and np.array_equal(decoded, vector)
+    with pytest.raises(ValueError):
+        to_vector_binary(np.zeros((2, 3)))
@@ -0,0 +1,85 @@
+# tests/test_vector_index.py
+import asyncio
+import contextlib
+
+import numpy as np
+
+from app.core import vector_index
+from app.core.vector_index import VectorSnapshot, normalize_rows
+
+
+def _brute_force(vectors, ids, query, k):
+    scores = normalize_rows(vectors) @ (query / np.linalg.norm(query))
+    order = np.argsort(-scores)[:k]
+    return [int(i) for i in ids[order]]
+
+
+def test_blocked_search_matches_brute_force_across_segments(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((1000, 32)).astype(np.float32)
+    ids = np.arange(1, 1001, dtype=np.int64)
+    snapshot = VectorSnapshot(str(tmp_path), "article_chunks", dtype="float32", block_rows=64)
+    snapshot.append(ids[:600], vectors[:600])
+    snapshot.append(ids[600:], vectors[600:])
+
+    query = rng.standard_normal(32).astype(np.float32)
+    matches = snapshot.search(query, 10)
+    assert [i for i, _ in matches] == _brute_force(vectors, ids, query, 10)
+    distances = [d for _, d in matches]
+    assert distances == sorted(distances)
+
+
+def test_other_workers_see_appends_and_compaction(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((300, 16)).astype(np.float32)
+    writer = VectorSnapshot(str(tmp_path), "articles", dtype="float16")
+    reader = VectorSnapshot(str(tmp_path), "articles", dtype="float16")
+    assert not reader.load()
+
+    for start in range(0, 300, 100):
+        writer.append(np.arange(start + 1, start + 101), vectors[start:start + 100])
+    assert reader.load()
+    assert (reader.size, reader.watermark, len(reader.segments)) == (300, 300, 3)
+
+    writer.compact()
+    assert reader.load()
+    assert (reader.size, len(reader.segments)) == (300, 1)
+    # float16 storage: same top hit as the float32 brute force
+    query = vectors[42]
+    assert reader.search(query, 1)[0][0] == 43
+
+
+def test_rows_embedded_below_the_watermark_are_appended(tmp_path, monkeypatch):
+    rng = np.random.default_rng(2)
+    table = {i: None for i in range(1, 11)}
+    for i in (1, 2, 3, 6, 7, 8):
+        table[i] = rng.standard_normal(8).astype(np.float32)
+
+    # In-memory stand-ins for the three reads refresh() makes
+    async def embedded_above(db, model, watermark, limit):
+        return [(i, v) for i, v in sorted(table.items()) if i > watermark and v is not None][:limit]
+
+    async def embedded_ids(db, model, watermark):
+        return np.array([i for i, v in table.items() if i <= watermark and v is not None], dtype=np.int64)
+
+    async def embedded_rows(db, model, ids):
+        return [(i, table[i]) for i in sorted(ids) if table[i] is not None]
+
+    monkeypatch.setattr(vector_index, "_embedded_above", embedded_above)
+    monkeypatch.setattr(vector_index, "_embedded_ids", embedded_ids)
+    monkeypatch.setattr(vector_index, "_embedded_rows", embedded_rows)
+    monkeypatch.setattr("app.database.AsyncSessionLocal", lambda: contextlib.nullcontext(None))
+
+    snapshot = VectorSnapshot(str(tmp_path), "articles")
+    assert asyncio.run(vector_index.refresh(snapshot, None, batch_size=4)) == 6
+    assert (snapshot.size, snapshot.watermark) == (6, 8)
+
+    # 4 is embedded after 8 has been indexed; 10 arrives in the normal way
+    table[4] = rng.standard_normal(8).astype(np.float32)
+    table[10] = rng.standard_normal(8).astype(np.float32)
+    assert asyncio.run(vector_index.refresh(snapshot, None, batch_size=4)) == 2
+    assert (snapshot.size, snapshot.watermark) == (8, 10)
+    assert snapshot.search(table[4], 1)[0][0] == 4
+
+    # Nothing new: nothing appended
+    assert asyncio.run(vector_index.refresh(snapshot, None, batch_size=4)) == 0
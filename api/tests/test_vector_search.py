@@ -0,0 +1,69 @@
+# tests/test_vector_search.py
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.config import settings
+from app.core.vector_search import (
+    attribute_conditions,
+    binary_quantize,
+    candidate_limit,
+    expected_rows,
+    quantized_shortlist,
+    shorten_embedding,
+    use_exact_search,
+    within_ann_limit,
+)
+from app.models import ArticleChunk
+
+
+def test_candidate_limit_grows_with_page_depth():
+    assert candidate_limit(page=1, page_size=10, candidates=200) == 200
+    assert candidate_limit(page=10, page_size=10, candidates=200) == 400
+
+
+def test_deep_pages_are_beyond_the_ann_limit():
+    assert within_ann_limit(settings.HNSW_EF_SEARCH_MAX)
+    assert not within_ann_limit(settings.HNSW_EF_SEARCH_MAX + 1)
+    # Deep pages ask for every candidate they need; they are then ranked exactly
+    assert candidate_limit(page=100, page_size=100, candidates=200) == 40000
+    assert not within_ann_limit(candidate_limit(page=100, page_size=100, candidates=200))
+
+
+def test_selective_filters_use_exact_search():
+    conditions = attribute_conditions(ArticleChunk, content_vertical="markets")
+    assert use_exact_search(conditions, settings.VECTOR_SEARCH_EXACT_THRESHOLD)
+    assert not use_exact_search(conditions, settings.VECTOR_SEARCH_EXACT_THRESHOLD + 1)
+    # Unfiltered searches always go through the ANN index
+    assert not use_exact_search([], 10)
+
+
+def test_vertical_filter_is_inlined_for_partial_indexes():
+    conditions = attribute_conditions(ArticleChunk, content_vertical="markets", content_type="article")
+    sql = str(
+        select(ArticleChunk.id).where(*conditions).compile(
+            dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True}
+        )
+    )
+    assert "content_vertical = 'markets'" in sql
+    assert "content_type = %(content_type_1)s" in sql
+
+
+def test_expected_rows_on_last_page():
+    assert expected_rows(total=45, offset=40, page_size=10) == 5
+    assert expected_rows(total=45, offset=50, page_size=10) == 0
+
+
+def test_binary_quantize_sets_bits_for_positive_components():
+    assert binary_quantize([0.3, -0.1, 0.0, 2.0]) == "1001"
+
+
+def test_quantized_shortlist_uses_the_indexed_expressions():
+    halfvec = str(quantized_shortlist(ArticleChunk, [0.1, -0.2], "halfvec", 400).compile(dialect=postgresql.dialect()))
+    bit = str(quantized_shortlist(ArticleChunk, [0.1, -0.2], "bit", 400).compile(dialect=postgresql.dialect()))
+    assert "CAST(article_chunks.embedding AS HALFVEC(1536)) <=>" in halfvec
+    assert "CAST(binary_quantize(article_chunks.embedding) AS BIT(1536)) <~>" in bit
+
+
+def test_shorten_embedding_truncates_and_renormalizes():
+    short = shorten_embedding([3.0, 4.0, 12.0], dims=2)
+    assert short == [0.6, 0.8]
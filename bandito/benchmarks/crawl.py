@@ -0,0 +1,391 @@
+"""
+crawl.py
+--------
+End-to-end crawl benchmark: runs the async producer (AsyncSitemapCrawler)
+and the async consumer (ArticleConsumer) in one process against a replay
+server (replay_server.py) serving a fixture store (fixtures.py), with an
+in-memory queue and a filesystem S3 stand-in (fakes.py) and a local
+PostgreSQL.
+
+    cd bandito
+    POSTGRES_HOST=localhost POSTGRES_DB=bandito_bench POSTGRES_USER=... POSTGRES_PASSWORD=... \\
+        python benchmarks/crawl.py fixtures/coindesk --latency-ms 150 --error-rate 0.01 --rate 0
+
+The producer runs --cycles cycles over the recorded sitemap pages (the first
+is a full sweep) and the consumer processes every published link. The run
+ends when the queue is drained and the last batch is written. The report
+gives articles/s, sitemap pages/s, response counts by status and, per stage
+(fetch, parse, database, S3, queue wait), the number of calls and the time
+spent in them, summed over concurrent tasks.
+
+Requests are spaced at a fixed --rate per domain (0: unlimited). With
+--adaptive, the producer and the consumer use the shared, adaptive limiter
+instead (SharedRateLimiter, each with its own connection as separate
+processes would), starting at --rate, and the report has the final rates.
+
+The crawl state of the recorded URLs (articles, crawl_frontier, sitemap_pages
+and domain_rate_limits rows) is deleted before the run unless --keep-state is given,
+so point POSTGRES_* at a benchmark database. Concurrency, batch size and
+parse workers come from the same environment variables as the services
+(PRODUCER_CONCURRENCY, CONSUMER_CONCURRENCY, CONSUMER_BATCH_SIZE, ...).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+# The producer keeps its URL filter snapshot here; don't leave it in the working directory
+os.environ.setdefault("URL_FILTER_PATH", os.path.join(tempfile.gettempdir(), "bandito_bench_url_filter.bloom"))
+
+import httpx  # noqa: E402
+
+import async_consumer  # noqa: E402
+import async_producer  # noqa: E402
+from async_consumer import ArticleConsumer  # noqa: E402
+from async_producer import AsyncSitemapCrawler  # noqa: E402
+from batching import ArticleBatchWriter  # noqa: E402
+from consumer import create_resources  # noqa: E402
+from fakes import FilesystemS3Client, MemoryQueue  # noqa: E402
+from fixtures import ARTICLE, SITEMAP_INDEX, SITEMAP_PAGE, FixtureStore  # noqa: E402
+from PGManager.PGManager import PGManager  # noqa: E402
+from producer import DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER  # noqa: E402
+from rate_limit import CRAWL_RATE_PER_DOMAIN, DomainRateLimiter, SharedRateLimiter  # noqa: E402
+from replay_server import ReplayServer, ReplayTransport  # noqa: E402
+
+
+class StageTimer:
+    """Call counts and seconds per stage, from any thread."""
+
+    def __init__(self) -> None:
+        self.seconds = defaultdict(float)
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, calls: int = 1) -> None:
+        with self._lock:
+            self.seconds[stage] += seconds
+            self.calls[stage] += calls
+
+    @contextmanager
+    def __call__(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def report(self) -> dict:
+        return {
+            stage: {
+                "calls": self.calls[stage],
+                "total_s": round(self.seconds[stage], 3),
+                "mean_ms": round(1000 * self.seconds[stage] / max(self.calls[stage], 1), 2),
+            }
+            for stage in sorted(self.seconds)
+        }
+
+
+class TimedParsePool(ProcessPoolExecutor):
+    """Process pool that times each task from submission to result."""
+
+    def __init__(self, timer: StageTimer, stage: str, max_workers: int) -> None:
+        super().__init__(max_workers=max_workers)
+        self.timer = timer
+        self.stage = stage
+
+    def submit(self, fn, *args, **kwargs):
+        started = time.perf_counter()
+        future = super().submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda _: self.timer.add(self.stage, time.perf_counter() - started))
+        return future
+
+
+class BenchmarkCrawler(AsyncSitemapCrawler):
+    """AsyncSitemapCrawler that times its stages and only follows recorded URLs."""
+
+    def __init__(self, *args, timer: StageTimer, store: FixtureStore) -> None:
+        self.timer = timer
+        self.store = store
+        super().__init__(*args)
+
+    async def fetch(self, url: str, headers: dict = None):
+        with self.timer("producer.fetch"):
+            return await super().fetch(url, headers)
+
+    async def run_db(self, fn, *args):
+        def timed():
+            with self.timer("producer.db"):
+                return fn(*args)
+        return await super().run_db(timed)
+
+    async def get_sitemap_links(self):
+        return [url for url in await super().get_sitemap_links() if url in self.store]
+
+    def select_links_to_push(self, links):
+        to_push = super().select_links_to_push(links)
+        return None if to_push is None else [url for url in to_push if url in self.store]
+
+    def select_due_links(self):
+        due = super().select_due_links()
+        return None if due is None else [url for url in due if url in self.store]
+
+
+class BenchmarkBatchWriter(ArticleBatchWriter):
+    def __init__(self, timer: StageTimer, *args) -> None:
+        super().__init__(*args)
+        self.timer = timer
+
+    async def flush(self) -> None:
+        if not self._rows:
+            return
+        with self.timer("consumer.db_write"):
+            await super().flush()
+
+
+class BenchmarkConsumer(ArticleConsumer):
+    """ArticleConsumer that times its stages."""
+
+    def __init__(self, *args, timer: StageTimer) -> None:
+        super().__init__(*args)
+        self.timer = timer
+        self.writer = BenchmarkBatchWriter(
+            timer, self.resources, async_consumer.CONSUMER_BATCH_SIZE, async_consumer.CONSUMER_BATCH_MAX_WAIT_S,
+            self.complete, self.frontier,
+        )
+
+    async def fetch(self, url: str):
+        with self.timer("consumer.fetch"):
+            return await super().fetch(url)
+
+    async def handle(self, message) -> None:
+        self.timer.add("consumer.queue_wait", time.monotonic() - message.published_at)
+        await super().handle(message)
+
+    def _article_exists(self, url: str) -> bool:
+        with self.timer("consumer.dedupe"):
+            return super()._article_exists(url)
+
+    def _upsert_frontier(self, rows: list) -> None:
+        with self.timer("consumer.frontier"):
+            super()._upsert_frontier(rows)
+
+
+def reset_state(store: FixtureStore) -> None:
+    """Delete the crawl state of the recorded URLs so they are crawled again."""
+    db = PGManager(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD)
+    db.connect()
+    try:
+        db.create_table_if_not_exists()
+        db.create_frontier_table_if_not_exists()
+        db.create_sitemap_table_if_not_exists()
+        db.create_rate_limit_table_if_not_exists()
+        articles = store.urls(ARTICLE)
+        domains = sorted({urlsplit(url).netloc for url in store.urls()})
+        # The index page is a sitemap page too, with its navigation state under "#index"
+        index_urls = store.urls(SITEMAP_INDEX)
+        sitemaps = store.urls(SITEMAP_PAGE) + index_urls + [f"{url}#index" for url in index_urls]
+        with db.conn.cursor() as cur:
+            cur.execute("DELETE FROM articles WHERE page_url = ANY(%s)", (articles,))
+            cur.execute("DELETE FROM crawl_frontier WHERE url = ANY(%s)", (articles,))
+            cur.execute("DELETE FROM sitemap_pages WHERE url = ANY(%s)", (sitemaps,))
+            cur.execute("DELETE FROM domain_rate_limits WHERE domain = ANY(%s)", (domains,))
+        db.conn.commit()
+    finally:
+        db.conn.close()
+
+
+async def consume(consumer: ArticleConsumer, queue: MemoryQueue, producer_done: asyncio.Event,
+                  stop: asyncio.Event) -> None:
+    """
+    The async consumer's delivery loop, fed from the memory queue. Returns once
+    the producer is done, the queue is drained and everything is written.
+    """
+    slots = asyncio.Semaphore(async_consumer.CONSUMER_CONCURRENCY)
+    in_flight = set()
+
+    async def handle(message):
+        try:
+            await consumer.handle(message)
+        finally:
+            slots.release()
+
+    while not stop.is_set():
+        if producer_done.is_set() and queue.empty() and not in_flight:
+            # Batches that fail to write are requeued
+            await consumer.writer.close()
+            if queue.empty():
+                break
+        await slots.acquire()
+        try:
+            message = await asyncio.wait_for(queue.get(), 0.1)
+        except asyncio.TimeoutError:
+            slots.release()
+            continue
+        consumer.acks.track(message)
+        task = asyncio.create_task(handle(message))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    await asyncio.gather(*in_flight, return_exceptions=True)
+    await consumer.writer.close()
+    await consumer.flush_frontier()
+
+
+async def run_benchmark(args) -> dict:
+    store = FixtureStore(args.root)
+    index_urls = store.urls(SITEMAP_INDEX)
+    if not index_urls:
+        sys.exit(f"No sitemap index recorded in {args.root}; record one with benchmarks/fixtures.py")
+    index = urlsplit(index_urls[0])
+    base_url, sitemap_start = f"{index.scheme}://{index.netloc}", index.path
+    if not args.keep_state:
+        await asyncio.to_thread(reset_state, store)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    server = ReplayServer(store, ("127.0.0.1", 0), args.latency_ms / 1000, args.jitter_ms / 1000,
+                          args.error_rate, args.throttle_rate, args.retry_after, args.seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    timer = StageTimer()
+    queue = MemoryQueue()
+    s3_root = args.s3_root or tempfile.mkdtemp(prefix="bandito_bench_s3_")
+    resources = await asyncio.to_thread(
+        create_resources, pool_max=async_consumer.CONSUMER_CONCURRENCY,
+        s3_pool_size=async_consumer.CONSUMER_CONCURRENCY,
+    )
+    resources.s3 = FilesystemS3Client(s3_root)
+
+    producer_limits = httpx.Limits(max_connections=async_producer.PRODUCER_CONCURRENCY)
+    consumer_limits = httpx.Limits(max_connections=async_consumer.CONSUMER_CONCURRENCY)
+    producer_http = httpx.AsyncClient(
+        transport=ReplayTransport(server.url, limits=producer_limits), timeout=async_producer.FETCH_TIMEOUT_S,
+        headers={"User-Agent": async_producer.USER_AGENT}, follow_redirects=True,
+    )
+    consumer_http = httpx.AsyncClient(
+        transport=ReplayTransport(server.url, retries=async_consumer.FETCH_RETRIES, limits=consumer_limits),
+        timeout=async_consumer.FETCH_TIMEOUT_S, headers={"User-Agent": async_consumer.USER_AGENT},
+        follow_redirects=True,
+    )
+    if args.adaptive:
+        limiters = [
+            await asyncio.to_thread(SharedRateLimiter, PGManager(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD),
+                                    args.rate)
+            for _ in range(2)
+        ]
+    else:
+        limiters = [DomainRateLimiter(args.rate), DomainRateLimiter(args.rate)]
+    producer_pool = TimedParsePool(timer, "producer.parse", async_producer.PRODUCER_PARSE_WORKERS)
+    consumer_pool = TimedParsePool(timer, "consumer.parse", async_consumer.CONSUMER_PARSE_WORKERS)
+    try:
+        crawler = await asyncio.to_thread(
+            BenchmarkCrawler, base_url, sitemap_start, producer_http, producer_pool,
+            limiters[0], queue, timer=timer, store=store,
+        )
+        consumer = BenchmarkConsumer(consumer_http, consumer_pool, limiters[1], resources, timer=timer)
+        producer_done = asyncio.Event()
+
+        async def produce():
+            try:
+                for _ in range(args.cycles):
+                    if stop.is_set():
+                        break
+                    full_sweep = crawler.start_cycle()
+                    await crawler.run_cycle(full_sweep, stop)
+                    await crawler.run_db(crawler.finish_cycle, full_sweep)
+                await crawler.run_db(crawler.frontier.flush, crawler.db)
+            finally:
+                producer_done.set()
+
+        started = time.monotonic()
+        writer_task = asyncio.create_task(consumer.writer.run())
+        frontier_task = asyncio.create_task(consumer.run_frontier())
+        try:
+            await asyncio.gather(produce(), consume(consumer, queue, producer_done, stop))
+        finally:
+            writer_task.cancel()
+            frontier_task.cancel()
+        elapsed = time.monotonic() - started
+        crawler.db.conn.close()
+    finally:
+        await producer_http.aclose()
+        await consumer_http.aclose()
+        producer_pool.shutdown()
+        consumer_pool.shutdown()
+        server.shutdown()
+        server.server_close()
+        resources.close()
+        for limiter in limiters:
+            if args.adaptive:
+                limiter.db.conn.close()
+
+    timer.add("consumer.s3_upload", resources.stats["s3_upload_s"], resources.stats["s3_uploads"])
+    return {
+        "fixtures": {kind: len(store.urls(kind)) for kind in (SITEMAP_INDEX, SITEMAP_PAGE, ARTICLE)},
+        "replay": {
+            "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate,
+            "throttle_rate": args.throttle_rate, "responses": {str(k): v for k, v in sorted(server.stats.items())},
+        },
+        "rate_per_domain": args.rate,
+        "adaptive": {
+            "rates": {**limiters[0].rates, **limiters[1].rates},
+            "producer": limiters[0].stats, "consumer": limiters[1].stats,
+        } if args.adaptive else None,
+        "elapsed_s": round(elapsed, 2),
+        "articles_per_s": round(consumer.stats["extracted"] / elapsed, 2),
+        "sitemap_pages_per_s": round(crawler.stats["pages"] / elapsed, 2),
+        "producer": {"totals": crawler.stats, "last_cycle": crawler.sitemap_stats},
+        "consumer": consumer.stats,
+        "writes": consumer.writer.stats,
+        "queue": queue.stats,
+        "stages": timer.report(),
+    }
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Benchmark the producer and consumer against recorded pages.")
+    parser.add_argument("root", help="Fixture store directory (benchmarks/fixtures.py)")
+    parser.add_argument("--cycles", type=int, default=1, help="Producer cycles (the first is a full sweep)")
+    parser.add_argument("--rate", type=float, default=CRAWL_RATE_PER_DOMAIN,
+                        help="Requests per second per domain for each of producer and consumer (0: unlimited)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Use the shared adaptive rate limiter, starting at --rate")
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--s3-root", default=None, help="Directory for uploaded articles (default: a temp dir)")
+    parser.add_argument("--keep-state", action="store_true",
+                        help="Don't delete the recorded URLs' articles and crawl state first")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args(argv)
+    if args.adaptive and args.rate <= 0:
+        parser.error("--adaptive needs a starting --rate above 0")
+    if not DB_NAME:
+        sys.exit("POSTGRES_DB (and POSTGRES_HOST/USER/PASSWORD) must point at a benchmark database.")
+
+    report = asyncio.run(run_benchmark(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
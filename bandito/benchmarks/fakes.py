@@ -0,0 +1,74 @@
+"""
+fakes.py
+--------
+Stand-ins for the services the crawlers talk to, so crawl benchmarks measure
+the crawlers and PostgreSQL rather than RabbitMQ or S3 round-trips.
+
+- FilesystemS3Client mimics the subset of the boto3 S3 client the consumers
+  use and writes objects under a local directory as <root>/<bucket>/<key>.
+- MemoryQueue stands in for the sitemap_links queue: the async producer
+  publishes to it as to an aio-pika exchange, and the async consumer gets
+  MemoryMessage deliveries with the aio-pika ack/nack interface.
+"""
+
+import asyncio
+import itertools
+import os
+import time
+
+
+class FilesystemS3Client:
+    """Writes `put_object` calls to a local directory."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs) -> dict:
+        path = os.path.join(self.root, Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(Body)
+        return {}
+
+
+class MemoryMessage:
+    """A delivery with the parts of aio-pika's IncomingMessage the consumer uses."""
+
+    def __init__(self, queue: "MemoryQueue", body: bytes, delivery_tag: int, published_at: float) -> None:
+        self.queue = queue
+        self.body = body
+        self.delivery_tag = delivery_tag
+        self.published_at = published_at
+        self.processed = False
+
+    async def ack(self, multiple: bool = False) -> None:
+        self.processed = True
+        self.queue.stats["acks"] += 1
+
+    async def nack(self, requeue: bool = True) -> None:
+        self.processed = True
+        self.queue.stats["nacks"] += 1
+        if requeue:
+            await self.queue.publish(self)
+
+
+class MemoryQueue:
+    """In-process sitemap_links queue."""
+
+    def __init__(self) -> None:
+        self._queue = asyncio.Queue()
+        self._tags = itertools.count(1)
+        self.stats = {"published": 0, "delivered": 0, "acks": 0, "nacks": 0}
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+    async def publish(self, message, routing_key: str = None) -> None:
+        """aio-pika `Exchange.publish`: queue the message body."""
+        self.stats["published"] += 1
+        await self._queue.put((message.body, time.monotonic()))
+
+    async def get(self) -> MemoryMessage:
+        body, published_at = await self._queue.get()
+        self.stats["delivered"] += 1
+        return MemoryMessage(self, body, next(self._tags), published_at)
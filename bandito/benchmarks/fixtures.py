@@ -0,0 +1,171 @@
+"""
+fixtures.py
+-----------
+An offline corpus of crawled pages, and the recorder that builds it.
+
+A fixture store is a directory holding one gzip file per URL plus
+`index.json`, which maps each URL to its file, kind (sitemap index, sitemap
+page or article), status and validators (ETag / Last-Modified). The replay
+server (replay_server.py) serves a store, and parse_pages.py reads its
+article pages.
+
+Record the sitemap index, the first few sitemap pages and every article they
+list (from the bandito/ directory):
+
+    python benchmarks/fixtures.py fixtures/coindesk --sitemap-pages 3 --delay 1
+
+Recording resumes: URLs already in the store are not fetched again unless
+--refresh is given.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+INDEX = "index.json"
+SITEMAP_INDEX = "sitemap_index"
+SITEMAP_PAGE = "sitemap_page"
+ARTICLE = "article"
+
+
+class FixtureStore:
+    """Recorded responses keyed by URL, one gzip file each."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        path = os.path.join(root, INDEX)
+        if os.path.exists(path):
+            with open(path) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {}
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def urls(self, kind: str = None) -> list:
+        return [url for url, record in self.index.items() if kind is None or record["kind"] == kind]
+
+    def get(self, url: str):
+        """Returns (record, body bytes) for a recorded URL, or None."""
+        record = self.index.get(url)
+        if record is None:
+            return None
+        with open(os.path.join(self.root, record["file"]), "rb") as f:
+            return record, gzip.decompress(f.read())
+
+    def put(self, url: str, kind: str, status: int, headers, body: bytes) -> None:
+        """Store a response. `headers` is any mapping with case-insensitive lookups."""
+        file = hashlib.sha256(url.encode()).hexdigest()[:32] + ".html.gz"
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, file), "wb") as f:
+            f.write(gzip.compress(body))
+        self.index[url] = {
+            "file": file,
+            "kind": kind,
+            "status": status,
+            "content_type": headers.get("Content-Type", "text/html; charset=utf-8"),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+
+    def save(self) -> None:
+        """Write index.json (atomically, so an interrupted recording keeps the old one)."""
+        path = os.path.join(self.root, INDEX)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+
+def record(store: FixtureStore, base_url: str, sitemap_start: str, sitemap_pages: int, max_articles: int,
+           delay: float, refresh: bool) -> dict:
+    """
+    Fetch the sitemap index, its first `sitemap_pages` pages and the articles
+    they list (at most `max_articles`, 0 for all) into `store`, one request
+    every `delay` seconds. Returns counts of what was recorded.
+    """
+    import requests
+
+    from producer import ALLOWED_DOMAINS, IGNORE_SECTIONS
+    from sitemap_parser import parse_sitemap_index, parse_sitemap_page
+
+    session = requests.Session()
+    session.headers.update({"User-Agent": "Mozilla/5.0 (compatible; SitemapCrawler/1.0)"})
+    counts = {"recorded": 0, "cached": 0, "failed": 0}
+
+    def fetch(url, kind):
+        if url in store and not refresh:
+            counts["cached"] += 1
+            return store.get(url)[1].decode("utf-8", errors="replace")
+        try:
+            response = session.get(url, timeout=10)
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Request failed for {url}: {e}")
+            counts["failed"] += 1
+            return None
+        finally:
+            time.sleep(delay)
+        if response.status_code != 200:
+            logging.error(f"Got {response.status_code} for {url}; not recorded")
+            counts["failed"] += 1
+            return None
+        store.put(url, kind, response.status_code, response.headers, response.content)
+        counts["recorded"] += 1
+        if counts["recorded"] % 50 == 0:
+            store.save()
+            logging.info(f"Recorded {counts['recorded']} pages")
+        return response.text
+
+    index_url = f"{base_url}{sitemap_start}"
+    html = fetch(index_url, SITEMAP_INDEX)
+    if html is None:
+        return counts
+    articles = []
+    for sitemap_url in parse_sitemap_index(html, base_url)[:sitemap_pages]:
+        html = fetch(sitemap_url, SITEMAP_PAGE)
+        if html is not None:
+            articles.extend(parse_sitemap_page(html, sitemap_url, base_url, ALLOWED_DOMAINS, IGNORE_SECTIONS))
+    articles = list(dict.fromkeys(articles))
+    if max_articles:
+        articles = articles[:max_articles]
+    logging.info(f"Recording {len(articles)} articles")
+    for url in articles:
+        fetch(url, ARTICLE)
+    store.save()
+    return counts
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Record sitemap and article pages into a fixture store.")
+    parser.add_argument("root", help="Fixture store directory")
+    parser.add_argument("--base-url", default="https://www.coindesk.com")
+    parser.add_argument("--sitemap-start", default="/sitemap/1")
+    parser.add_argument("--sitemap-pages", type=int, default=2, help="Sitemap pages to record, newest first")
+    parser.add_argument("--articles", type=int, default=0, help="Record at most this many articles (0: all listed)")
+    parser.add_argument("--delay", type=float, default=1.0, help="Seconds between requests")
+    parser.add_argument("--refresh", action="store_true", help="Fetch URLs that are already recorded again")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    store = FixtureStore(args.root)
+    counts = record(store, args.base_url.rstrip("/"), args.sitemap_start, args.sitemap_pages, args.articles,
+                    args.delay, args.refresh)
+    kinds = {kind: len(store.urls(kind)) for kind in (SITEMAP_INDEX, SITEMAP_PAGE, ARTICLE)}
+    print(json.dumps({**counts, "store": kinds}, indent=2))
+    return counts
+
+
+if __name__ == "__main__":
+    main()
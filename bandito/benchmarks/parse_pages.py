@@ -0,0 +1,105 @@
+"""
+parse_pages.py
+--------------
+Checks that the single-pass lxml extractor (article_parser.parse_article)
+returns exactly what the BeautifulSoup extraction (parse_article_soup) does,
+and times both over saved article pages.
+
+    cd bandito
+    python benchmarks/parse_pages.py fixtures/coindesk --repeat 5
+
+Pages are `.html` or `.html.gz` files, given one by one or as directories
+(such as a fixture store recorded with fixtures.py).
+Any page whose results (or raised exceptions) differ is listed and the script
+exits with status 1.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from article_parser import parse_article, parse_article_soup  # noqa: E402
+
+
+def load_pages(paths: list) -> dict:
+    """Maps each page file under `paths` to its text."""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*") if p.name.endswith((".html", ".html.gz"))))
+        else:
+            files.append(path)
+    pages = {}
+    for file in files:
+        data = file.read_bytes()
+        if file.name.endswith(".gz"):
+            data = gzip.decompress(data)
+        pages[str(file)] = data.decode("utf-8", errors="replace")
+    return pages
+
+
+def run_extractor(fn, html: str):
+    try:
+        return fn(html)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def time_extractor(fn, pages: dict, repeat: int) -> list:
+    """Per-page milliseconds, best of `repeat`."""
+    timings = []
+    for html in pages.values():
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run_extractor(fn, html)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings.append(best)
+    return timings
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description="Compare and time the article extractors on saved pages.")
+    parser.add_argument("pages", nargs="+", help="Page files or directories of .html/.html.gz pages")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per page (the best is kept)")
+    parser.add_argument("--output", default=None, help="Write the JSON report here")
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args.pages)
+    if not pages:
+        parser.error("no .html or .html.gz pages found")
+
+    mismatches = [
+        name for name, html in pages.items()
+        if run_extractor(parse_article_soup, html) != run_extractor(parse_article, html)
+    ]
+    articles = sum(1 for html in pages.values() if isinstance(run_extractor(parse_article, html), dict))
+
+    report = {"pages": len(pages), "articles": articles, "mismatches": mismatches}
+    for name, fn in (("bs4", parse_article_soup), ("lxml", parse_article)):
+        timings = time_extractor(fn, pages, args.repeat)
+        report[name] = {
+            "mean_ms": round(statistics.mean(timings), 3),
+            "p50_ms": round(statistics.median(timings), 3),
+            "max_ms": round(max(timings), 3),
+            "pages_per_s": round(len(timings) / (sum(timings) / 1000), 1),
+        }
+    report["speedup"] = round(report["bs4"]["mean_ms"] / report["lxml"]["mean_ms"], 1)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main()["mismatches"] else 0)
@@ -0,0 +1,173 @@
+"""
+replay_server.py
+----------------
+A local HTTP server that replays a fixture store (fixtures.py) with
+configurable latency, server errors and rate limiting, so the producer and
+the consumers can be benchmarked without touching coindesk.com.
+
+    python benchmarks/replay_server.py fixtures/coindesk --port 8898 \\
+        --latency-ms 150 --jitter-ms 50 --error-rate 0.01 --throttle-rate 0.02
+
+Pages are looked up by the request's Host header and path
+(`https://<Host><path>`), so a client that keeps the original Host header
+while connecting here (see ReplayTransport) gets the recorded page for the
+real URL. Requests whose Host is not recorded fall back to the path alone,
+which is what curl or a browser pointed at the server gets.
+
+Every response waits latency +- jitter. Then a request is answered 500 with
+probability `error_rate`, 429 with a Retry-After header with probability
+`throttle_rate`, 304 if its If-None-Match / If-Modified-Since matches the
+recorded validators, 404 if the URL was not recorded, and with the recorded
+page otherwise.
+"""
+
+import argparse
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import httpx
+
+from fixtures import FixtureStore
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """Serves a FixtureStore; one thread per connection."""
+
+    daemon_threads = True
+
+    def __init__(self, store: FixtureStore, address=("127.0.0.1", 0), latency_s: float = 0.0, jitter_s: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, retry_after_s: int = 1, seed: int = None) -> None:
+        super().__init__(address, _ReplayHandler)
+        self.store = store
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after_s = retry_after_s
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pages = {}  # url -> (record, body, etag), loaded on first request
+        self._by_path = {urlsplit(url)._replace(scheme="", netloc="").geturl(): url for url in store.urls()}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self):
+        """Returns (delay in seconds, uniform [0, 1) sample) for one request."""
+        with self._lock:
+            delay = max(0.0, self.latency_s + self._random.uniform(-self.jitter_s, self.jitter_s))
+            return delay, self._random.random()
+
+    def page(self, host: str, path: str):
+        url = f"https://{host}{path}"
+        if url not in self.store:
+            url = self._by_path.get(path)
+            if url is None:
+                return None
+        page = self._pages.get(url)
+        if page is None:
+            record, body = self.store.get(url)
+            etag = record["etag"] or f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+            page = self._pages[url] = (record, body, etag)
+        return page
+
+    def count(self, status: int) -> None:
+        with self._lock:
+            self.stats[status] += 1
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as the crawlers expect
+
+    def do_GET(self) -> None:
+        server = self.server
+        delay, sample = server.draw()
+        time.sleep(delay)
+        if sample < server.error_rate:
+            return self._reply(500)
+        if sample < server.error_rate + server.throttle_rate:
+            return self._reply(429, {"Retry-After": str(server.retry_after_s)})
+
+        page = server.page(self.headers.get("Host", ""), self.path)
+        if page is None:
+            return self._reply(404)
+        record, body, etag = page
+        validators = {"ETag": etag}
+        if record["last_modified"]:
+            validators["Last-Modified"] = record["last_modified"]
+        if self.headers.get("If-None-Match") == etag or (
+            record["last_modified"] and self.headers.get("If-Modified-Since") == record["last_modified"]
+        ):
+            return self._reply(304, validators)
+        self._reply(200, {"Content-Type": record["content_type"], **validators}, body)
+
+    def _reply(self, status: int, headers: dict = None, body: bytes = b"") -> None:
+        self.server.count(status)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that sends every request to a replay server, keeping the
+    URL's path and Host header, so crawler code runs unchanged against real
+    coindesk.com URLs.
+    """
+
+    def __init__(self, replay_url: str, **transport_kwargs) -> None:
+        self.replay_url = httpx.URL(replay_url)
+        self._transport = httpx.AsyncHTTPTransport(**transport_kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(
+            scheme=self.replay_url.scheme, host=self.replay_url.host, port=self.replay_url.port
+        )
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a fixture store over HTTP.")
+    parser.add_argument("root", help="Fixture store directory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8898)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    store = FixtureStore(args.root)
+    server = ReplayServer(store, (args.host, args.port), args.latency_ms / 1000, args.jitter_ms / 1000,
+                          args.error_rate, args.throttle_rate, args.retry_after, args.seed)
+    print(f"Replaying {len(store)} pages on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Responses by status: {dict(server.stats)}")
+
+
+if __name__ == "__main__":
+    main()
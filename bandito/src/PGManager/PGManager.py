@@ -1,6 +1,7 @@
 # postgres_manager.py
 import psycopg2
 import logging
+from psycopg2.extras import execute_values
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +41,17 @@ class PGManager:
         self.password = password
         self.conn = None
 
+    @classmethod
+    def from_connection(cls, conn) -> "PGManager":
+        """
+        Wrap an already open connection (e.g. one lent by a pool). The caller
+        keeps ownership: it is not closed by this instance.
+        """
+        manager = cls.__new__(cls)
+        manager.host = manager.port = manager.dbname = manager.user = manager.password = None
+        manager.conn = conn
+        return manager
+
     def connect(self) -> None:
         """Establish a connection to the PostgreSQL database."""
         try:
@@ -70,6 +82,7 @@ class PGManager:
         """
         Create the `articles` table if it does not already exist.
         The table excludes the article_content column, but includes article_s3_url.
+        page_url is unique; inserts rely on it for ON CONFLICT (page_url).
         """
         create_table_query = """
         CREATE TABLE IF NOT EXISTS articles (
@@ -99,6 +112,15 @@ class PGManager:
         except psycopg2.Error as e:
             logger.error(f"Error creating articles table: {e}")
             self.conn.rollback()
+        # Separate transaction: on a table that already holds duplicates this
+        # fails, and scripts/schema version 0007 has to clean them up first.
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS articles_page_url_key ON articles (page_url);")
+            self.conn.commit()
+        except psycopg2.Error as e:
+            logger.error(f"Error creating the unique page_url index (run scripts/schema/migrate.py): {e}")
+            self.conn.rollback()
 
     def article_exists(self, page_url: str) -> bool:
         """
@@ -109,19 +131,23 @@ class PGManager:
         """
         try:
             with self.conn.cursor() as cur:
-                cur.execute("SELECT COUNT(*) FROM articles WHERE page_url = %s", (page_url,))
-                (count,) = cur.fetchone()
-                return count > 0
+                cur.execute("SELECT EXISTS (SELECT 1 FROM articles WHERE page_url = %s)", (page_url,))
+                (exists,) = cur.fetchone()
+                return exists
         except psycopg2.Error as e:
             logger.error(f"Error checking existing article: {e}")
             return False
 
     def insert_article(self, article_data: dict) -> None:
         """
-        Insert a new article record into the articles table.
+        Insert a new article record into the articles table. An article whose
+        page_url is already stored is skipped.
         
         Args:
             article_data (dict): A dictionary containing article fields.
+
+        Raises:
+            psycopg2.Error: The insert failed (the transaction is rolled back).
         """
         insert_query = """
         INSERT INTO articles (
@@ -156,16 +182,73 @@ class PGManager:
                 %(authors)s,
                 %(content_tier)s,
                 %(article_s3_url)s
-        );
+        )
+        ON CONFLICT (page_url) DO NOTHING;
         """
         try:
             with self.conn.cursor() as cur:
                 cur.execute(insert_query, article_data)
+                inserted = cur.rowcount
             self.conn.commit()
-            logger.info(f"Inserted article: {article_data.get('og_title')} (URL: {article_data.get('page_url')})")
+            if inserted:
+                logger.info(f"Inserted article: {article_data.get('og_title')} (URL: {article_data.get('page_url')})")
+            else:
+                logger.info(f"Article already stored: {article_data.get('page_url')}")
         except psycopg2.Error as e:
             logger.error(f"Error inserting article into PostgreSQL: {e}")
             self.conn.rollback()
+            raise
+
+    # Columns written by insert_articles, in VALUES order
+    INSERT_COLUMNS = [
+        'display_datetime',
+        'last_modified_datetime',
+        'publish_datetime',
+        'create_datetime',
+        'content_vertical',
+        'og_description',
+        'content_type',
+        'page_url',
+        'og_title',
+        'content_title',
+        'og_site_name',
+        'tags',
+        'authors',
+        'content_tier',
+        'article_s3_url'
+    ]
+
+    def insert_articles(self, rows: list) -> int:
+        """
+        Insert many article records in one statement and one transaction,
+        skipping rows whose page_url is already stored.
+
+        Unlike insert_article, errors are raised (after a rollback) so the
+        caller can retry or split the batch.
+
+        Args:
+            rows (list): Dictionaries with the INSERT_COLUMNS keys.
+
+        Returns:
+            int: The number of rows actually inserted.
+        """
+        insert_query = f"""
+        INSERT INTO articles ({', '.join(self.INSERT_COLUMNS)})
+        VALUES %s
+        ON CONFLICT (page_url) DO NOTHING;
+        """
+        template = "(" + ", ".join(f"%({column})s" for column in self.INSERT_COLUMNS) + ")"
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, insert_query, rows, template=template, page_size=len(rows))
+                inserted = cur.rowcount
+            self.conn.commit()
+            logger.info(f"Inserted {inserted} of {len(rows)} articles.")
+            return inserted
+        except psycopg2.Error:
+            if not self.conn.closed:
+                self.conn.rollback()
+            raise
 
     def get_article_field_list(self, field: str) -> list:
         """
@@ -193,3 +276,341 @@ class PGManager:
         except psycopg2.Error as e:
             logger.error(f"Error fetching field '{field}' from articles: {e}")
             return []
+
+    def iter_page_urls(self, after_id: int = 0, batch_size: int = 10000):
+        """
+        Stream (id, page_url) for articles with id > after_id, in id order,
+        through a server-side cursor so the table is never held in memory.
+
+        Yields:
+            tuple: (id, page_url) pairs.
+        """
+        with self.conn.cursor(name="page_url_scan") as cur:
+            cur.itersize = batch_size
+            cur.execute(
+                "SELECT id, page_url FROM articles WHERE id > %s AND page_url IS NOT NULL ORDER BY id",
+                (after_id,),
+            )
+            yield from cur
+        self.conn.commit()
+
+    def create_frontier_table_if_not_exists(self) -> None:
+        """
+        Create the `crawl_frontier` table (one row per discovered URL and its
+        crawl state) if it does not already exist.
+        """
+        create_table_query = """
+        CREATE TABLE IF NOT EXISTS crawl_frontier (
+            url TEXT PRIMARY KEY,
+            state TEXT NOT NULL
+                CHECK (state IN ('discovered', 'queued', 'fetched', 'failed', 'skipped')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT NULL,
+            discovered_at TIMESTAMP NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS crawl_frontier_state_idx ON crawl_frontier (state);
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(create_table_query)
+            self.conn.commit()
+            logger.info("Table 'crawl_frontier' ensured to exist.")
+        except psycopg2.Error as e:
+            logger.error(f"Error creating crawl_frontier table: {e}")
+            self.conn.rollback()
+
+    def upsert_frontier_states(self, rows: list) -> None:
+        """
+        Record crawl states for many URLs in one statement and one transaction.
+
+        Args:
+            rows (list): (url, state, attempts, last_error) tuples, one per URL.
+                `attempts` is added to the URL's stored attempt count.
+
+        Raises:
+            psycopg2.Error: After a rollback, so the caller can keep the rows.
+        """
+        upsert_query = """
+        INSERT INTO crawl_frontier (url, state, attempts, last_error)
+        VALUES %s
+        ON CONFLICT (url) DO UPDATE SET
+            state = EXCLUDED.state,
+            attempts = crawl_frontier.attempts + EXCLUDED.attempts,
+            last_error = EXCLUDED.last_error,
+            updated_at = now();
+        """
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(cur, upsert_query, rows, page_size=len(rows))
+            self.conn.commit()
+        except psycopg2.Error:
+            if not self.conn.closed:
+                self.conn.rollback()
+            raise
+
+    def get_frontier_states(self, urls: list) -> dict:
+        """
+        Look up the crawl state of many URLs at once.
+
+        Returns:
+            dict: url -> (state, attempts, seconds since the last update), for
+            the URLs present in crawl_frontier.
+        """
+        query = """
+        SELECT url, state, attempts, EXTRACT(EPOCH FROM now() - updated_at)
+        FROM crawl_frontier
+        WHERE url = ANY(%s);
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(query, (list(urls),))
+            rows = cur.fetchall()
+        self.conn.commit()
+        return {url: (state, attempts, float(age)) for url, state, attempts, age in rows}
+
+    def get_due_frontier_urls(self, max_attempts: int, requeue_after_s: float) -> list:
+        """
+        URLs due to be pushed again: failed fewer than `max_attempts` times,
+        or queued more than `requeue_after_s` seconds ago.
+        """
+        query = """
+        SELECT url
+        FROM crawl_frontier
+        WHERE (state = 'failed' AND attempts < %s)
+           OR (state = 'queued' AND updated_at < now() - make_interval(secs => %s));
+        """
+        with self.conn.cursor() as cur:
+            cur.execute(query, (max_attempts, requeue_after_s))
+            rows = cur.fetchall()
+        self.conn.commit()
+        return [row[0] for row in rows]
+
+    def get_existing_page_urls(self, urls: list) -> set:
+        """Return the subset of `urls` that are stored in the articles table."""
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT page_url FROM articles WHERE page_url = ANY(%s);", (list(urls),))
+            rows = cur.fetchall()
+        self.conn.commit()
+        return {row[0] for row in rows}
+
+    def iter_frontier_urls(self, batch_size: int = 10000):
+        """Stream every URL in crawl_frontier through a server-side cursor."""
+        with self.conn.cursor(name="frontier_scan") as cur:
+            cur.itersize = batch_size
+            cur.execute("SELECT url FROM crawl_frontier")
+            for (url,) in cur:
+                yield url
+        self.conn.commit()
+
+    def frontier_coverage(self) -> dict:
+        """
+        Count URLs per crawl state.
+
+        Returns:
+            dict: state -> number of URLs. Empty if the query fails.
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT state, count(*) FROM crawl_frontier GROUP BY state;")
+                rows = cur.fetchall()
+            self.conn.commit()
+            return dict(rows)
+        except psycopg2.Error as e:
+            logger.error(f"Error counting crawl_frontier states: {e}")
+            self.conn.rollback()
+            return {}
+
+    def create_sitemap_table_if_not_exists(self) -> None:
+        """
+        Create the `sitemap_pages` table (validators and link-set hash of each
+        sitemap page, for incremental crawling) if it does not already exist.
+        """
+        create_table_query = """
+        CREATE TABLE IF NOT EXISTS sitemap_pages (
+            url TEXT PRIMARY KEY,
+            etag TEXT NULL,
+            last_modified TEXT NULL,
+            links_hash TEXT NULL,
+            link_count INTEGER NOT NULL DEFAULT 0,
+            fetched_at TIMESTAMP NOT NULL DEFAULT now(),
+            changed_at TIMESTAMP NOT NULL DEFAULT now()
+        );
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(create_table_query)
+            self.conn.commit()
+            logger.info("Table 'sitemap_pages' ensured to exist.")
+        except psycopg2.Error as e:
+            logger.error(f"Error creating sitemap_pages table: {e}")
+            self.conn.rollback()
+
+    def get_sitemap_states(self) -> dict:
+        """
+        Load the stored state of every sitemap page.
+
+        Returns:
+            dict: url -> {"etag", "last_modified", "links_hash"}. Empty if the
+            query fails.
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT url, etag, last_modified, links_hash FROM sitemap_pages;")
+                rows = cur.fetchall()
+            self.conn.commit()
+        except psycopg2.Error as e:
+            logger.error(f"Error loading sitemap page states: {e}")
+            self.conn.rollback()
+            return {}
+        return {
+            url: {"etag": etag, "last_modified": last_modified, "links_hash": links_hash}
+            for url, etag, last_modified, links_hash in rows
+        }
+
+    def save_sitemap_state(self, url: str, etag: str, last_modified: str, links_hash: str,
+                           link_count: int, changed: bool) -> None:
+        """
+        Store a sitemap page's validators and link-set hash after a fetch.
+        `changed` moves changed_at forward as well as fetched_at.
+        """
+        upsert_query = """
+        INSERT INTO sitemap_pages (url, etag, last_modified, links_hash, link_count)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (url) DO UPDATE SET
+            etag = EXCLUDED.etag,
+            last_modified = EXCLUDED.last_modified,
+            links_hash = EXCLUDED.links_hash,
+            link_count = EXCLUDED.link_count,
+            fetched_at = now(),
+            changed_at = CASE WHEN %s THEN now() ELSE sitemap_pages.changed_at END;
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(upsert_query, (url, etag, last_modified, links_hash, link_count, changed))
+            self.conn.commit()
+        except psycopg2.Error as e:
+            logger.error(f"Error saving sitemap page state for {url}: {e}")
+            self.conn.rollback()
+
+    def create_rate_limit_table_if_not_exists(self) -> None:
+        """
+        Create the `domain_rate_limits` table (the request rate and schedule
+        each domain shares across crawler processes) if it does not already
+        exist.
+        """
+        create_table_query = """
+        CREATE TABLE IF NOT EXISTS domain_rate_limits (
+            domain TEXT PRIMARY KEY,
+            rate DOUBLE PRECISION NOT NULL CHECK (rate > 0),
+            next_slot TIMESTAMPTZ NOT NULL DEFAULT now(),
+            blocked_until TIMESTAMPTZ NULL,
+            adjusted_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            decreased_at TIMESTAMPTZ NOT NULL DEFAULT '-infinity'
+        );
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(create_table_query)
+            self.conn.commit()
+            logger.info("Table 'domain_rate_limits' ensured to exist.")
+        except psycopg2.Error as e:
+            logger.error(f"Error creating domain_rate_limits table: {e}")
+            self.conn.rollback()
+
+    def _execute_rate_query(self, query: str, params: dict):
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(query, params)
+                row = cur.fetchone()
+            self.conn.commit()
+            return row
+        except psycopg2.Error:
+            if not self.conn.closed:
+                self.conn.rollback()
+            raise
+
+    def reserve_request_slot(self, domain: str, initial_rate: float, burst: int = 1) -> float:
+        """
+        Reserve the next request slot in a domain's shared schedule.
+
+        The domain's `next_slot` moves forward by 1/rate, starting no earlier
+        than now and its `blocked_until`. Up to `burst` requests may go at
+        once after an idle spell. A domain seen for the first time starts at
+        `initial_rate`. Times come from the database clock, so processes on
+        different hosts agree.
+
+        Returns:
+            float: Seconds to wait before sending the request.
+
+        Raises:
+            psycopg2.Error: After a rollback.
+        """
+        query = """
+        INSERT INTO domain_rate_limits AS d (domain, rate, next_slot)
+        VALUES (%(domain)s, %(rate)s, now() + make_interval(secs => 1.0 / %(rate)s))
+        ON CONFLICT (domain) DO UPDATE SET
+            next_slot = GREATEST(d.next_slot, now(), d.blocked_until) + make_interval(secs => 1.0 / d.rate)
+        RETURNING EXTRACT(EPOCH FROM
+            GREATEST(now(), d.next_slot - make_interval(secs => %(burst)s / d.rate), d.blocked_until) - now());
+        """
+        row = self._execute_rate_query(query, {"domain": domain, "rate": initial_rate, "burst": burst})
+        return max(0.0, float(row[0]))
+
+    def increase_domain_rate(self, domain: str, step: float, max_rate: float, interval_s: float):
+        """
+        Additive increase: raise a domain's rate by `step` (capped at
+        `max_rate`) if it has not changed for `interval_s` and requests are
+        waiting for slots, i.e. the rate is what holds the crawl back.
+
+        Returns:
+            float: The new rate, or None if it was left alone.
+
+        Raises:
+            psycopg2.Error: After a rollback.
+        """
+        query = """
+        UPDATE domain_rate_limits SET
+            rate = LEAST(%(max_rate)s, rate + %(step)s),
+            adjusted_at = now()
+        WHERE domain = %(domain)s
+          AND rate < %(max_rate)s
+          AND adjusted_at <= now() - make_interval(secs => %(interval_s)s)
+          AND next_slot >= now()
+        RETURNING rate;
+        """
+        row = self._execute_rate_query(
+            query, {"domain": domain, "step": step, "max_rate": max_rate, "interval_s": interval_s}
+        )
+        return float(row[0]) if row else None
+
+    def decrease_domain_rate(self, domain: str, factor: float, min_rate: float, hold_s: float,
+                             retry_after_s: float = 0.0):
+        """
+        Multiplicative decrease: multiply a domain's rate by `factor` (not
+        below `min_rate`), at most once per `hold_s` so one episode of errors
+        is not counted once per request in flight, and hold its requests back
+        for `retry_after_s`. Also restarts the wait before the next increase.
+
+        Returns:
+            tuple: (rate, seconds the domain stays blocked, whether the rate
+            was decreased), or None if the domain has no row yet.
+
+        Raises:
+            psycopg2.Error: After a rollback.
+        """
+        query = """
+        UPDATE domain_rate_limits SET
+            rate = CASE WHEN decreased_at <= now() - make_interval(secs => %(hold_s)s)
+                        THEN GREATEST(%(min_rate)s, rate * %(factor)s) ELSE rate END,
+            decreased_at = CASE WHEN decreased_at <= now() - make_interval(secs => %(hold_s)s)
+                                THEN now() ELSE decreased_at END,
+            adjusted_at = now(),
+            blocked_until = GREATEST(blocked_until, now() + make_interval(secs => %(retry_after_s)s))
+        WHERE domain = %(domain)s
+        RETURNING rate, EXTRACT(EPOCH FROM GREATEST(blocked_until, now()) - now()), decreased_at = now();
+        """
+        row = self._execute_rate_query(query, {
+            "domain": domain, "factor": factor, "min_rate": min_rate, "hold_s": hold_s,
+            "retry_after_s": retry_after_s,
+        })
+        return (float(row[0]), float(row[1]), row[2]) if row else None
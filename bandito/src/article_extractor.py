@@ -0,0 +1,204 @@
+"""
+Single-pass article extraction with lxml.
+
+parse_article used to build a full BeautifulSoup tree with the pure-Python
+html.parser and then run 21 `soup.find("meta", ...)` calls, each walking the
+whole document, plus one for the article body. Here libxml2 tokenizes the page
+and feeds parser events to `_ArticleTarget`, which keeps the first <meta> of
+each name/property and the text of the article body div. No tree is built,
+and the page is read once.
+
+The output is meant to match the BeautifulSoup extraction (article_parser.
+parse_article_soup) string for string. The target reproduces bs4's rules:
+
+  - the first matching <meta> in document order wins, and a missing
+    `content` attribute raises KeyError, as `meta["content"]` does;
+  - body text is joined per text node (consecutive character data between
+    two tags or comments) with " ";
+  - text nodes made only of ASCII whitespace become "\\n" if they contain a
+    newline and " " otherwise, except inside <pre>/<textarea>;
+  - strings inside <script>, <style>, <template>, <rt> and <rp>, comments and
+    processing instructions are left out, as Tag.get_text() does.
+
+libxml2 recovers from some markup differently than html.parser does. It
+normalizes CR and CRLF to LF, drops CDATA sections and NUL characters, keeps
+the first of duplicate attributes (bs4 keeps the last), and silently ignores
+stray or misplaced tags (bs4 still ends the text node there). It also reads
+entity references without a trailing ";" by other rules, and it ends the page
+at an unclosed comment. Such pages are handed to the `fallback` extractor
+instead: `_needs_fallback` checks the page before parsing, and the parser's
+error log is checked after it.
+tests/test_article_extractor.py covers these cases.
+
+benchmarks/parse_pages.py checks this equality and times both extractors
+over saved pages.
+"""
+import re
+from html.entities import html5
+from typing import Optional
+
+from lxml import etree
+
+# bs4 puts strings inside these tags in NavigableString subclasses that
+# get_text() skips (HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+_SKIPPED_STRING_CONTAINERS = {"script", "style", "template", "rt", "rp"}
+# bs4 keeps whitespace-only strings verbatim inside these
+_PRESERVE_WHITESPACE_TAGS = {"pre", "textarea"}
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+# Characters and sections libxml2 rewrites or drops before the target sees them
+_REWRITTEN_MARKUP = ("\r", "\x00", "<![")
+# html.parser's entity reference pattern
+_ENTITY_REF = re.compile(r"&([a-zA-Z][-.a-zA-Z0-9]*)(;?)")
+# <meta> start tags and <div> start tags with a data-module-name, with their
+# attribute text (quoted values may hold ">"). Spelled out case by case: an
+# IGNORECASE pattern is scanned several times slower.
+_ATTRIBUTE_TEXT = r"""(?:[^>"']|"[^"]*"|'[^']*')*"""
+_META_OR_BODY_DIV = re.compile(
+    r"<(?:[mM][eE][tT][aA]|[dD][iI][vV](?=" + _ATTRIBUTE_TEXT
+    + r"[dD][aA][tT][aA]-[mM][oO][dD][uU][lL][eE]-[nN][aA][mM][eE]))\b(" + _ATTRIBUTE_TEXT + r")>"
+)
+_ATTRIBUTE_NAME = re.compile(r"([^\s\"'>/=]+)(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s\"'>]*))?")
+# Parser errors meaning libxml2 dropped a tag that html.parser reports
+_DROPPED_TAG_ERRORS = {etree.ErrorTypes.ERR_TAG_NAME_MISMATCH, etree.ErrorTypes.HTML_STRUCURE_ERROR}
+
+
+def _ambiguous_entity(html: str) -> bool:
+    """
+    Whether an entity reference may be decoded differently by libxml2 and
+    html.parser: a ";"-terminated name that is not an HTML entity, or an
+    unterminated one starting with an entity name ("&copy2024").
+    """
+    for match in _ENTITY_REF.finditer(html):
+        name, semicolon = match.groups()
+        if semicolon:
+            if name + ";" not in html5:
+                return True
+        elif any(name[:i] in html5 or name[:i] + ";" in html5 for i in range(2, len(name) + 1)):
+            return True
+    return False
+
+
+def _duplicate_attributes(html: str) -> bool:
+    """Whether a <meta> or the article body <div> repeats an attribute."""
+    for match in _META_OR_BODY_DIV.finditer(html):
+        names = [name.lower() for name in _ATTRIBUTE_NAME.findall(match.group(1))]
+        if len(names) != len(set(names)):
+            return True
+    return False
+
+
+def _needs_fallback(html: str) -> bool:
+    """Whether the page holds markup that libxml2 reads differently than html.parser."""
+    return (
+        any(markup in html for markup in _REWRITTEN_MARKUP)
+        or html.rfind("<!--") > html.rfind("-->")
+        or _ambiguous_entity(html)
+        or _duplicate_attributes(html)
+    )
+
+
+class _ArticleTarget:
+    """lxml parser target collecting <meta> attributes and the article body text."""
+
+    def __init__(self) -> None:
+        self.meta_names = {}       # name -> attributes of the first <meta name=...>
+        self.meta_properties = {}  # property -> attributes of the first <meta property=...>
+        self.body_found = False
+        self.body_strings = []
+        self._depth = 0            # open elements inside the body div, itself included
+        self._skip = 0             # open string containers inside the body
+        self._preserve = 0         # open <pre>/<textarea> inside the body
+        self._data = []
+
+    def _end_data(self) -> None:
+        if not self._data:
+            return
+        text = "".join(self._data)
+        self._data = []
+        if self._skip:
+            return
+        if not self._preserve and not text.strip(_ASCII_SPACES):
+            text = "\n" if "\n" in text else " "
+        self.body_strings.append(text)
+
+    def start(self, tag, attrib) -> None:
+        if self._depth:
+            self._end_data()
+            self._depth += 1
+            if tag in _SKIPPED_STRING_CONTAINERS:
+                self._skip += 1
+            elif tag in _PRESERVE_WHITESPACE_TAGS:
+                self._preserve += 1
+        elif tag == "div" and not self.body_found and attrib.get("data-module-name") == "article-body":
+            self.body_found = True
+            self._depth = 1
+        if tag == "meta":
+            name = attrib.get("name")
+            if name is not None and name not in self.meta_names:
+                self.meta_names[name] = dict(attrib)
+            prop = attrib.get("property")
+            if prop is not None and prop not in self.meta_properties:
+                self.meta_properties[prop] = dict(attrib)
+
+    def end(self, tag) -> None:
+        if self._depth:
+            self._end_data()
+            self._depth -= 1
+            if self._depth and tag in _SKIPPED_STRING_CONTAINERS:
+                self._skip -= 1
+            elif self._depth and tag in _PRESERVE_WHITESPACE_TAGS:
+                self._preserve -= 1
+
+    def data(self, data) -> None:
+        if self._depth:
+            self._data.append(data)
+
+    def comment(self, text) -> None:
+        if self._depth:
+            self._end_data()
+
+    def pi(self, target, data=None) -> None:
+        if self._depth:
+            self._end_data()
+
+    def close(self) -> "_ArticleTarget":
+        return self
+
+
+def extract_article(html: str, meta_tags, og_tags, fallback) -> Optional[dict]:
+    """
+    Extract `meta_tags` (<meta name=...>), `og_tags` (<meta property=...>) and
+    the article body text from a page in one pass.
+
+    `fallback(html)` extracts the pages that libxml2 would read differently
+    than html.parser (see the module docstring).
+
+    Returns:
+        dict: tag values plus "article_content", or None if the page is not
+        an English article page.
+    """
+    if not html.strip():
+        return None
+    if _needs_fallback(html):
+        return fallback(html)
+    parser = etree.HTMLParser(target=_ArticleTarget())
+    target = etree.fromstring(html, parser)
+    if any(error.type in _DROPPED_TAG_ERRORS for error in parser.error_log):
+        return fallback(html)
+
+    page_category = target.meta_names.get("page_category")
+    content_language = target.meta_names.get("content_language")
+    if not (page_category and page_category.get("content") == "article_page" and
+            content_language and content_language.get("content") == "en"):
+        return None
+
+    data = {}
+    for tag in meta_tags:
+        meta = target.meta_names.get(tag)
+        data[tag] = meta["content"] if meta else None
+    for tag in og_tags:
+        meta = target.meta_properties.get(tag)
+        data[tag] = meta["content"] if meta else None
+    data["article_content"] = " ".join(target.body_strings) if target.body_found else ""
+    return data
@@ -0,0 +1,106 @@
+import logging
+from datetime import datetime
+from typing import Optional
+
+from bs4 import BeautifulSoup
+
+from article_extractor import extract_article
+
+# <meta name="..."> tags read from every article page
+META_TAGS = [
+    "page_url", "authors", "content_id", "content_language", "content_title",
+    "content_tier", "content_type", "content_vertical", "create_date",
+    "create_time", "display_date", "display_time", "last_modified_date",
+    "last_modified_time", "page_category", "publish_date", "publish_time", "tags"
+]
+
+# <meta property="..."> Open Graph tags
+OG_TAGS = ["og:title", "og:description", "og:site_name"]
+
+
+def combine_date_time(date_str: str, time_str: str):
+    """
+    Combine a date string (yyyymmdd) and time string (HH:MM)
+    into a Python datetime object.
+
+    Returns None if either input is missing or improperly formatted.
+    """
+    try:
+        if not date_str or not time_str:
+            return None
+        date_str = date_str.strip()
+        time_str = time_str.strip()
+        formatted_date = f"{date_str[0:4]}-{date_str[4:6]}-{date_str[6:8]}"
+        dt_str = f"{formatted_date} {time_str}"
+        return datetime.strptime(dt_str, "%Y-%m-%d %H:%M")
+    except (ValueError, IndexError):
+        logging.error(f"Invalid date/time format: '{date_str}', '{time_str}'")
+        return None
+
+
+def parse_article(html: str) -> Optional[dict]:
+    """
+    Extract the metadata and body text of a CoinDesk article page, in one
+    lxml pass (article_extractor.py). Pages with markup that lxml reads
+    differently go through parse_article_soup.
+
+    A plain module-level function of the page text, so the async consumer can
+    run it in a process pool.
+
+    Returns:
+        dict: meta/OG tag values plus "article_content", or None if the page
+        is not an English article.
+    """
+    return extract_article(html, META_TAGS, OG_TAGS, parse_article_soup)
+
+
+def parse_article_soup(html: str) -> Optional[dict]:
+    """
+    The original BeautifulSoup (html.parser) extraction. parse_article must
+    return exactly what this returns; benchmarks/parse_pages.py compares the
+    two and times them.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Ensure the article is English and of the correct type
+    page_category = soup.find("meta", attrs={"name": "page_category"})
+    content_language = soup.find("meta", attrs={"name": "content_language"})
+    if not (page_category and page_category.get("content") == "article_page" and
+            content_language and content_language.get("content") == "en"):
+        return None
+
+    data = {}
+    for tag in META_TAGS:
+        meta = soup.find("meta", attrs={"name": tag})
+        data[tag] = meta["content"] if meta else None
+
+    for tag in OG_TAGS:
+        meta = soup.find("meta", attrs={"property": tag})
+        data[tag] = meta["content"] if meta else None
+
+    article_body = soup.find("div", attrs={"data-module-name": "article-body"})
+    data["article_content"] = article_body.get_text(separator=" ") if article_body else ""
+    return data
+
+
+def build_article_record(data: dict, s3_url: Optional[str]) -> dict:
+    """
+    Map extracted page data to a row of the articles table.
+    """
+    return {
+        'display_datetime':       combine_date_time(data.get('display_date'), data.get('display_time')),
+        'last_modified_datetime': combine_date_time(data.get('last_modified_date'), data.get('last_modified_time')),
+        'publish_datetime':       combine_date_time(data.get('publish_date'), data.get('publish_time')),
+        'create_datetime':        combine_date_time(data.get('create_date'), data.get('create_time')),
+        'content_vertical':       data.get('content_vertical'),
+        'og_description':         data.get('og:description'),
+        'content_type':           data.get('content_type'),
+        'page_url':               data.get('page_url'),
+        'og_title':               data.get('og:title'),
+        'content_title':          data.get('content_title'),
+        'og_site_name':           data.get('og:site_name'),
+        'tags':                   data.get('tags'),
+        'authors':                data.get('authors'),
+        'content_tier':           data.get('content_tier'),
+        'article_s3_url':         s3_url
+    }
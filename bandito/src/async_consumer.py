@@ -0,0 +1,304 @@
+"""
+Asyncio article consumer.
+
+Does the same work as consumer.py, but keeps many articles in flight per
+process instead of one:
+
+  - aio-pika delivers up to CONSUMER_PREFETCH messages at a time, and up to
+    CONSUMER_CONCURRENCY of them are processed concurrently.
+  - Pages are fetched with one keep-alive httpx client. Requests to each
+    domain go out at a rate shared by every consumer and producer process
+    and adapted to how the site responds (rate_limit.SharedRateLimiter).
+    This replaces the per-article sleep.
+  - HTML parsing runs in a process pool (CONSUMER_PARSE_WORKERS) so it never
+    blocks the event loop. The S3 upload and the database calls run in
+    threads, on a PostgreSQL pool and an S3 client that live as long as the
+    worker (resources.py).
+
+Extracted articles are written in batches (CONSUMER_BATCH_SIZE rows, or
+whatever has waited CONSUMER_BATCH_MAX_WAIT_S) with one multi-row insert
+(batching.py). A message is acknowledged only after its article has been
+committed, or after it was skipped. Acks are sent as one
+basic_ack(multiple=True) up to the newest delivery whose predecessors are
+all done. The outcome of every URL is recorded in crawl_frontier, also in
+batches (frontier.py). On shutdown, in-flight articles finish, the last
+batch is written, and unacked prefetched messages are returned to the queue.
+
+Run with `python async_consumer.py`.
+"""
+import asyncio
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+import aio_pika
+import httpx
+import psycopg2
+
+from article_parser import build_article_record, combine_date_time, parse_article
+from batching import AckTracker, ArticleBatchWriter
+from frontier import FAILED, FETCHED, SKIPPED, FrontierBuffer
+from consumer import (ALLOWED_DOMAINS, DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER, QUEUE_NAME,
+                      create_resources, upload_to_s3)
+from PGManager.PGManager import PGManager
+from rate_limit import SharedRateLimiter
+from resources import WorkerResources
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+
+# Messages delivered ahead of processing, and articles processed at once.
+# Unacked messages include those waiting in a batch, so keep the prefetch
+# above CONSUMER_CONCURRENCY + CONSUMER_BATCH_SIZE.
+CONSUMER_PREFETCH = int(os.getenv("CONSUMER_PREFETCH", "64"))
+CONSUMER_CONCURRENCY = int(os.getenv("CONSUMER_CONCURRENCY", "16"))
+# Articles per insert, and the longest an extracted article waits for one
+CONSUMER_BATCH_SIZE = int(os.getenv("CONSUMER_BATCH_SIZE", "25"))
+CONSUMER_BATCH_MAX_WAIT_S = float(os.getenv("CONSUMER_BATCH_MAX_WAIT_S", "2"))
+# Processes parsing HTML
+CONSUMER_PARSE_WORKERS = int(os.getenv("CONSUMER_PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+FETCH_TIMEOUT_S = 10
+FETCH_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "Mozilla/5.0 (compatible; CoinDeskCrawler/1.0; +https://www.example.com/bot-info)"
+STATS_INTERVAL_S = 60
+
+# httpx logs every request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class ArticleConsumer:
+    """
+    Processes queued article URLs with bounded concurrency.
+    """
+
+    def __init__(self, http: httpx.AsyncClient, parse_pool: ProcessPoolExecutor, limiter: SharedRateLimiter,
+                 resources: WorkerResources) -> None:
+        self.http = http
+        self.parse_pool = parse_pool
+        self.limiter = limiter
+        self.resources = resources
+        self.acks = AckTracker()
+        self.frontier = FrontierBuffer()
+        self.writer = ArticleBatchWriter(
+            resources, CONSUMER_BATCH_SIZE, CONSUMER_BATCH_MAX_WAIT_S, self.complete, self.frontier
+        )
+        self.stats = {"extracted": 0, "skipped": 0, "failed": 0, "acks": 0}
+
+    async def fetch(self, url: str):
+        """
+        GET `url` under the domain rate limit, retrying connection errors,
+        429s and 5xx responses with exponential backoff. Every outcome is
+        reported to the limiter. Returns the page text or None (the failure
+        is recorded in the frontier).
+        """
+        domain = urlparse(url).netloc
+        for attempt in range(FETCH_RETRIES + 1):
+            await self.limiter.acquire(domain)
+            started = time.monotonic()
+            try:
+                response = await self.http.get(url)
+                await self.limiter.report(domain, response.status_code, time.monotonic() - started,
+                                          response.headers.get("Retry-After"))
+                if response.status_code not in RETRY_STATUSES or attempt == FETCH_RETRIES:
+                    response.raise_for_status()
+                    return response.text
+            except httpx.HTTPStatusError as e:
+                logging.error(f"Request failed for {url}: {e}")
+                self.frontier.record(url, FAILED, str(e))
+                return None
+            except httpx.TransportError as e:
+                await self.limiter.report(domain, None, time.monotonic() - started)
+                if attempt == FETCH_RETRIES:
+                    logging.error(f"Request failed for {url}: {e!r}")
+                    self.frontier.record(url, FAILED, repr(e))
+                    return None
+            await asyncio.sleep(2 ** attempt)
+        return None
+
+    async def process_url(self, url: str):
+        """
+        Same steps as consumer.process_url: dedupe, fetch, extract, upload the
+        body to S3. Returns the article record to insert, or None.
+        """
+        if urlparse(url).netloc not in ALLOWED_DOMAINS:
+            logging.info(f"Domain {urlparse(url).netloc} not allowed. Skipping URL: {url}")
+            self.stats["skipped"] += 1
+            self.frontier.record(url, SKIPPED)
+            return
+
+        if await asyncio.to_thread(self._article_exists, url):
+            logging.info(f"{url} already exists in the articles table.")
+            self.stats["skipped"] += 1
+            self.frontier.record(url, FETCHED)
+            return
+
+        html = await self.fetch(url)
+        if html is None:
+            self.stats["failed"] += 1
+            return
+
+        data = await asyncio.get_running_loop().run_in_executor(self.parse_pool, parse_article, html)
+        if data is None:
+            logging.info(f"Not an English article. Skipping: {url}")
+            self.stats["skipped"] += 1
+            self.frontier.record(url, SKIPPED)
+            return
+        logging.info(f"Extracted article: {data.get('og:title', 'Unknown Title')}")
+
+        publish_datetime = combine_date_time(data.get('publish_date'), data.get('publish_time'))
+        s3_url, _, _ = await asyncio.to_thread(
+            upload_to_s3, data["article_content"], publish_datetime, data["content_id"], self.resources
+        )
+        self.stats["extracted"] += 1
+        # Recorded FETCHED by the batch writer once the row is committed
+        return build_article_record(data, s3_url)
+
+    async def handle(self, message: aio_pika.abc.AbstractIncomingMessage) -> None:
+        """
+        Process one delivery (already passed to `self.acks.track`). Articles go
+        to the batch writer, which completes the message once committed.
+        """
+        url = message.body.decode()
+        try:
+            record = await self.process_url(url)
+        except Exception as e:
+            logging.error(f"Error processing URL {url}: {e}")
+            self.stats["failed"] += 1
+            self.frontier.record(url, FAILED, str(e))
+            record = None
+        if record is None:
+            await self.complete([message])
+        else:
+            await self.writer.add(record, message)
+
+    async def complete(self, messages) -> None:
+        """Mark deliveries done and ack everything that is now contiguous."""
+        last = self.acks.complete(messages)
+        if last is None:
+            return
+        try:
+            await last.ack(multiple=True)
+            self.stats["acks"] += 1
+        except Exception as e:
+            # The channel was closed; the broker redelivers what was not acked
+            logging.warning(f"Ack up to delivery {last.delivery_tag} failed: {e!r}")
+
+    async def flush_frontier(self) -> None:
+        """Write the buffered crawl states (kept for the next try on failure)."""
+        rows = self.frontier.take()
+        if not rows:
+            return
+        try:
+            await asyncio.to_thread(self._upsert_frontier, rows)
+        except psycopg2.Error as e:
+            logging.error(f"Recording {len(rows)} crawl states failed; retrying with the next batch: {e}")
+            self.frontier.restore(rows)
+
+    async def run_frontier(self) -> None:
+        """Flush crawl states when a batch is due. Runs until cancelled."""
+        while True:
+            await asyncio.sleep(1)
+            if self.frontier.due():
+                await self.flush_frontier()
+
+    def _article_exists(self, url: str) -> bool:
+        with self.resources.db() as db:
+            return db.article_exists(url)
+
+    def _upsert_frontier(self, rows: list) -> None:
+        with self.resources.db() as db:
+            db.upsert_frontier_states(rows)
+
+
+async def _log_stats(consumer: ArticleConsumer) -> None:
+    started, last = time.monotonic(), dict(consumer.stats)
+    while True:
+        await asyncio.sleep(STATS_INTERVAL_S)
+        done = {k: v - last[k] for k, v in consumer.stats.items()}
+        last = dict(consumer.stats)
+        logging.info(
+            f"Last {STATS_INTERVAL_S}s: {done}, {done['extracted'] / STATS_INTERVAL_S:.2f} articles/s "
+            f"(totals {last} in {time.monotonic() - started:.0f}s); writes {consumer.writer.stats}; "
+            f"rates {consumer.limiter.rates} {consumer.limiter.stats}; {consumer.resources.report()}"
+        )
+
+
+async def run() -> None:
+    """Consume until SIGINT/SIGTERM, then drain in-flight articles."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # One pooled connection per in-flight article; the S3 client's HTTP pool likewise
+    resources = await asyncio.to_thread(
+        create_resources, pool_max=CONSUMER_CONCURRENCY, s3_pool_size=CONSUMER_CONCURRENCY
+    )
+    limiter = await asyncio.to_thread(SharedRateLimiter, PGManager(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD))
+
+    limits = httpx.Limits(max_connections=CONSUMER_CONCURRENCY, max_keepalive_connections=CONSUMER_CONCURRENCY)
+    transport = httpx.AsyncHTTPTransport(retries=FETCH_RETRIES, limits=limits)
+    async with httpx.AsyncClient(
+        transport=transport, timeout=FETCH_TIMEOUT_S, headers={"User-Agent": USER_AGENT}, follow_redirects=True
+    ) as http:
+        with ProcessPoolExecutor(max_workers=CONSUMER_PARSE_WORKERS) as parse_pool:
+            consumer = ArticleConsumer(http, parse_pool, limiter, resources)
+            connection = await aio_pika.connect_robust(host=RABBITMQ_HOST)
+            stats_task = asyncio.create_task(_log_stats(consumer))
+            writer_task = asyncio.create_task(consumer.writer.run())
+            frontier_task = asyncio.create_task(consumer.run_frontier())
+            slots = asyncio.Semaphore(CONSUMER_CONCURRENCY)
+            in_flight = set()
+
+            async def handle(message):
+                try:
+                    await consumer.handle(message)
+                finally:
+                    slots.release()
+
+            try:
+                channel = await connection.channel()
+                # Delivery tags restart on a reopened channel
+                channel.reopen_callbacks.add(lambda *_: consumer.acks.reset())
+                await channel.set_qos(prefetch_count=CONSUMER_PREFETCH)
+                queue = await channel.declare_queue(QUEUE_NAME)
+                logging.info(
+                    f" [*] Waiting for messages ({CONSUMER_CONCURRENCY} in flight, prefetch {CONSUMER_PREFETCH}). "
+                    "To exit, press CTRL+C"
+                )
+                async with queue.iterator() as messages:
+                    next_message = asyncio.ensure_future(messages.__anext__())
+                    stopping = asyncio.ensure_future(stop.wait())
+                    while True:
+                        await asyncio.wait({next_message, stopping}, return_when=asyncio.FIRST_COMPLETED)
+                        if stop.is_set():
+                            next_message.cancel()
+                            break
+                        await slots.acquire()
+                        consumer.acks.track(next_message.result())
+                        task = asyncio.create_task(handle(next_message.result()))
+                        in_flight.add(task)
+                        task.add_done_callback(in_flight.discard)
+                        next_message = asyncio.ensure_future(messages.__anext__())
+                    logging.info(f"Shutting down; finishing {len(in_flight)} in-flight articles...")
+                    await asyncio.gather(*in_flight, return_exceptions=True)
+                    writer_task.cancel()
+                    await consumer.writer.close()
+                    frontier_task.cancel()
+                    await consumer.flush_frontier()
+            finally:
+                stats_task.cancel()
+                writer_task.cancel()
+                frontier_task.cancel()
+                await connection.close()
+                resources.close()
+                limiter.db.conn.close()
+    logging.info(f"Consumer stopped: {consumer.stats}; writes {consumer.writer.stats}; {resources.report()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
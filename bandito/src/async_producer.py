@@ -0,0 +1,296 @@
+"""
+Asyncio sitemap producer.
+
+Does the same work as producer.py (same URL filter, crawl frontier and
+incremental sitemap state), but fetches sitemap pages concurrently instead
+of one at a time with a sleep after each:
+
+  - Up to PRODUCER_CONCURRENCY sitemap pages are in flight, fetched with one
+    keep-alive httpx client. Requests to each domain share the adaptive
+    per-domain rate of the consumers (rate_limit.SharedRateLimiter), which
+    replaces the fixed delay.
+  - Sitemap HTML is parsed in a process pool (PRODUCER_PARSE_WORKERS) so it
+    never blocks the event loop.
+  - Each page's new links are published as soon as the page is done, not at
+    the end of the cycle. Database calls run in a thread, one at a time, on
+    the producer's connection.
+
+Pages, links and published links per second are logged every
+STATS_INTERVAL_S and per cycle. Incremental cycles stop starting pages once
+a page yields no new links (pages already in flight finish).
+
+Run with `python async_producer.py`.
+"""
+import asyncio
+import logging
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+import aio_pika
+import httpx
+
+from frontier import QUEUED
+from PGManager.PGManager import PGManager
+from producer import (ALLOWED_DOMAINS, DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER, IGNORE_SECTIONS,
+                      SITEMAP_CYCLE_INTERVAL_S, SitemapCrawler)
+from rate_limit import SharedRateLimiter
+from sitemap_parser import parse_sitemap_index, parse_sitemap_page
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "rabbitmq")
+QUEUE_NAME = "sitemap_links"
+
+# Sitemap pages fetched at once
+PRODUCER_CONCURRENCY = int(os.getenv("PRODUCER_CONCURRENCY", "8"))
+# Processes parsing sitemap HTML
+PRODUCER_PARSE_WORKERS = int(os.getenv("PRODUCER_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+BASE_URL = "https://www.coindesk.com"
+SITEMAP_START = "/sitemap/1"
+FETCH_TIMEOUT_S = 10
+FETCH_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "Mozilla/5.0 (compatible; SitemapCrawler/1.0)"
+STATS_INTERVAL_S = 60
+
+logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+# httpx logs every request at INFO
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+class AsyncSitemapCrawler(SitemapCrawler):
+    """
+    SitemapCrawler whose sitemap fetching, parsing and publishing run on an
+    event loop. The crawl state and the database logic are inherited.
+    """
+
+    def __init__(self, base_url, sitemap_start, http: httpx.AsyncClient, parse_pool: ProcessPoolExecutor,
+                 limiter: SharedRateLimiter, exchange: aio_pika.abc.AbstractExchange) -> None:
+        self.base_url = base_url
+        self.allowed_domains = ALLOWED_DOMAINS
+        self.ignore_sections = IGNORE_SECTIONS
+        self.sitemap_start = sitemap_start
+        self.http = http
+        self.parse_pool = parse_pool
+        self.limiter = limiter
+        self.exchange = exchange
+        self.db_lock = asyncio.Lock()
+        self.stats = {"pages": 0, "links": 0, "published": 0}
+        self.init_state()
+
+    async def run_db(self, fn, *args):
+        """Run a blocking database call in a thread, one at a time."""
+        async with self.db_lock:
+            return await asyncio.to_thread(fn, *args)
+
+    async def parse(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.parse_pool, fn, *args)
+
+    async def fetch(self, url: str, headers: dict = None):
+        """
+        GET `url` under the domain rate limit, retrying connection errors,
+        429s and 5xx responses with exponential backoff. Every outcome is
+        reported to the limiter. Returns the response, or None if the page
+        could not be reached.
+        """
+        domain = urlparse(url).netloc
+        for attempt in range(FETCH_RETRIES + 1):
+            await self.limiter.acquire(domain)
+            started = time.monotonic()
+            try:
+                response = await self.http.get(url, headers=headers)
+                await self.limiter.report(domain, response.status_code, time.monotonic() - started,
+                                          response.headers.get("Retry-After"))
+                if response.status_code not in RETRY_STATUSES or attempt == FETCH_RETRIES:
+                    self.stats["pages"] += 1
+                    return response
+            except httpx.TransportError as e:
+                await self.limiter.report(domain, None, time.monotonic() - started)
+                if attempt == FETCH_RETRIES:
+                    logging.error(f"Request failed for {url}: {e!r}")
+                    return None
+            await asyncio.sleep(2 ** attempt)
+        return None
+
+    async def get_sitemap_links(self):
+        """Async get_sitemap_links: the index's page list, reused while it answers 304."""
+        starting_sitemap = f'{self.base_url}{self.sitemap_start}'
+        state_key = f"{starting_sitemap}#index"
+        logging.info(f"Fetching sitemap index: {starting_sitemap}")
+        response = await self.fetch(starting_sitemap, self.conditional_headers(state_key))
+        if response is not None and response.status_code == 304:
+            if self.index_links:
+                return self.index_links
+            response = await self.fetch(starting_sitemap)
+        if response is None or response.status_code != 200:
+            logging.error(f"Failed to fetch sitemap index: {starting_sitemap}")
+            return []
+
+        sitemap_links = await self.parse(parse_sitemap_index, response.text, self.base_url)
+        if sitemap_links:
+            await self.run_db(self.save_sitemap_state, state_key, response, sitemap_links,
+                              sitemap_links != self.index_links)
+            self.index_links = sitemap_links
+        return sitemap_links
+
+    async def process_sitemap(self, sitemap_url):
+        """
+        Async process_sitemap: fetch a sitemap page conditionally, publish its
+        new links and record them as queued. Returns the number published
+        (0 if the page is unchanged) or None if the page failed.
+        """
+        response = await self.fetch(sitemap_url, self.conditional_headers(sitemap_url))
+        if response is None:
+            return None
+        if response.status_code == 304:
+            self.sitemap_stats["not_modified"] += 1
+            return 0
+        if response.status_code != 200:
+            logging.error(f"Failed to fetch sitemap: {sitemap_url}")
+            return None
+        self.sitemap_stats["fetched"] += 1
+
+        links = await self.parse(parse_sitemap_page, response.text, sitemap_url, self.base_url,
+                                 self.allowed_domains, self.ignore_sections)
+        self.stats["links"] += len(links)
+        if self.links_unchanged(sitemap_url, links):
+            self.sitemap_stats["unchanged"] += 1
+            await self.run_db(self.save_sitemap_state, sitemap_url, response, links, False)
+            return 0
+
+        to_push = await self.run_db(self.select_links_to_push, links)
+        if to_push is None:
+            return None
+        for link in to_push:
+            await self.exchange.publish(aio_pika.Message(body=link.encode()), routing_key=QUEUE_NAME)
+        self.stats["published"] += len(to_push)
+        self.sitemap_stats["pushed"] += len(to_push)
+        await self.run_db(self._record_page, sitemap_url, response, links, to_push)
+        return len(to_push)
+
+    def _record_page(self, sitemap_url, response, links, published) -> None:
+        self._record_queued(published)
+        self.save_sitemap_state(sitemap_url, response, links, True)
+
+    async def publish_due_links(self) -> None:
+        """Async push_due_links: publish the frontier links due for a retry or requeue."""
+        due = await self.run_db(self.select_due_links)
+        if not due:
+            return
+        for link in due:
+            await self.exchange.publish(aio_pika.Message(body=link.encode()), routing_key=QUEUE_NAME)
+        self.stats["published"] += len(due)
+        self.sitemap_stats["retried"] += len(due)
+        await self.run_db(self._record_queued, due)
+
+    def _record_queued(self, links) -> None:
+        for link in links:
+            self.frontier.record(link, QUEUED)
+        self.frontier.flush(self.db)
+
+    async def run_cycle(self, full_sweep: bool, stop: asyncio.Event) -> None:
+        """
+        Crawl the sitemap pages, newest first, PRODUCER_CONCURRENCY at a time.
+        Unless this is a full sweep, no further pages are started once one
+        yields no new links; no pages are started once `stop` is set. A full
+        sweep ends by publishing the frontier links due for a retry.
+        """
+        started = time.monotonic()
+        pages_before, links_before = self.stats["pages"], self.stats["links"]
+        sitemap_links = await self.get_sitemap_links()
+        slots = asyncio.Semaphore(PRODUCER_CONCURRENCY)
+        caught_up = asyncio.Event()
+
+        async def crawl(position, sitemap_url):
+            try:
+                pushed = await self.process_sitemap(sitemap_url)
+            except Exception as e:
+                logging.error(f"Error processing sitemap {sitemap_url}: {e}")
+                pushed = None
+            finally:
+                slots.release()
+            if pushed == 0 and not full_sweep and not caught_up.is_set():
+                logging.info(f"No new links on {sitemap_url}; not starting pages after {position} of {len(sitemap_links)}.")
+                caught_up.set()
+
+        tasks = []
+        for position, sitemap_url in enumerate(sitemap_links, start=1):
+            await slots.acquire()
+            if caught_up.is_set() or stop.is_set():
+                slots.release()
+                break
+            tasks.append(asyncio.create_task(crawl(position, sitemap_url)))
+        await asyncio.gather(*tasks)
+        if full_sweep and not stop.is_set():
+            await self.publish_due_links()
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        logging.info(
+            f"Cycle took {elapsed:.1f}s: {(self.stats['pages'] - pages_before) / elapsed:.2f} pages/s, "
+            f"{(self.stats['links'] - links_before) / elapsed:.1f} links/s"
+        )
+
+
+async def _log_stats(crawler: AsyncSitemapCrawler) -> None:
+    last = dict(crawler.stats)
+    while True:
+        await asyncio.sleep(STATS_INTERVAL_S)
+        done = {k: v - last[k] for k, v in crawler.stats.items()}
+        last = dict(crawler.stats)
+        logging.info(
+            f"Last {STATS_INTERVAL_S}s: {done['pages'] / STATS_INTERVAL_S:.2f} pages/s, "
+            f"{done['links'] / STATS_INTERVAL_S:.1f} links/s, "
+            f"{done['published'] / STATS_INTERVAL_S:.1f} published/s (totals {last})"
+        )
+
+
+async def run() -> None:
+    """Crawl in cycles until SIGINT/SIGTERM, then finish the pages in flight."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    limits = httpx.Limits(max_connections=PRODUCER_CONCURRENCY, max_keepalive_connections=PRODUCER_CONCURRENCY)
+    async with httpx.AsyncClient(
+        limits=limits, timeout=FETCH_TIMEOUT_S, headers={"User-Agent": USER_AGENT}, follow_redirects=True
+    ) as http:
+        with ProcessPoolExecutor(max_workers=PRODUCER_PARSE_WORKERS) as parse_pool:
+            connection = await aio_pika.connect_robust(host=RABBITMQ_HOST)
+            try:
+                channel = await connection.channel()
+                await channel.declare_queue(QUEUE_NAME)
+                limiter = await asyncio.to_thread(
+                    SharedRateLimiter, PGManager(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD)
+                )
+                crawler = await asyncio.to_thread(
+                    AsyncSitemapCrawler, BASE_URL, SITEMAP_START, http, parse_pool, limiter, channel.default_exchange,
+                )
+                stats_task = asyncio.create_task(_log_stats(crawler))
+                try:
+                    while not stop.is_set():
+                        cycle_started = time.monotonic()
+                        full_sweep = crawler.start_cycle()
+                        await crawler.run_cycle(full_sweep, stop)
+                        await crawler.run_db(crawler.finish_cycle, full_sweep)
+                        try:
+                            await asyncio.wait_for(
+                                stop.wait(), max(0, SITEMAP_CYCLE_INTERVAL_S - (time.monotonic() - cycle_started))
+                            )
+                        except asyncio.TimeoutError:
+                            pass
+                finally:
+                    stats_task.cancel()
+                    logging.info("Shutting down crawler.")
+                    await crawler.run_db(crawler.frontier.flush, crawler.db)
+                    await crawler.run_db(crawler.save_url_filter)
+                    crawler.db.conn.close()
+                    limiter.db.conn.close()
+            finally:
+                await connection.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
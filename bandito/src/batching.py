@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+import psycopg2
+
+from frontier import FAILED, FETCHED
+
+logger = logging.getLogger(__name__)
+
+
+class AckTracker:
+    """
+    Turns out-of-order completions into ordered multi-acks.
+
+    `basic_ack(multiple=True)` acknowledges every delivery on the channel up
+    to a tag, so it may only be sent up to the first delivery that is still
+    being worked on. Deliveries are tracked in arrival order. When work
+    finishes, `complete` returns the message to ack with multiple=True (or
+    None if the oldest delivery is still pending). Deliveries that were
+    already nacked count as done but are never returned.
+    """
+
+    def __init__(self) -> None:
+        self._deliveries = OrderedDict()  # delivery tag -> [message, done]
+
+    def __len__(self) -> int:
+        return len(self._deliveries)
+
+    def track(self, message) -> None:
+        self._deliveries[message.delivery_tag] = [message, False]
+
+    def complete(self, messages):
+        for message in messages:
+            entry = self._deliveries.get(message.delivery_tag)
+            if entry is not None and entry[0] is message:
+                entry[1] = True
+        last = None
+        while self._deliveries:
+            tag, (message, done) = next(iter(self._deliveries.items()))
+            if not done:
+                break
+            del self._deliveries[tag]
+            # A nacked delivery is already settled and can't be acked again
+            if not getattr(message, "processed", False):
+                last = message
+        return last
+
+    def reset(self) -> None:
+        """Forget all deliveries (the channel was reopened; the broker redelivers them)."""
+        self._deliveries.clear()
+
+
+class ArticleBatchWriter:
+    """
+    Buffers extracted articles and writes them in batches: when `batch_size`
+    rows are waiting, or when the oldest has waited `max_wait_s`.
+
+    A batch is one multi-row INSERT ... ON CONFLICT (page_url) DO NOTHING in
+    a single transaction. Its messages are handed to `on_done` (which acks
+    them) only after the commit. If a row makes the batch fail, the batch is split in
+    halves and each half retried, so one bad row only loses itself. If the
+    database is unreachable, the whole batch is requeued instead.
+
+    With a `frontier` (FrontierBuffer), committed URLs are recorded FETCHED
+    and rejected ones FAILED with the error, so a URL is only marked fetched
+    once its row is stored.
+    """
+
+    def __init__(self, resources, batch_size: int, max_wait_s: float, on_done, frontier=None) -> None:
+        self.resources = resources
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_s
+        self.on_done = on_done
+        self.frontier = frontier
+        self._rows = []
+        self._messages = []
+        self._oldest = None
+        self._flushes = set()
+        self.stats = {"batches": 0, "inserted": 0, "duplicates": 0, "rejected": 0, "splits": 0, "requeued": 0}
+
+    async def add(self, record: dict, message) -> None:
+        if not self._rows:
+            self._oldest = time.monotonic()
+        self._rows.append(record)
+        self._messages.append(message)
+        if len(self._rows) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._rows:
+            return
+        rows, messages = self._rows, self._messages
+        self._rows, self._messages, self._oldest = [], [], None
+        task = asyncio.ensure_future(self._flush(rows, messages))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+        # Cancelling the caller (e.g. the timer loop at shutdown) must not
+        # abandon a batch halfway: `close` waits for it instead.
+        await asyncio.shield(task)
+
+    async def _flush(self, rows: list, messages: list) -> None:
+        try:
+            rejected = await asyncio.to_thread(self._write, rows)
+            self.stats["batches"] += 1
+            if self.frontier is not None:
+                errors = dict(rejected)
+                for row in rows:
+                    url = row.get("page_url")
+                    if url in errors:
+                        self.frontier.record(url, FAILED, errors[url])
+                    else:
+                        self.frontier.record(url, FETCHED)
+        except Exception as e:
+            logger.error(f"Writing a batch of {len(rows)} articles failed, requeueing it: {e}")
+            self.stats["requeued"] += len(messages)
+            for message in messages:
+                await message.nack(requeue=True)
+        await self.on_done(messages)
+
+    async def run(self) -> None:
+        """Flush batches that have waited long enough. Runs until cancelled."""
+        while True:
+            await asyncio.sleep(self.max_wait_s / 4)
+            if self._oldest is not None and time.monotonic() - self._oldest >= self.max_wait_s:
+                await self.flush()
+
+    async def close(self) -> None:
+        """Write what is buffered and wait for all running flushes."""
+        await self.flush()
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def _write(self, rows: list) -> list:
+        """Writes `rows`; returns (page_url, error) for each rejected row."""
+        try:
+            with self.resources.db() as db:
+                inserted = db.insert_articles(rows)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Connection problems are not the rows' fault
+            raise
+        except psycopg2.Error as e:
+            if len(rows) == 1:
+                logger.error(f"Rejected article {rows[0].get('page_url')}: {e}")
+                self.stats["rejected"] += 1
+                return [(rows[0].get("page_url"), str(e))]
+            self.stats["splits"] += 1
+            middle = len(rows) // 2
+            return self._write(rows[:middle]) + self._write(rows[middle:])
+        self.stats["inserted"] += inserted
+        self.stats["duplicates"] += len(rows) - inserted
+        return []
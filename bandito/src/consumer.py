@@ -1,20 +1,21 @@
 import pika
 import os
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 import time
 import logging
 import signal
 from requests.adapters import HTTPAdapter, Retry
-import boto3
 from botocore.exceptions import BotoCoreError, ClientError
 from dotenv import load_dotenv
 import gzip
 from datetime import datetime
 
-# Import the PostgresManager class from the separate module
+from article_parser import build_article_record, combine_date_time, parse_article
+from frontier import FAILED, FETCHED, SKIPPED, FrontierBuffer
 from PGManager.PGManager import PGManager
+from rate_limit import SharedRateLimiter
+from resources import WorkerResources
 
 # Load environment variables from .env file
 load_dotenv()
@@ -60,32 +61,45 @@ DB_NAME = os.getenv('POSTGRES_DB')
 DB_USER = os.getenv('POSTGRES_USER')
 DB_PASSWORD = os.getenv('POSTGRES_PASSWORD')
 
+# Pooled connections are pinged before reuse after this many idle seconds
+PG_HEALTHCHECK_AFTER_S = float(os.getenv('PG_HEALTHCHECK_AFTER_S', '30'))
+# Log the per-message resource overhead every N messages
+REPORT_EVERY = 100
+
+# Worker-lifetime PostgreSQL pool and S3 client (set up in start_consumer)
+resources = None
+
+# Crawl state changes, written to crawl_frontier in batches
+frontier = FrontierBuffer()
+
+# Per-domain request rate shared with the other consumers and the producer (set up in start_consumer)
+limiter = None
 
 # ------------------------------------------------------------------------------
 # Helper Functions
 # ------------------------------------------------------------------------------
-def combine_date_time(date_str: str, time_str: str):
+def create_resources(pool_max: int = 1, s3_pool_size: int = 10) -> WorkerResources:
     """
-    Combine a date string (yyyymmdd) and time string (HH:MM)
-    into a Python datetime object.
-    
-    Returns None if either input is missing or improperly formatted.
+    Build (and start) the worker's PostgreSQL pool and S3 client. The articles
+    table is ensured here, once per worker.
     """
-    try:
-        if not date_str or not time_str:
-            return None
-        date_str = date_str.strip()
-        time_str = time_str.strip()
-        formatted_date = f"{date_str[0:4]}-{date_str[4:6]}-{date_str[6:8]}"
-        dt_str = f"{formatted_date} {time_str}"
-        return datetime.strptime(dt_str, "%Y-%m-%d %H:%M")
-    except (ValueError, IndexError):
-        logging.error(f"Invalid date/time format: '{date_str}', '{time_str}'")
-        return None
-
-def upload_to_s3(article_content: str, publish_dt, content_id):
+    worker_resources = WorkerResources(
+        DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD,
+        pool_min=1,
+        pool_max=pool_max,
+        healthcheck_after_s=PG_HEALTHCHECK_AFTER_S,
+        s3_region=AWS_REGION_NAME,
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+        s3_pool_size=s3_pool_size,
+    )
+    worker_resources.start()
+    return worker_resources
+
+def upload_to_s3(article_content: str, publish_dt, content_id, worker_resources: WorkerResources):
     """
-    Compress article_content and upload it to AWS S3.
+    Compress article_content and upload it to AWS S3 with the worker's shared
+    S3 client.
     
     The S3 key is built based on the publish date:
       s3://S3_BUCKET_NAME/coindesk/YYYY/MM/DD/coindesk_article_{content_id}.txt.gz
@@ -108,14 +122,7 @@ def upload_to_s3(article_content: str, publish_dt, content_id):
     compressed_content = gzip.compress(original_bytes)
     
     try:
-        s3_client = boto3.client(
-            's3',
-            region_name=AWS_REGION_NAME,
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY
-        )
-        
-        s3_client.put_object(
+        worker_resources.upload(
             Bucket=S3_BUCKET_NAME,
             Key=s3_key,
             Body=compressed_content,
@@ -135,100 +142,71 @@ def upload_to_s3(article_content: str, publish_dt, content_id):
 def process_url(coindesk_sitemap_link: str) -> None:
     """
     Process a given URL:
-      - Connect to the database using PostgresManager.
-      - Ensure the articles table exists.
+      - Borrow a pooled database connection.
       - Check for duplicate entries.
-      - Fetch the page, extract metadata and content.
+      - Fetch the page under the shared rate limit, extract metadata and content.
       - Upload article content to S3.
       - Insert the article record into the database.
+    The outcome is recorded in the crawl frontier.
     """
     try:
-        # Use the PostgresManager as a context manager
-        with PGManager(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD) as db:
-            db.create_table_if_not_exists()
-
+        with resources.db() as db:
             if db.article_exists(coindesk_sitemap_link):
                 logging.info(f"{coindesk_sitemap_link} already exists in the articles table.")
+                frontier.record(coindesk_sitemap_link, FETCHED)
                 return
 
             parsed = urlparse(coindesk_sitemap_link)
             if parsed.netloc not in ALLOWED_DOMAINS:
                 logging.info(f"Domain {parsed.netloc} not allowed. Skipping URL: {coindesk_sitemap_link}")
+                frontier.record(coindesk_sitemap_link, SKIPPED)
                 return
 
+            limiter.wait(parsed.netloc)
+            started = time.monotonic()
             try:
                 response = session.get(coindesk_sitemap_link, timeout=10)
+                limiter.record(parsed.netloc, response.status_code, time.monotonic() - started,
+                               response.headers.get("Retry-After"))
                 response.raise_for_status()
             except requests.exceptions.RequestException as e:
+                if e.response is None:
+                    limiter.record(parsed.netloc, None, time.monotonic() - started)
                 logging.error(f"Request failed for {coindesk_sitemap_link}: {e}")
+                frontier.record(coindesk_sitemap_link, FAILED, str(e))
                 return
 
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            # Ensure the article is English and of the correct type
-            page_category = soup.find("meta", attrs={"name": "page_category"})
-            content_language = soup.find("meta", attrs={"name": "content_language"})
-            if not (page_category and page_category.get("content") == "article_page" and
-                    content_language and content_language.get("content") == "en"):
+            data = parse_article(response.text)
+            if data is None:
                 logging.info(f"Not an English article. Skipping: {coindesk_sitemap_link}")
+                frontier.record(coindesk_sitemap_link, SKIPPED)
                 return
 
-            data = {}
-            meta_tags = [
-                "page_url", "authors", "content_id", "content_language", "content_title",
-                "content_tier", "content_type", "content_vertical", "create_date",
-                "create_time", "display_date", "display_time", "last_modified_date",
-                "last_modified_time", "page_category", "publish_date", "publish_time", "tags"
-            ]
-            for tag in meta_tags:
-                meta = soup.find("meta", attrs={"name": tag})
-                data[tag] = meta["content"] if meta else None
-
-            og_tags = ["og:title", "og:description", "og:site_name"]
-            for tag in og_tags:
-                meta = soup.find("meta", attrs={"property": tag})
-                data[tag] = meta["content"] if meta else None
-
-            article_body = soup.find("div", attrs={"data-module-name": "article-body"})
-            data["article_content"] = article_body.get_text(separator=" ") if article_body else ""
-
             logging.info(f"Extracted article: {data.get('og:title', 'Unknown Title')}")
 
-            display_datetime = combine_date_time(data.get('display_date'), data.get('display_time'))
-            last_modified_datetime = combine_date_time(data.get('last_modified_date'), data.get('last_modified_time'))
             publish_datetime = combine_date_time(data.get('publish_date'), data.get('publish_time'))
-            create_datetime = combine_date_time(data.get('create_date'), data.get('create_time'))
-
             s3_url, original_size, compressed_size = upload_to_s3(
                 data["article_content"], 
                 publish_datetime, 
-                data["content_id"]
+                data["content_id"],
+                resources
             )
 
-            article_data = {
-                'display_datetime':       display_datetime,
-                'last_modified_datetime': last_modified_datetime,
-                'publish_datetime':       publish_datetime,
-                'create_datetime':        create_datetime,
-                'content_vertical':       data.get('content_vertical'),
-                'og_description':         data.get('og:description'),
-                'content_type':           data.get('content_type'),
-                'page_url':               data.get('page_url'),
-                'og_title':               data.get('og:title'),
-                'content_title':          data.get('content_title'),
-                'og_site_name':           data.get('og:site_name'),
-                'tags':                   data.get('tags'),
-                'authors':                data.get('authors'),
-                'content_tier':           data.get('content_tier'),
-                'article_s3_url':         s3_url
-            }
-
+            article_data = build_article_record(data, s3_url)
             db.insert_article(article_data)
-
-            # Adaptive delay to prevent IP blocking
-            time.sleep(min(5, max(1, len(data["article_content"]) // 500)))
+            frontier.record(coindesk_sitemap_link, FETCHED)
     except Exception as e:
         logging.error(f"Error processing URL {coindesk_sitemap_link}: {e}")
+        frontier.record(coindesk_sitemap_link, FAILED, str(e))
+
+
+def flush_frontier() -> None:
+    """Write the buffered crawl states (kept for the next try on failure)."""
+    try:
+        with resources.db() as db:
+            frontier.flush(db)
+    except Exception as e:
+        logging.error(f"Could not record crawl states: {e}")
 
 
 def callback(ch, method, properties, body):
@@ -240,11 +218,17 @@ def callback(ch, method, properties, body):
     except Exception as e:
         logging.error(f"Error processing URL {coindesk_sitemap_link}: {e}")
     ch.basic_ack(delivery_tag=method.delivery_tag)
+    if frontier.due():
+        flush_frontier()
+    if resources.stats["db_checkouts"] % REPORT_EVERY == 0:
+        logging.info(f"Resource overhead: {resources.report()}")
 
 
 def start_consumer():
     """Start RabbitMQ consumer with automatic reconnection."""
-    global should_exit
+    global should_exit, resources, limiter
+    resources = create_resources()
+    limiter = SharedRateLimiter(PGManager(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD))
     while not should_exit:
         try:
             connection = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST))
@@ -257,6 +241,7 @@ def start_consumer():
         except pika.exceptions.AMQPConnectionError:
             logging.error("Lost connection to RabbitMQ. Reconnecting in 5 seconds...")
             time.sleep(5)
+    flush_frontier()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+import logging
+import time
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# crawl_frontier states
+DISCOVERED = "discovered"
+QUEUED = "queued"
+FETCHED = "fetched"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class FrontierBuffer:
+    """
+    Collects crawl state changes and writes them to crawl_frontier in one
+    upsert, instead of one statement per URL.
+
+    Changes to the same URL are merged: the latest state and error win and
+    failed attempts add up. `due()` says when `batch_size` URLs are waiting
+    or the oldest change has waited `max_wait_s`. If a write fails, the rows
+    are kept and merged into the next one.
+    """
+
+    def __init__(self, batch_size: int = 100, max_wait_s: float = 5) -> None:
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_s
+        self._pending = {}  # url -> [state, attempts, last_error]
+        self._oldest = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, url: str, state: str, error: str = None) -> None:
+        if not self._pending:
+            self._oldest = time.monotonic()
+        entry = self._pending.setdefault(url, [state, 0, None])
+        entry[0] = state
+        entry[2] = error
+        if state == FAILED:
+            entry[1] += 1
+
+    def due(self) -> bool:
+        return bool(self._pending) and (
+            len(self._pending) >= self.batch_size or time.monotonic() - self._oldest >= self.max_wait_s
+        )
+
+    def take(self) -> list:
+        """Remove and return the pending changes as upsert rows."""
+        rows = [(url, state, attempts, error) for url, (state, attempts, error) in self._pending.items()]
+        self._pending, self._oldest = {}, None
+        return rows
+
+    def restore(self, rows: list) -> None:
+        """Put back rows whose write failed, under any newer changes."""
+        for url, state, attempts, error in rows:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            entry = self._pending.setdefault(url, [state, 0, error])
+            entry[1] += attempts
+
+    def flush(self, db) -> bool:
+        """
+        Upsert the pending changes with a PGManager. On failure they are
+        restored and False is returned.
+        """
+        rows = self.take()
+        if not rows:
+            return True
+        try:
+            db.upsert_frontier_states(rows)
+            return True
+        except psycopg2.Error as e:
+            logger.error(f"Recording {len(rows)} crawl states failed; retrying with the next batch: {e}")
+            self.restore(rows)
+            return False
@@ -1,10 +1,15 @@
+import hashlib
 import logging
 import time
 import requests
 import pika
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin,urlparse
+import psycopg2
 from PGManager.PGManager import PGManager  # import our DB manager
+from sitemap_parser import parse_sitemap_index, parse_sitemap_page
+from url_filter import BloomFilter
+from frontier import FAILED, FETCHED, QUEUED, SKIPPED, FrontierBuffer
+from rate_limit import SharedRateLimiter
+from urllib.parse import urlparse
 import os
 from dotenv import load_dotenv
 
@@ -18,6 +23,30 @@ DB_NAME = os.getenv('POSTGRES_DB')
 DB_USER = os.getenv('POSTGRES_USER')
 DB_PASSWORD = os.getenv('POSTGRES_PASSWORD')
 
+# Bloom filter of known URLs, kept between runs in a snapshot file
+URL_FILTER_PATH = os.getenv('URL_FILTER_PATH', 'url_filter.bloom')
+URL_FILTER_CAPACITY = int(os.getenv('URL_FILTER_CAPACITY', '1000000'))
+URL_FILTER_ERROR_RATE = float(os.getenv('URL_FILTER_ERROR_RATE', '0.001'))
+
+# Failed URLs are re-queued until they have failed this many times
+FRONTIER_MAX_ATTEMPTS = int(os.getenv('FRONTIER_MAX_ATTEMPTS', '3'))
+# Queued URLs not processed after this long are assumed lost and re-queued
+FRONTIER_REQUEUE_AFTER_S = float(os.getenv('FRONTIER_REQUEUE_AFTER_S', str(24 * 3600)))
+
+# Sitemap links outside these domains, or under these sections, are not crawled
+ALLOWED_DOMAINS = {"www.coindesk.com"}
+IGNORE_SECTIONS = {"video", "videos", "podcast", "podcasts", "webinar", "webinars", "price", "focus", "author", "tag"}
+
+# Every Nth cycle (and the first) walks all sitemap pages instead of stopping
+# at the first page without new links
+SITEMAP_FULL_SWEEP_EVERY = int(os.getenv('SITEMAP_FULL_SWEEP_EVERY', '24'))
+# Shortest time between the starts of two cycles
+SITEMAP_CYCLE_INTERVAL_S = float(os.getenv('SITEMAP_CYCLE_INTERVAL_S', '60'))
+
+
+def hash_links(links):
+    """Order-independent hash of a sitemap page's link set."""
+    return hashlib.sha256("\n".join(sorted(set(links))).encode()).hexdigest()
 
 
 
@@ -26,7 +55,20 @@ class SitemapCrawler:
     A crawler that extracts sitemap page links, fetches all links from those pages,
     and pushes new links to RabbitMQ for further processing while caching page URLs.
     
-    The cache (stored in a PostgreSQL table) prevents re-queuing links that have already been processed.
+    Known URLs (stored articles and pushed links) are kept in a Bloom filter
+    instead of a set of every URL. A link the filter has never seen is new; a
+    link it may have seen is looked up in the crawl_frontier table, which
+    records the state of every pushed URL (see cache_and_push), so a false
+    positive never drops an article and a restart does not re-push queued
+    work.
+
+    Sitemap pages are crawled incrementally (see run): each page's ETag,
+    Last-Modified and link-set hash are kept in the sitemap_pages table, pages
+    are fetched with If-None-Match / If-Modified-Since, and unchanged pages
+    are not looked at again.
+
+    Requests go out at the per-domain rate shared with the consumers
+    (rate_limit.SharedRateLimiter) instead of after a fixed delay.
     """
 
     def __init__(self, base_url, sitemap_start, rabbitmq_host='rabbitmq', delay=5):
@@ -34,11 +76,11 @@ class SitemapCrawler:
         :param base_url: The base URL of the website.
         :param sitemap_start: The sitemap path (from the base URL) to start extraction.
         :param rabbitmq_host: RabbitMQ server host.
-        :param delay: Delay (in seconds) between requests.
+        :param delay: Shortest pause (in seconds) between two cycles.
         """
         self.base_url = base_url
-        self.allowed_domains = {"www.coindesk.com"}
-        self.ignore_sections = {"video", "videos", "podcast", "podcasts", "webinar", "webinars", "price", "focus", "author", "tag"}
+        self.allowed_domains = ALLOWED_DOMAINS
+        self.ignore_sections = IGNORE_SECTIONS
         self.sitemap_start = sitemap_start
         self.delay = delay
         self.session = requests.Session()
@@ -52,88 +94,272 @@ class SitemapCrawler:
         # Configure logging (this configuration applies to all imported modules)
         logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
         
-        # Initialize the database manager and load the URL cache.
+        self.init_state()
+        self.limiter = SharedRateLimiter(PGManager(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD))
+
+    def init_state(self):
+        """
+        Connect to PostgreSQL and load the crawl state: the URL filter, the
+        frontier buffer and the sitemap page states.
+        """
+        # Initialize the database manager and load the URL filter.
         self.db = PGManager(DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD)
         self.db.connect()
         self.db.create_table_if_not_exists()
-        # Load cached page_urls from the database and store them in a set.
-        self.cached_urls = set(self.db.get_article_field_list("page_url"))
-        logging.info(f"Initialized URL cache with {len(self.cached_urls)} URLs.")
+        self.db.create_frontier_table_if_not_exists()
+        self.url_filter = self.load_url_filter()
+        self.frontier = FrontierBuffer()
+        self.filter_stats = {"positives": 0, "known": 0}
+
+        # Sitemap page validators and link-set hashes, by page URL
+        self.db.create_sitemap_table_if_not_exists()
+        self.sitemap_states = self.db.get_sitemap_states()
+        self.index_links = []
+        self.cycle = 0
+        self.sitemap_stats = {"fetched": 0, "not_modified": 0, "unchanged": 0, "pushed": 0, "retried": 0}
+        logging.info(f"Loaded state for {len(self.sitemap_states)} sitemap pages.")
+
+    def load_url_filter(self):
+        """
+        Load the URL filter from its snapshot and add the articles stored since
+        the snapshot was saved. Without a usable snapshot (missing, corrupt, or
+        sized with other settings) the filter is built from the articles table.
+        """
+        url_filter = None
+        if os.path.exists(URL_FILTER_PATH):
+            try:
+                url_filter = BloomFilter.load(URL_FILTER_PATH)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring URL filter snapshot {URL_FILTER_PATH}: {e}")
+        if url_filter and (url_filter.capacity, url_filter.error_rate) != (URL_FILTER_CAPACITY, URL_FILTER_ERROR_RATE):
+            logging.info("URL filter settings changed; rebuilding it from the articles table.")
+            url_filter = None
+        if url_filter is None:
+            url_filter = BloomFilter(URL_FILTER_CAPACITY, URL_FILTER_ERROR_RATE)
+            # Queued, failed and skipped URLs are not in the articles table
+            for url in self.db.iter_frontier_urls():
+                url_filter.add(url)
+
+        loaded = len(url_filter)
+        for article_id, page_url in self.db.iter_page_urls(after_id=url_filter.last_article_id):
+            url_filter.add(page_url)
+            url_filter.last_article_id = article_id
+        logging.info(
+            f"Initialized URL filter with {len(url_filter)} URLs ({loaded} from the snapshot or crawl_frontier, "
+            f"{len(url_filter) - loaded} from the articles table; {len(url_filter.bits) / 1e6:.1f} MB)."
+        )
+        self.save_url_filter(url_filter)
+        return url_filter
+
+    def save_url_filter(self, url_filter=None):
+        """Write the URL filter snapshot so the next start skips the table scan."""
+        try:
+            (url_filter or self.url_filter).save(URL_FILTER_PATH)
+        except OSError as e:
+            logging.error(f"Could not save URL filter snapshot {URL_FILTER_PATH}: {e}")
+
+    def conditional_headers(self, key):
+        """If-None-Match / If-Modified-Since for the validators stored under `key`."""
+        state = self.sitemap_states.get(key, {})
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    def get(self, url, headers=None):
+        """GET `url` under the shared rate limit, and report how it went."""
+        domain = urlparse(url).netloc
+        self.limiter.wait(domain)
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, headers=headers)
+        except requests.exceptions.RequestException:
+            self.limiter.record(domain, None, time.monotonic() - started)
+            raise
+        self.limiter.record(domain, response.status_code, time.monotonic() - started,
+                            response.headers.get("Retry-After"))
+        return response
+
+    def conditional_get(self, url, state_key=None):
+        """GET `url`, sending the validators stored for it (or for `state_key`)."""
+        return self.get(url, headers=self.conditional_headers(state_key or url))
+
+    def links_unchanged(self, sitemap_url, links):
+        """True if a sitemap page lists the same links as when it was last processed."""
+        return hash_links(links) == self.sitemap_states.get(sitemap_url, {}).get("links_hash")
+
+    def save_sitemap_state(self, key, response, links, changed):
+        """Remember a fetched page's validators (from a requests or httpx response) and link-set hash."""
+        state = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "links_hash": hash_links(links),
+        }
+        self.sitemap_states[key] = state
+        self.db.save_sitemap_state(key, state["etag"], state["last_modified"], state["links_hash"],
+                                   len(links), changed)
 
     def get_sitemap_links(self):
-        """Extracts all sitemap page links from the base sitemap page."""
+        """
+        Extracts all sitemap page links from the base sitemap page. The list
+        is reused while the page answers 304 Not Modified.
+        """
         starting_sitemap = f'{self.base_url}{self.sitemap_start}'
+        # The start page is also a sitemap page; its navigation has its own state
+        state_key = f"{starting_sitemap}#index"
         logging.info(f"Fetching sitemap index: {starting_sitemap}")
-        response = self.session.get(starting_sitemap)
+        response = self.conditional_get(starting_sitemap, state_key)
+        if response.status_code == 304 and self.index_links:
+            return self.index_links
+        if response.status_code == 304:
+            # Validators survived a restart, the link list did not
+            response = self.get(starting_sitemap)
         if response.status_code != 200:
             logging.error(f"Failed to fetch sitemap index: {starting_sitemap}")
             return []
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        sitemap_links = []
-        try:
-            section = soup.find("section", attrs={"data-module-name": "section"})
-            if section:
-                nav = section.find("nav", attrs={"role": "navigation"})
-                if nav:
-                    a_tags = nav.find_all("a", href=True)
-                    sitemap_links = [urljoin(self.base_url, a["href"]) for a in a_tags]
-        except Exception as e:
-            logging.error(f"Error extracting sitemap links: {e}")
-        
+
+        sitemap_links = parse_sitemap_index(response.text, self.base_url)
+        if sitemap_links:
+            self.save_sitemap_state(state_key, response, sitemap_links,
+                                    changed=sitemap_links != self.index_links)
+            self.index_links = sitemap_links
         return sitemap_links
 
     def process_sitemap(self, sitemap_url):
-        """Fetches links from a given sitemap page and pushes new ones to RabbitMQ."""
+        """
+        Fetches a sitemap page (conditionally) and pushes its new links to RabbitMQ.
+
+        Returns:
+            int: The number of links pushed; 0 if the page is unchanged (304,
+            or the same link set as last time). None if the page could not be
+            fetched or its links not looked up.
+        """
         logging.info(f"Processing sitemap: {sitemap_url}")
-        response = self.session.get(sitemap_url)
+        response = self.conditional_get(sitemap_url)
+        if response.status_code == 304:
+            self.sitemap_stats["not_modified"] += 1
+            return 0
         if response.status_code != 200:
             logging.error(f"Failed to fetch sitemap: {sitemap_url}")
-            return
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        links = []
+            return None
+        self.sitemap_stats["fetched"] += 1
+
+        links = parse_sitemap_page(response.text, sitemap_url, self.base_url, self.allowed_domains,
+                                   self.ignore_sections)
+        if self.links_unchanged(sitemap_url, links):
+            self.sitemap_stats["unchanged"] += 1
+            self.save_sitemap_state(sitemap_url, response, links, changed=False)
+            return 0
+
+        # Push the links that are new (or due for a retry) and record them in the frontier.
+        pushed = self.cache_and_push(links)
+        if pushed is None:
+            # Keep the old hash so these links are looked at again next cycle
+            return None
+        self.sitemap_stats["pushed"] += pushed
+        self.save_sitemap_state(sitemap_url, response, links, changed=True)
+        return pushed
+
+    def cache_and_push(self, links):
+        """
+        Pushes the links of one sitemap page that are new, or due for a retry,
+        to RabbitMQ, and records them as queued in crawl_frontier with one
+        lookup and one upsert per page.
+
+        Links the URL filter has never seen are new. For the others the
+        frontier decides: queued, fetched and skipped links are not pushed
+        again, failed links are retried until they have failed
+        FRONTIER_MAX_ATTEMPTS times, and queued links are pushed again after
+        FRONTIER_REQUEUE_AFTER_S. Links missing from the frontier (filter
+        false positives, articles stored by other writers) are checked
+        against the articles table.
+
+        Returns the number of links pushed, or None if the lookup failed.
+        """
+        to_push = self.select_links_to_push(links)
+        if to_push is None:
+            return None
+        for link in to_push:
+            self.push_to_rabbitmq(link)
+            self.frontier.record(link, QUEUED)
+        self.frontier.flush(self.db)
+        return len(to_push)
+
+    def select_links_to_push(self, links):
+        """
+        The database half of cache_and_push: returns the links to push (new
+        ones are added to the URL filter), or None if the lookup failed.
+        Links found in the articles table are recorded as fetched.
+        """
+        links = list(dict.fromkeys(links))
+        maybe_known = [link for link in links if link in self.url_filter]
         try:
-            section_tags = soup.find_all("section", attrs={"data-module-name": "section"})
-            # Adjust the following parsing logic as needed for your sitemap page structure.
-            link_grid = section_tags[0].find("div", recursive=False).find_all("div", recursive=False)[1]
-            a_tags = link_grid.find_all("a", href=True)
-            for a in a_tags:
-                href = a["href"].strip()
-                parsed = urlparse(href)
-                # Check if the URL path starts with any value in self.ignore_section
-                if not parsed.path:
-                    continue
-
-                if parsed.path.split("/")[1] in self.ignore_sections:
-                    continue
-
-                # Build url based on href format
-                if not parsed.netloc:
-                    links.append(urljoin(self.base_url, href))
-                elif parsed.netloc in self.allowed_domains:
-                    links.append(href)
-        except Exception as e:
-            logging.info(f"[process_sitemap error] {sitemap_url} -> {e}")
-            logging.info("Issue with parsing the sitemap links")
-        
-        # For each link, check the cache; if it's new, push to RabbitMQ and cache it.
+            states = self.db.get_frontier_states(maybe_known) if maybe_known else {}
+            unknown = [link for link in maybe_known if link not in states]
+            stored = self.db.get_existing_page_urls(unknown) if unknown else set()
+        except psycopg2.Error as e:
+            logging.error(f"Frontier lookup failed; skipping {len(links)} links until the next cycle: {e}")
+            self.db.conn.rollback()
+            return None
+        self.filter_stats["positives"] += len(maybe_known)
+        self.filter_stats["known"] += len(states) + len(stored)
+
+        maybe_known = set(maybe_known)
+        to_push = []
         for link in links:
-            self.cache_and_push(link)
-        
-        time.sleep(self.delay)
+            if link in stored:
+                self.frontier.record(link, FETCHED)
+                continue
+            if not self.should_push(states.get(link)):
+                continue
+            if link not in maybe_known:
+                self.url_filter.add(link)
+            to_push.append(link)
+        return to_push
 
-    def cache_and_push(self, link):
+    def select_due_links(self):
         """
-        Checks if the link is already cached. If not, pushes it to RabbitMQ and
-        caches it in the database.
+        Links in the frontier that should_push would push again: failed links
+        with attempts left and links queued longer than
+        FRONTIER_REQUEUE_AFTER_S. Unchanged sitemap pages never get to
+        cache_and_push, so full sweeps look these up once per cycle. Returns
+        None if the lookup failed.
         """
-        if link in self.cached_urls:
-            # logging.info(f"Link already cached, skipping: {link}")
-            return
-        
-        self.push_to_rabbitmq(link)
-        self.cached_urls.add(link)
+        try:
+            return self.db.get_due_frontier_urls(FRONTIER_MAX_ATTEMPTS, FRONTIER_REQUEUE_AFTER_S)
+        except psycopg2.Error as e:
+            logging.error(f"Frontier lookup of links due for a retry failed; trying again next sweep: {e}")
+            self.db.conn.rollback()
+            return None
+
+    def push_due_links(self):
+        """Pushes the links from select_due_links. Returns the number pushed, or None."""
+        due = self.select_due_links()
+        if due is None:
+            return None
+        for link in due:
+            self.push_to_rabbitmq(link)
+            self.frontier.record(link, QUEUED)
+        self.frontier.flush(self.db)
+        self.sitemap_stats["retried"] += len(due)
+        return len(due)
+
+    @staticmethod
+    def should_push(known):
+        """
+        Decide from a frontier entry (state, attempts, seconds since update),
+        or None for an unknown link, whether to push the link.
+        """
+        if known is None:
+            return True
+        state, attempts, age_s = known
+        if state == FAILED:
+            return attempts < FRONTIER_MAX_ATTEMPTS
+        if state == QUEUED:
+            return age_s >= FRONTIER_REQUEUE_AFTER_S
+        return state not in (FETCHED, SKIPPED)
 
     def push_to_rabbitmq(self, link):
         """Pushes an extracted link to the RabbitMQ queue."""
@@ -141,17 +367,53 @@ class SitemapCrawler:
         self.channel.basic_publish(exchange='', routing_key='sitemap_links', body=link)
 
 
+    def start_cycle(self):
+        """Reset the per-cycle counters. Returns whether this cycle is a full sweep."""
+        full_sweep = self.cycle % SITEMAP_FULL_SWEEP_EVERY == 0
+        self.cycle += 1
+        self.sitemap_stats = {"fetched": 0, "not_modified": 0, "unchanged": 0, "pushed": 0, "retried": 0}
+        return full_sweep
+
+    def finish_cycle(self, full_sweep):
+        """Save the URL filter and log the cycle's counters and the crawl coverage."""
+        logging.info(f"Sitemap cycle {self.cycle} ({'full sweep' if full_sweep else 'incremental'}): {self.sitemap_stats}")
+        self.save_url_filter()
+        logging.info(
+            f"URL filter: {len(self.url_filter)} URLs, {self.filter_stats['positives']} positives, "
+            f"{self.filter_stats['known']} known to the database. "
+            f"Crawl coverage: {self.db.frontier_coverage()}"
+        )
+
     def run(self):
-        """Main execution loop for sitemap crawling."""
+        """
+        Main execution loop for sitemap crawling.
+
+        The index lists sitemap pages newest first, so new articles show up on
+        the first pages. A cycle walks the pages in that order and stops at the
+        first page that yields no new links. The first cycle and every
+        SITEMAP_FULL_SWEEP_EVERY-th walk all pages (mostly 304s), to pick up
+        edits to older pages, and then push the frontier's links that are due
+        for a retry or requeue (push_due_links).
+        """
         while True:
+            cycle_started = time.monotonic()
+            full_sweep = self.start_cycle()
             # Uncomment for testing single sitemap 
             # self.process_sitemap("https://www.coindesk.com/sitemap/76")
             sitemap_links = self.get_sitemap_links()
-            for sitemap_link in sitemap_links:
-                self.process_sitemap(sitemap_link)
-            
+            for position, sitemap_link in enumerate(sitemap_links, start=1):
+                pushed = self.process_sitemap(sitemap_link)
+                if pushed == 0 and not full_sweep:
+                    logging.info(
+                        f"No new links on {sitemap_link}; stopping after {position} of {len(sitemap_links)} pages."
+                    )
+                    break
+            if full_sweep:
+                self.push_due_links()
+
+            self.finish_cycle(full_sweep)
             logging.info("Restarting sitemap extraction cycle...")
-            time.sleep(self.delay)
+            time.sleep(max(self.delay, SITEMAP_CYCLE_INTERVAL_S - (time.monotonic() - cycle_started)))
 
 
 if __name__ == "__main__":
@@ -160,6 +422,9 @@ if __name__ == "__main__":
         crawler.run()
     except KeyboardInterrupt:
         logging.info("Shutting down crawler.")
+        crawler.frontier.flush(crawler.db)
+        crawler.save_url_filter()
         crawler.connection.close()
         if crawler.db.conn:
-            crawler.db.conn.close()
\ No newline at end of file
+            crawler.db.conn.close()
+        crawler.limiter.db.conn.close()
\ No newline at end of file
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Shared per-domain request rate (requests per second): where a domain starts,
+# and the bounds adaptation keeps it in
+CRAWL_RATE_PER_DOMAIN = float(os.getenv("CRAWL_RATE_PER_DOMAIN", "2"))
+CRAWL_RATE_MIN = float(os.getenv("CRAWL_RATE_MIN", "0.2"))
+CRAWL_RATE_MAX = float(os.getenv("CRAWL_RATE_MAX", "8"))
+# Requests that may go at once to a domain that has been idle
+CRAWL_RATE_BURST = int(os.getenv("CRAWL_RATE_BURST", "1"))
+# AIMD: add CRAWL_RATE_INCREASE req/s at most every CRAWL_RATE_ADJUST_INTERVAL_S
+# while responses take less than CRAWL_LATENCY_TARGET_S; multiply by
+# CRAWL_RATE_DECREASE (at most once per interval) on 429s, 5xx and timeouts
+CRAWL_RATE_INCREASE = float(os.getenv("CRAWL_RATE_INCREASE", "0.25"))
+CRAWL_RATE_DECREASE = float(os.getenv("CRAWL_RATE_DECREASE", "0.5"))
+CRAWL_RATE_ADJUST_INTERVAL_S = float(os.getenv("CRAWL_RATE_ADJUST_INTERVAL_S", "10"))
+CRAWL_LATENCY_TARGET_S = float(os.getenv("CRAWL_LATENCY_TARGET_S", "2"))
+# Longest Retry-After honored
+RETRY_AFTER_MAX_S = 600
+# After a database error, requests are spaced locally for this long before the database is tried again
+DB_RETRY_AFTER_S = 30
+
+# Statuses that mean the site wants fewer requests
+THROTTLE_STATUSES = {429, 503}
+
+
+def parse_retry_after(value) -> float:
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date); 0 if absent or invalid."""
+    if not value:
+        return 0.0
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return 0.0
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX_S)
+
+
+class DomainRateLimiter:
+    """
+    Spaces out requests to each domain so that all tasks of a process together
+    stay at or below `rate` requests per second per domain.
+
+    Each `acquire` reserves the next free slot for the domain and sleeps until
+    it comes up, so concurrent callers queue in order instead of waking at the
+    same time. The rate is fixed; SharedRateLimiter is the adaptive,
+    cross-process version.
+    """
+
+    def __init__(self, rate: float) -> None:
+        """
+        :param rate: Requests per second allowed for each domain (<= 0 disables limiting).
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = defaultdict(float)
+
+    def reserve(self, domain: str) -> float:
+        """Reserve the domain's next slot; returns the seconds until it comes up."""
+        if not self.interval:
+            return 0.0
+        now = time.monotonic()
+        slot = max(now, self._next_slot[domain])
+        self._next_slot[domain] = slot + self.interval
+        return slot - now
+
+    async def acquire(self, domain: str) -> None:
+        """Wait until a request to `domain` may be sent."""
+        delay = self.reserve(domain)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def report(self, domain: str, status, latency_s: float, retry_after: str = None) -> None:
+        """A fixed rate ignores how requests went."""
+
+
+class SharedRateLimiter:
+    """
+    Per-domain request rate shared by every producer and consumer process,
+    adapted to how the site responds.
+
+    Each domain is a token bucket kept in the domain_rate_limits table:
+    every request, from any process, reserves the next slot of the domain's
+    schedule with one atomic upsert (PGManager.reserve_request_slot) and
+    waits for it, so all replicas together stay at the domain's rate. After
+    each response the caller reports the outcome:
+
+      - a response faster than `latency_target_s` raises the rate by
+        `increase` (at most every `adjust_interval_s`, and only while
+        requests are waiting for slots);
+      - a 429, a 5xx or a timeout / connection error multiplies it by
+        `decrease` (at most once per `adjust_interval_s`);
+      - a Retry-After on a 429 or 503 blocks the domain for that long, for
+        every process.
+
+    The rate stays within [min_rate, max_rate]. If the database cannot be
+    reached, requests are spaced locally at `min_rate`, and the database is
+    tried again after DB_RETRY_AFTER_S.
+
+    `reserve`/`wait`/`record` are the blocking API for the synchronous
+    crawlers; `acquire`/`report` run them in a thread for the asyncio ones.
+    The database calls of a process go through one connection, one at a time.
+    """
+
+    def __init__(self, db, initial_rate: float = CRAWL_RATE_PER_DOMAIN, min_rate: float = CRAWL_RATE_MIN,
+                 max_rate: float = CRAWL_RATE_MAX, burst: int = CRAWL_RATE_BURST,
+                 increase: float = CRAWL_RATE_INCREASE, decrease: float = CRAWL_RATE_DECREASE,
+                 adjust_interval_s: float = CRAWL_RATE_ADJUST_INTERVAL_S,
+                 latency_target_s: float = CRAWL_LATENCY_TARGET_S) -> None:
+        """
+        :param db: A PGManager for the limiter's own use (connected here if it is not yet).
+        """
+        self.db = db
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.initial_rate = min(max(initial_rate, min_rate), max_rate)
+        self.burst = max(1, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self.adjust_interval_s = adjust_interval_s
+        self.latency_target_s = latency_target_s
+        self.rates = {}  # domain -> last rate seen in the database
+        self.stats = {"slots": 0, "increases": 0, "decreases": 0, "retry_afters": 0, "db_errors": 0}
+        self._lock = threading.Lock()
+        self._blocked_until = {}  # domain -> monotonic time its Retry-After ends
+        self._fallback = DomainRateLimiter(min_rate)
+        self._db_down_until = 0.0
+        with self._lock:
+            self._ensure_connection()
+            self.db.create_rate_limit_table_if_not_exists()
+
+    def _ensure_connection(self) -> None:
+        if self.db.conn is None or self.db.conn.closed:
+            self.db.connect()
+
+    def _call(self, fn, *args):
+        with self._lock:
+            if time.monotonic() < self._db_down_until:
+                raise psycopg2.OperationalError("shared rate limit unavailable")
+            try:
+                self._ensure_connection()
+                return fn(*args)
+            except psycopg2.Error as e:
+                self.stats["db_errors"] += 1
+                if isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                    logger.error(f"Shared rate limit unavailable; spacing requests at {self.min_rate} req/s "
+                                 f"for {DB_RETRY_AFTER_S}s: {e}")
+                    self._db_down_until = time.monotonic() + DB_RETRY_AFTER_S
+                    if self.db.conn is not None:
+                        # Reconnect on the next try
+                        self.db.conn.close()
+                raise
+
+    def reserve(self, domain: str) -> float:
+        """Reserve the domain's next request slot; returns the seconds until it comes up."""
+        try:
+            delay = self._call(self.db.reserve_request_slot, domain, self.initial_rate, self.burst)
+            self.stats["slots"] += 1
+        except psycopg2.Error:
+            delay = self._fallback.reserve(domain)
+        return max(delay, self._blocked_until.get(domain, 0.0) - time.monotonic())
+
+    def wait(self, domain: str) -> None:
+        """Block until a request to `domain` may be sent."""
+        delay = self.reserve(domain)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire(self, domain: str) -> None:
+        """Wait until a request to `domain` may be sent."""
+        while True:
+            delay = await asyncio.to_thread(self.reserve, domain)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # A Retry-After that arrived while waiting moves the request behind it
+            if self._blocked_until.get(domain, 0.0) <= time.monotonic():
+                return
+
+    def record(self, domain: str, status, latency_s: float, retry_after: str = None) -> None:
+        """
+        Adapt the domain's rate to a response.
+
+        :param status: The HTTP status, or None for a timeout or connection error.
+        :param latency_s: Seconds the request took.
+        :param retry_after: The response's Retry-After header, if any.
+        """
+        try:
+            if status is None or status == 429 or status >= 500:
+                self._decrease(domain, status, parse_retry_after(retry_after) if status in THROTTLE_STATUSES else 0.0)
+            elif latency_s <= self.latency_target_s:
+                rate = self._call(self.db.increase_domain_rate, domain, self.increase, self.max_rate,
+                                  self.adjust_interval_s)
+                if rate is not None:
+                    self.stats["increases"] += 1
+                    logger.info(f"Raised the request rate for {domain} to {rate:.2f} req/s.")
+                    self.rates[domain] = rate
+        except psycopg2.OperationalError:
+            pass
+        except psycopg2.Error as e:
+            logger.error(f"Could not adapt the request rate for {domain}: {e}")
+
+    async def report(self, domain: str, status, latency_s: float, retry_after: str = None) -> None:
+        """`record` in a thread."""
+        await asyncio.to_thread(self.record, domain, status, latency_s, retry_after)
+
+    def _decrease(self, domain: str, status, retry_after_s: float) -> None:
+        result = self._call(self.db.decrease_domain_rate, domain, self.decrease, self.min_rate,
+                            self.adjust_interval_s, retry_after_s)
+        if result is None:
+            return
+        rate, blocked_s, decreased = result
+        self.rates[domain] = rate
+        if blocked_s > 0:
+            self.stats["retry_afters"] += 1
+            self._blocked_until[domain] = max(self._blocked_until.get(domain, 0.0), time.monotonic() + blocked_s)
+        if decreased:
+            self.stats["decreases"] += 1
+            cause = f"HTTP {status}" if status is not None else "a timeout or connection error"
+            logger.warning(
+                f"Lowered the request rate for {domain} to {rate:.2f} req/s after {cause}"
+                + (f"; holding requests for {blocked_s:.0f}s (Retry-After)." if blocked_s > 0 else ".")
+            )
@@ -0,0 +1,136 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import boto3
+import psycopg2
+from botocore.config import Config
+from psycopg2.pool import ThreadedConnectionPool
+
+from PGManager.PGManager import PGManager
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerResources:
+    """
+    Connections a consumer keeps for its whole lifetime instead of opening per
+    message: a pool of PostgreSQL connections and one S3 client.
+
+    - `start()` opens the pool, creates the articles and crawl_frontier tables
+      once and builds the S3 client (boto3 clients are thread-safe; its HTTP
+      pool is sized with `s3_pool_size`).
+    - `db()` lends a pooled connection wrapped in a PGManager. Connections
+      idle for more than `healthcheck_after_s` are pinged first; dead ones
+      are dropped and replaced. Callers block while all connections are
+      lent out.
+    - `stats` counts checkouts, reconnects and the time spent acquiring
+      connections and uploading, so per-message overhead can be reported.
+    """
+
+    def __init__(self, host: str, port: str, dbname: str, user: str, password: str,
+                 pool_min: int = 1, pool_max: int = 10, healthcheck_after_s: float = 30,
+                 s3_region: str = None, aws_access_key_id: str = None, aws_secret_access_key: str = None,
+                 s3_pool_size: int = 10) -> None:
+        self.dsn = dict(host=host, port=int(port) if port else 5432, dbname=dbname, user=user, password=password)
+        self.pool_min = pool_min
+        self.pool_max = pool_max
+        self.healthcheck_after_s = healthcheck_after_s
+        self.s3_options = dict(
+            region_name=s3_region,
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            config=Config(max_pool_connections=s3_pool_size, retries={"max_attempts": 3, "mode": "standard"}),
+        )
+        self.pool = None
+        self.s3 = None
+        self._slots = threading.BoundedSemaphore(pool_max)
+        self._last_used = {}
+        self.stats = {
+            "db_checkouts": 0,
+            "db_checkout_s": 0.0,
+            "db_reconnects": 0,
+            "s3_uploads": 0,
+            "s3_upload_s": 0.0,
+        }
+
+    def start(self) -> None:
+        """Open the pool, ensure the schema and build the S3 client."""
+        self.pool = ThreadedConnectionPool(self.pool_min, self.pool_max, **self.dsn)
+        with self.db() as db:
+            db.create_table_if_not_exists()
+            db.create_frontier_table_if_not_exists()
+        self.s3 = boto3.client("s3", **self.s3_options)
+        logger.info(f"Worker resources ready (PostgreSQL pool {self.pool_min}-{self.pool_max}).")
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        idle = time.monotonic() - self._last_used.get(id(conn), 0)
+        if idle < self.healthcheck_after_s:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        for _ in range(self.pool_max + 1):
+            conn = self.pool.getconn()
+            if self._healthy(conn):
+                return conn
+            logger.warning("Dropping dead PostgreSQL connection; reconnecting.")
+            self.stats["db_reconnects"] += 1
+            self._last_used.pop(id(conn), None)
+            self.pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("No healthy PostgreSQL connection available")
+
+    @contextmanager
+    def db(self):
+        """Lend a pooled connection as a PGManager (not closed on exit)."""
+        started = time.perf_counter()
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+        self.stats["db_checkouts"] += 1
+        self.stats["db_checkout_s"] += time.perf_counter() - started
+        try:
+            yield PGManager.from_connection(conn)
+        finally:
+            self._last_used[id(conn)] = time.monotonic()
+            # The pool rolls back an open transaction and closes broken connections
+            self.pool.putconn(conn, close=bool(conn.closed))
+            self._slots.release()
+
+    def upload(self, **put_object_kwargs) -> None:
+        """`put_object` on the shared S3 client, timed."""
+        started = time.perf_counter()
+        try:
+            self.s3.put_object(**put_object_kwargs)
+        finally:
+            self.stats["s3_uploads"] += 1
+            self.stats["s3_upload_s"] += time.perf_counter() - started
+
+    def report(self) -> str:
+        """One-line summary of the per-message resource overhead."""
+        checkouts = self.stats["db_checkouts"] or 1
+        uploads = self.stats["s3_uploads"] or 1
+        return (
+            f"db checkouts={self.stats['db_checkouts']} "
+            f"avg_checkout_ms={1000 * self.stats['db_checkout_s'] / checkouts:.2f} "
+            f"reconnects={self.stats['db_reconnects']} "
+            f"s3 uploads={self.stats['s3_uploads']} "
+            f"avg_upload_ms={1000 * self.stats['s3_upload_s'] / uploads:.1f}"
+        )
@@ -0,0 +1,58 @@
+import logging
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+
+
+def parse_sitemap_index(html: str, base_url: str) -> list:
+    """
+    Extract the sitemap page links from the navigation of the sitemap index.
+
+    A plain module-level function of the page text, so the async producer can
+    run it in a process pool.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    sitemap_links = []
+    try:
+        section = soup.find("section", attrs={"data-module-name": "section"})
+        if section:
+            nav = section.find("nav", attrs={"role": "navigation"})
+            if nav:
+                a_tags = nav.find_all("a", href=True)
+                sitemap_links = [urljoin(base_url, a["href"]) for a in a_tags]
+    except Exception as e:
+        logging.error(f"Error extracting sitemap links: {e}")
+    return sitemap_links
+
+
+def parse_sitemap_page(html: str, sitemap_url: str, base_url: str, allowed_domains, ignore_sections) -> list:
+    """
+    Extract the article links listed on a sitemap page: relative links and
+    links to `allowed_domains`, minus those under `ignore_sections`.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    try:
+        section_tags = soup.find_all("section", attrs={"data-module-name": "section"})
+        # Adjust the following parsing logic as needed for your sitemap page structure.
+        link_grid = section_tags[0].find("div", recursive=False).find_all("div", recursive=False)[1]
+        a_tags = link_grid.find_all("a", href=True)
+        for a in a_tags:
+            href = a["href"].strip()
+            parsed = urlparse(href)
+            # Check if the URL path starts with any value in ignore_sections
+            if not parsed.path:
+                continue
+
+            if parsed.path.split("/")[1] in ignore_sections:
+                continue
+
+            # Build url based on href format
+            if not parsed.netloc:
+                links.append(urljoin(base_url, href))
+            elif parsed.netloc in allowed_domains:
+                links.append(href)
+    except Exception as e:
+        logging.info(f"[process_sitemap error] {sitemap_url} -> {e}")
+        logging.info("Issue with parsing the sitemap links")
+    return links
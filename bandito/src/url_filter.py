@@ -0,0 +1,99 @@
+import hashlib
+import logging
+import math
+import os
+import struct
+
+logger = logging.getLogger(__name__)
+
+# magic, bit count, hash count, capacity, error rate, items added, last article id
+_HEADER = struct.Struct(">4sQIQdQQ")
+_MAGIC = b"BLM1"
+
+
+class BloomFilter:
+    """
+    Compact set membership for crawled URLs.
+
+    `url in bloom` is never wrong when it says no; when it says yes it is
+    wrong with probability about `error_rate` (while at most `capacity` URLs
+    have been added), so positives must be confirmed elsewhere. One million
+    URLs at a 0.1% error rate take 1.8 MB, against well over 100 MB for a
+    Python set of the same strings.
+
+    Positions come from one blake2b digest split into two 64-bit hashes
+    (double hashing), so results are stable across processes and the bit
+    array can be saved and loaded again.
+
+    `last_article_id` records the newest articles.id the filter has seen, so
+    a filter loaded from a snapshot only needs the rows added since.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        """
+        :param capacity: Number of URLs the filter is sized for.
+        :param error_rate: False positive probability at `capacity` URLs.
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self.last_article_id = 0
+
+    def _positions(self, url: str):
+        digest = hashlib.blake2b(url.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, url: str) -> None:
+        for pos in self._positions(url):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+        if self.count == self.capacity + 1:
+            logger.warning(
+                f"URL filter holds more than its capacity of {self.capacity} URLs; "
+                "false positives will rise until it is rebuilt with a larger URL_FILTER_CAPACITY."
+            )
+
+    def __contains__(self, url: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(url))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def save(self, path: str) -> None:
+        """Write the filter to `path` atomically (write a temp file, then rename)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.num_bits, self.num_hashes, self.capacity,
+                                 self.error_rate, self.count, self.last_article_id))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BloomFilter":
+        """
+        Read a filter written by `save`.
+
+        Raises:
+            ValueError: If the file is not a complete filter snapshot.
+        """
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError(f"{path} is not a URL filter snapshot")
+            magic, num_bits, num_hashes, capacity, error_rate, count, last_article_id = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a URL filter snapshot")
+            bits = bytearray(f.read())
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError(f"{path} is truncated")
+        bloom = cls.__new__(cls)
+        bloom.capacity, bloom.error_rate = capacity, error_rate
+        bloom.num_bits, bloom.num_hashes = num_bits, num_hashes
+        bloom.bits, bloom.count, bloom.last_article_id = bits, count, last_article_id
+        return bloom
@@ -0,0 +1,68 @@
+# tests/test_article_extractor.py
+import pytest
+
+from article_extractor import extract_article
+from article_parser import META_TAGS, OG_TAGS, parse_article, parse_article_soup
+
+HEAD = (
+    '<meta name="page_category" content="article_page">'
+    '<meta name="content_language" content="en">'
+    '<meta property="og:title" content="Title">'
+)
+
+
+def page(body: str, head: str = HEAD) -> str:
+    return f'<html><head>{head}</head><body><div data-module-name="article-body">{body}</div></body></html>'
+
+
+# Markup that libxml2 reads differently than html.parser; these pages must
+# still come out exactly as the BeautifulSoup extraction has them
+DIVERGENT_PAGES = {
+    "crlf": page("<p>a\r\n b</p>"),
+    "lone_cr": page("<p>a\r b</p>"),
+    "stray_end_tag": page("<p>one</span>two</p>"),
+    "stray_br_end_tag": page("a</br>b"),
+    "misplaced_start_tag": page("a<body>b"),
+    "cdata": page("<p>a<![CDATA[x]]>b</p>"),
+    "nul": page("a\x00b"),
+    "duplicate_meta_attribute": page("text", HEAD + '<meta name="tags" name="authors" content="Jane">'),
+    "duplicate_content_attribute": page("text", HEAD + '<meta name="tags" content="a" content="b">'),
+    "unterminated_entity": page("x&nbspy &copy2024"),
+    "unknown_entity": page("a &foo; b &notit;"),
+    "entity_in_attribute": page("text", HEAD + '<meta property="og:description" content="&copy2024">'),
+    "unclosed_comment": page("a<!-- b"),
+}
+
+WELL_FORMED_PAGES = {
+    "paragraphs": page("<p>First  paragraph.</p>\n<p>Second <a href='/x?a=1&amp;b=2'>link</a>.</p>"),
+    "skipped_strings": page("<p>a</p><script>var x = 1;</script><style>p {}</style><!-- c --><p>b</p>"),
+    "whitespace": page("<p>a</p>  \n  <p>b</p> <pre>  </pre>"),
+    "entities": page("S&P 500 &amp; AT&T &mdash; 5 &lt; 6 &#8364; &rsquo;"),
+    "quoted_gt": page("text", HEAD + '<meta property="og:description" content="a > b">'),
+    "not_an_article": '<html><head><meta name="page_category" content="home"></head><body>x</body></html>',
+}
+
+
+@pytest.mark.parametrize("name", sorted(DIVERGENT_PAGES))
+def test_divergent_markup_matches_soup(name):
+    html = DIVERGENT_PAGES[name]
+    assert parse_article(html) == parse_article_soup(html)
+
+
+@pytest.mark.parametrize("name", sorted(WELL_FORMED_PAGES))
+def test_well_formed_pages_match_soup(name):
+    html = WELL_FORMED_PAGES[name]
+    assert parse_article(html) == parse_article_soup(html)
+
+
+@pytest.mark.parametrize("name", sorted(DIVERGENT_PAGES))
+def test_divergent_markup_falls_back(name):
+    assert extract_article(DIVERGENT_PAGES[name], META_TAGS, OG_TAGS, lambda html: "fallback") == "fallback"
+
+
+@pytest.mark.parametrize("name", sorted(WELL_FORMED_PAGES))
+def test_well_formed_pages_take_the_lxml_path(name):
+    def fail(html):
+        raise AssertionError("fell back to BeautifulSoup")
+
+    extract_article(WELL_FORMED_PAGES[name], META_TAGS, OG_TAGS, fail)
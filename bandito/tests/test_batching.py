@@ -0,0 +1,144 @@
+# tests/test_batching.py
+import asyncio
+import contextlib
+from types import SimpleNamespace
+
+import psycopg2
+
+from batching import AckTracker, ArticleBatchWriter
+from frontier import FAILED, FETCHED
+
+
+class Message:
+    def __init__(self, tag: int) -> None:
+        self.delivery_tag = tag
+        self.processed = False
+        self.requeued = False
+
+    async def nack(self, requeue: bool) -> None:
+        self.processed = True
+        self.requeued = requeue
+
+
+class FakeDB:
+    """Rejects batches containing a row whose page_url starts with "bad"."""
+
+    def __init__(self, error=psycopg2.DataError) -> None:
+        self.error = error
+        self.rows = []
+
+    def insert_articles(self, rows: list) -> int:
+        if any(row["page_url"].startswith("bad") for row in rows):
+            raise self.error("bad row")
+        self.rows.extend(rows)
+        return len(rows)
+
+
+class FakeFrontier:
+    def __init__(self) -> None:
+        self.states = {}
+
+    def record(self, url: str, state: str, error=None) -> None:
+        self.states[url] = state
+
+
+def writer_for(db, on_done, frontier=None, batch_size=100):
+    resources = SimpleNamespace(db=lambda: contextlib.nullcontext(db))
+    return ArticleBatchWriter(resources, batch_size, 60.0, on_done, frontier)
+
+
+def test_acks_wait_for_the_oldest_delivery():
+    acks = AckTracker()
+    messages = [Message(tag) for tag in range(1, 5)]
+    for message in messages:
+        acks.track(message)
+
+    assert acks.complete([messages[1], messages[2]]) is None
+    assert acks.complete([messages[0]]) is messages[2]
+    assert len(acks) == 1
+    assert acks.complete([messages[3]]) is messages[3]
+    assert len(acks) == 0
+
+
+def test_nacked_deliveries_are_never_acked():
+    acks = AckTracker()
+    messages = [Message(tag) for tag in range(1, 4)]
+    for message in messages:
+        acks.track(message)
+    messages[2].processed = True
+
+    assert acks.complete(messages[1:]) is None
+    assert acks.complete([messages[0]]) is messages[1]
+    assert len(acks) == 0
+
+
+def test_completions_from_before_a_reset_are_ignored():
+    acks = AckTracker()
+    old = Message(1)
+    acks.track(old)
+    acks.reset()
+    new = Message(1)
+    acks.track(new)
+
+    assert acks.complete([old]) is None
+    assert acks.complete([new]) is new
+
+
+def test_a_bad_row_only_loses_itself():
+    db, frontier, done = FakeDB(), FakeFrontier(), []
+
+    async def on_done(messages):
+        done.extend(messages)
+
+    async def main():
+        writer = writer_for(db, on_done, frontier)
+        for i, url in enumerate(["a", "b", "bad", "c", "d"]):
+            await writer.add({"page_url": url}, Message(i))
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(main())
+    assert [row["page_url"] for row in db.rows] == ["a", "b", "c", "d"]
+    assert frontier.states == {"a": FETCHED, "b": FETCHED, "bad": FAILED, "c": FETCHED, "d": FETCHED}
+    assert len(done) == 5
+    assert (writer.stats["rejected"], writer.stats["inserted"]) == (1, 4)
+    assert writer.stats["splits"] > 0
+
+
+def test_connection_errors_requeue_the_whole_batch():
+    db, frontier, done = FakeDB(psycopg2.OperationalError), FakeFrontier(), []
+
+    async def on_done(messages):
+        done.extend(messages)
+
+    async def main():
+        writer = writer_for(db, on_done, frontier)
+        for i, url in enumerate(["a", "bad"]):
+            await writer.add({"page_url": url}, Message(i))
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(main())
+    assert db.rows == [] and frontier.states == {}
+    assert all(message.requeued for message in done)
+    assert (writer.stats["requeued"], writer.stats["splits"]) == (2, 0)
+
+
+def test_cancelling_the_caller_does_not_abandon_a_flush():
+    db, frontier, done = FakeDB(), FakeFrontier(), []
+
+    async def on_done(messages):
+        done.extend(messages)
+
+    async def main():
+        writer = writer_for(db, on_done, frontier)
+        await writer.add({"page_url": "a"}, Message(1))
+        flushing = asyncio.create_task(writer.flush())
+        await asyncio.sleep(0)
+        flushing.cancel()  # as the timer loop is at shutdown
+        await writer.close()
+
+    asyncio.run(main())
+    assert [row["page_url"] for row in db.rows] == ["a"]
+    assert frontier.states == {"a": FETCHED}
+    assert len(done) == 1
@@ -0,0 +1,75 @@
+# tests/test_frontier.py
+import psycopg2
+import pytest
+
+from frontier import DISCOVERED, FAILED, FETCHED, QUEUED, SKIPPED, FrontierBuffer
+from producer import FRONTIER_MAX_ATTEMPTS, FRONTIER_REQUEUE_AFTER_S, SitemapCrawler
+
+
+class FakeDB:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.rows = []
+
+    def upsert_frontier_states(self, rows: list) -> None:
+        if self.fail:
+            raise psycopg2.OperationalError("connection lost")
+        self.rows.extend(rows)
+
+
+def test_changes_to_one_url_are_merged():
+    frontier = FrontierBuffer()
+    frontier.record("a", QUEUED)
+    frontier.record("a", FAILED, "timeout")
+    frontier.record("a", FAILED, "HTTP 503")
+    frontier.record("b", QUEUED)
+    assert sorted(frontier.take()) == [("a", FAILED, 2, "HTTP 503"), ("b", QUEUED, 0, None)]
+    assert len(frontier) == 0
+
+
+def test_restored_rows_stay_under_newer_changes():
+    frontier = FrontierBuffer()
+    frontier.record("a", FAILED, "timeout")
+    frontier.record("b", QUEUED)
+    rows = frontier.take()
+    # Written while the failed upsert was in flight
+    frontier.record("a", FETCHED)
+    frontier.restore(rows)
+    assert sorted(frontier.take()) == [("a", FETCHED, 1, None), ("b", QUEUED, 0, None)]
+
+
+def test_a_failed_flush_keeps_the_rows():
+    frontier = FrontierBuffer()
+    frontier.record("a", FAILED, "timeout")
+    assert not frontier.flush(FakeDB(fail=True))
+    assert len(frontier) == 1
+    frontier.record("a", FAILED, "HTTP 503")
+    db = FakeDB()
+    assert frontier.flush(db)
+    assert db.rows == [("a", FAILED, 2, "HTTP 503")]
+
+
+def test_due_by_size_or_age():
+    frontier = FrontierBuffer(batch_size=2, max_wait_s=0)
+    assert not frontier.due()
+    frontier.record("a", QUEUED)
+    assert frontier.due()
+    frontier = FrontierBuffer(batch_size=2, max_wait_s=60)
+    frontier.record("a", QUEUED)
+    assert not frontier.due()
+    frontier.record("b", QUEUED)
+    assert frontier.due()
+
+
+@pytest.mark.parametrize("known, push", [
+    (None, True),
+    ((DISCOVERED, 0, 0), True),
+    ((FAILED, FRONTIER_MAX_ATTEMPTS - 1, 0), True),
+    ((FAILED, FRONTIER_MAX_ATTEMPTS, 0), False),
+    ((QUEUED, 0, FRONTIER_REQUEUE_AFTER_S - 1), False),
+    ((QUEUED, 0, FRONTIER_REQUEUE_AFTER_S), True),
+    ((FETCHED, 0, FRONTIER_REQUEUE_AFTER_S), False),
+    ((SKIPPED, 0, 0), False),
+])
+def test_should_push(known, push):
+    assert SitemapCrawler.should_push(known) is push
@@ -0,0 +1,112 @@
+# tests/test_rate_limit.py
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+
+from rate_limit import RETRY_AFTER_MAX_S, DomainRateLimiter, SharedRateLimiter, parse_retry_after
+
+
+class FakeDB:
+    """Stands in for the PGManager calls SharedRateLimiter makes."""
+
+    def __init__(self) -> None:
+        self.conn = SimpleNamespace(closed=False, close=lambda: None)
+        self.down = False
+        self.calls = []
+        self.delay = 0.0
+        self.blocked_s = 0.0
+
+    def connect(self) -> None:
+        self.conn = SimpleNamespace(closed=False, close=lambda: None)
+
+    def create_rate_limit_table_if_not_exists(self) -> None:
+        pass
+
+    def _check(self, *call) -> None:
+        self.calls.append(call)
+        if self.down:
+            raise psycopg2.OperationalError("connection lost")
+
+    def reserve_request_slot(self, domain, initial_rate, burst):
+        self._check("reserve", domain)
+        return self.delay
+
+    def increase_domain_rate(self, domain, increase, max_rate, adjust_interval_s):
+        self._check("increase", domain)
+        return 2.25
+
+    def decrease_domain_rate(self, domain, decrease, min_rate, adjust_interval_s, retry_after_s):
+        self._check("decrease", domain, retry_after_s)
+        return 1.0, max(self.blocked_s, retry_after_s), True
+
+
+@pytest.mark.parametrize("value, seconds", [
+    (None, 0.0),
+    ("", 0.0),
+    ("120", 120.0),
+    (" 7 ", 7.0),
+    ("86400", RETRY_AFTER_MAX_S),
+    ("soon", 0.0),
+    ("-5", 0.0),
+])
+def test_parse_retry_after(value, seconds):
+    assert parse_retry_after(value) == seconds
+
+
+def test_parse_retry_after_http_date():
+    future = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=90), usegmt=True)
+    assert 85 <= parse_retry_after(future) <= 90
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=90), usegmt=True)
+    assert parse_retry_after(past) == 0.0
+
+
+def test_domain_limiter_spaces_requests():
+    limiter = DomainRateLimiter(rate=2)
+    delays = [limiter.reserve("a.example") for _ in range(3)]
+    assert delays[0] == 0.0
+    assert delays[1] == pytest.approx(0.5, abs=0.01)
+    assert delays[2] == pytest.approx(1.0, abs=0.01)
+    assert limiter.reserve("b.example") == 0.0
+    assert DomainRateLimiter(rate=0).reserve("a.example") == 0.0
+
+
+def test_responses_adapt_the_shared_rate():
+    db = FakeDB()
+    limiter = SharedRateLimiter(db, latency_target_s=1.0)
+    limiter.record("a.example", 200, 0.1)
+    limiter.record("a.example", 200, 5.0)  # too slow to speed up
+    limiter.record("a.example", 500, 0.1)
+    limiter.record("a.example", None, 30.0)
+    assert db.calls == [
+        ("increase", "a.example"),
+        ("decrease", "a.example", 0.0),
+        ("decrease", "a.example", 0.0),
+    ]
+    assert (limiter.stats["increases"], limiter.stats["decreases"]) == (1, 2)
+
+
+def test_retry_after_holds_the_domain():
+    db = FakeDB()
+    limiter = SharedRateLimiter(db)
+    limiter.record("a.example", 429, 0.1, retry_after="120")
+    assert db.calls[-1] == ("decrease", "a.example", 120.0)
+    assert 119 <= limiter.reserve("a.example") <= 120
+    assert limiter.reserve("b.example") == 0.0
+    # Only 429 and 503 carry a Retry-After that is honored
+    limiter.record("c.example", 500, 0.1, retry_after="120")
+    assert db.calls[-1] == ("decrease", "c.example", 0.0)
+
+
+def test_database_outage_falls_back_to_local_spacing():
+    db = FakeDB()
+    limiter = SharedRateLimiter(db, min_rate=1.0)
+    db.down = True
+    assert limiter.reserve("a.example") == 0.0
+    assert limiter.reserve("a.example") == pytest.approx(1.0, abs=0.01)
+    # The database is not tried again until DB_RETRY_AFTER_S has passed
+    assert db.calls == [("reserve", "a.example")]
+    limiter.record("a.example", 429, 0.1, retry_after="60")
+    assert limiter.stats["db_errors"] == 1
@@ -0,0 +1,53 @@
+# tests/test_url_filter.py
+import pytest
+
+from url_filter import BloomFilter
+
+URLS = [f"https://www.example.com/markets/{i}" for i in range(2000)]
+
+
+def test_added_urls_are_always_found():
+    bloom = BloomFilter(capacity=len(URLS), error_rate=0.01)
+    for url in URLS:
+        bloom.add(url)
+    assert all(url in bloom for url in URLS)
+    assert len(bloom) == len(URLS)
+
+
+def test_false_positive_rate_is_near_the_target():
+    bloom = BloomFilter(capacity=len(URLS), error_rate=0.01)
+    for url in URLS:
+        bloom.add(url)
+    unseen = [f"https://www.example.com/policy/{i}" for i in range(10000)]
+    assert sum(url in bloom for url in unseen) / len(unseen) < 0.02
+
+
+def test_save_and_load_round_trip(tmp_path):
+    bloom = BloomFilter(capacity=len(URLS), error_rate=0.001)
+    for url in URLS[:500]:
+        bloom.add(url)
+    bloom.last_article_id = 42
+    path = str(tmp_path / "urls.bloom")
+    bloom.save(path)
+
+    loaded = BloomFilter.load(path)
+    assert loaded.bits == bloom.bits
+    assert (loaded.num_bits, loaded.num_hashes, loaded.capacity, loaded.error_rate) == (
+        bloom.num_bits, bloom.num_hashes, bloom.capacity, bloom.error_rate
+    )
+    assert (len(loaded), loaded.last_article_id) == (500, 42)
+    assert all(url in loaded for url in URLS[:500])
+    assert not (tmp_path / "urls.bloom.tmp").exists()
+
+
+@pytest.mark.parametrize("damage", ["truncated", "wrong_magic", "no_header"])
+def test_load_rejects_damaged_snapshots(tmp_path, damage):
+    bloom = BloomFilter(capacity=100, error_rate=0.01)
+    path = str(tmp_path / "urls.bloom")
+    bloom.save(path)
+    data = open(path, "rb").read()
+    data = {"truncated": data[:-1], "wrong_magic": b"XXXX" + data[4:], "no_header": data[:10]}[damage]
+    with open(path, "wb") as f:
+        f.write(data)
+    with pytest.raises(ValueError):
+        BloomFilter.load(path)
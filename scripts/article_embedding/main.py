@@ -6,12 +6,26 @@ from datetime import datetime
 from openai import OpenAI
 import os
 import gzip
+import math
 load_dotenv()
+
+# Dimensions kept in article_chunks.embedding_short (see scripts/schema/versions/0005)
+SHORT_EMBEDDING_DIM = 256
 # ----------------------- Example Usage -----------------------
 
 def format_datetime(dt: datetime) -> str:
     return dt.strftime("%B %-dth, %Y, %-I:%M%p %Z").lower()
 
+def shorten_embedding(embedding: list, dims: int = SHORT_EMBEDDING_DIM) -> list:
+    """
+    text-embedding-3 vectors are Matryoshka: the first `dims` components,
+    re-normalized, are what the API returns for `dimensions=dims`. Derived
+    locally so no second embedding call is needed.
+    """
+    head = embedding[:dims]
+    norm = math.sqrt(sum(x * x for x in head)) or 1.0
+    return [x / norm for x in head]
+
 if __name__ == "__main__":
 
 
@@ -37,6 +51,11 @@ if __name__ == "__main__":
             chunk_text TEXT NOT NULL,
             token_size INTEGER NOT NULL,
             embedding vector(1536) NOT NULL,
+            embedding_short vector(256),
+            publish_datetime TIMESTAMP,
+            content_vertical TEXT,
+            content_type TEXT,
+            tags TEXT,
             UNIQUE (article_id, chunk_text, token_size)
         );
         """
@@ -48,7 +67,9 @@ if __name__ == "__main__":
             region_name="us-west-1"
         )
         statement = """
-            SELECT id, article_s3_url, content_title, publish_datetime, og_description FROM articles 
+            SELECT id, article_s3_url, content_title, publish_datetime, og_description,
+                   content_vertical, content_type, tags
+            FROM articles 
             WHERE article_s3_url IS NOT NULL 
             AND embedding IS NOT NULL
             AND EXTRACT(YEAR FROM publish_datetime) = 2025
@@ -94,7 +115,14 @@ if __name__ == "__main__":
                     "article_id": article["id"],
                     "chunk_text": chunk,
                     "token_size": processor.token_count(chunk),
-                    "embedding": item.embedding
+                    "embedding": item.embedding,
+                    "embedding_short": shorten_embedding(item.embedding),
+                    # Denormalized for filtered similarity search (the
+                    # scripts/schema triggers also fill these in)
+                    "publish_datetime": article["publish_datetime"],
+                    "content_vertical": article["content_vertical"],
+                    "content_type": article["content_type"],
+                    "tags": article["tags"],
                 }
                 try:
                     db.create(table="article_chunks", data=data)
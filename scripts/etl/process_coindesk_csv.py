@@ -117,6 +117,13 @@ def create_table_if_not_exists(conn):
     except psycopg2.Error as e:
         logging.error(f"Error creating articles table: {str(e)}")
         conn.rollback()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS articles_page_url_key ON articles (page_url);")
+        conn.commit()
+    except psycopg2.Error as e:
+        logging.error(f"Error creating the unique page_url index (run scripts/schema/migrate.py): {str(e)}")
+        conn.rollback()
 
 def article_exists(conn, page_url):
     """
@@ -124,9 +131,9 @@ def article_exists(conn, page_url):
     """
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT COUNT(*) FROM articles WHERE page_url = %s", (page_url,))
-            (count,) = cur.fetchone()
-            return count > 0
+            cur.execute("SELECT EXISTS (SELECT 1 FROM articles WHERE page_url = %s)", (page_url,))
+            (exists,) = cur.fetchone()
+            return exists
     except psycopg2.Error as e:
         logging.error(f"Error checking existing article: {str(e)}")
         return False
@@ -169,7 +176,8 @@ def insert_article(conn, article_data):
             %(authors)s,
             %(content_tier)s,
             %(article_s3_url)s
-    );
+    )
+    ON CONFLICT (page_url) DO NOTHING;
     """
     try:
         with conn.cursor() as cur:
@@ -0,0 +1,217 @@
+"""
+main.py
+-------
+Incrementally rebuilds the precomputed neighbor lists (article_neighbors,
+article_chunk_neighbors) served by /articles/{id}/similar and
+/article_chunks/{id}/similar.
+
+Rows whose embedding was inserted or changed are queued in
+neighbor_refresh_queue by triggers (scripts/schema/versions/0003). Each run
+drains the queue in batches:
+  1. recompute the top-K list of every queued row with one ANN query each,
+  2. recompute the lists of rows that should now include a queued row
+     (a new row closer than their current K-th neighbor) or that already
+     include it (its embedding changed).
+Step 2 does not cascade further, so a run costs O(queued rows) ANN queries,
+and is skipped with --full since every list is then computed from scratch.
+
+Usage:
+    python main.py                 # drain the queue for both tables
+    python main.py --table articles --k 20
+    python main.py --full          # queue every row first (full rebuild)
+    python main.py --loop 60       # keep draining every 60 seconds
+"""
+
+import argparse
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DB_HOST = os.getenv('POSTGRES_HOST', 'localhost')
+DB_PORT = os.getenv('POSTGRES_PORT', '5432')
+DB_NAME = os.getenv('POSTGRES_DB')
+DB_USER = os.getenv('POSTGRES_USER')
+DB_PASSWORD = os.getenv('POSTGRES_PASSWORD')
+
+
+@dataclass(frozen=True)
+class NeighborTable:
+    source: str        # table holding the embeddings
+    neighbors: str     # table holding the top-K lists
+    key: str           # column in `neighbors` referencing the source row
+    exclude_same: str  # column whose value a neighbor must not share (or "")
+
+
+TABLES = {
+    "articles": NeighborTable("articles", "article_neighbors", "article_id", ""),
+    # Chunks of the same article are trivially similar; skip them.
+    "article_chunks": NeighborTable("article_chunks", "article_chunk_neighbors", "chunk_id", "article_id"),
+}
+
+
+def get_db_connection():
+    return psycopg2.connect(host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+
+
+def queue_all(conn, table: NeighborTable) -> int:
+    with conn, conn.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO neighbor_refresh_queue (source_table, item_id)
+            SELECT %s, id FROM {table.source} WHERE embedding IS NOT NULL
+            ON CONFLICT (source_table, item_id) DO NOTHING
+            """,
+            (table.source,),
+        )
+        return cur.rowcount
+
+
+def claim_batch(cur, table: NeighborTable, batch_size: int) -> list:
+    """Removes up to batch_size queued ids (skipping ones claimed by another builder)."""
+    cur.execute(
+        """
+        DELETE FROM neighbor_refresh_queue
+        WHERE (source_table, item_id) IN (
+            SELECT source_table, item_id FROM neighbor_refresh_queue
+            WHERE source_table = %s
+            ORDER BY queued_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING item_id
+        """,
+        (table.source, batch_size),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def rebuild_list(cur, table: NeighborTable, item_id: int, k: int) -> list:
+    """
+    Replaces the top-k list of one row using the ANN index, with the stored
+    embedding as the query vector. Returns [(neighbor_id, distance), ...].
+    """
+    exclude = ""
+    if table.exclude_same:
+        exclude = (
+            f"AND n.{table.exclude_same} <> "
+            f"(SELECT {table.exclude_same} FROM {table.source} WHERE id = %(id)s)"
+        )
+    cur.execute(f"DELETE FROM {table.neighbors} WHERE {table.key} = %(id)s", {"id": item_id})
+    cur.execute(
+        f"""
+        INSERT INTO {table.neighbors} ({table.key}, rank, neighbor_id, distance)
+        SELECT %(id)s, row_number() OVER (ORDER BY nearest.distance, nearest.id), nearest.id, nearest.distance
+        FROM (
+            SELECT n.id, n.embedding <=> (SELECT embedding FROM {table.source} WHERE id = %(id)s) AS distance
+            FROM {table.source} n
+            WHERE n.id <> %(id)s AND n.embedding IS NOT NULL {exclude}
+            ORDER BY n.embedding <=> (SELECT embedding FROM {table.source} WHERE id = %(id)s)
+            LIMIT %(k)s
+        ) nearest
+        WHERE nearest.distance IS NOT NULL
+        RETURNING neighbor_id, distance
+        """,
+        {"id": item_id, "k": k},
+    )
+    return cur.fetchall()
+
+
+def affected_lists(cur, table: NeighborTable, item_id: int, neighbors: list, k: int) -> set:
+    """
+    Rows whose list should be recomputed because of `item_id`: lists that
+    already contain it, and neighbors for which it is closer than their
+    current K-th entry (or whose list is not full yet). Rows still waiting
+    in the queue are skipped; they are rebuilt from scratch anyway.
+    """
+    cur.execute(f"SELECT {table.key} FROM {table.neighbors} WHERE neighbor_id = %s", (item_id,))
+    affected = {row[0] for row in cur.fetchall()}
+    if neighbors:
+        cur.execute(
+            f"""
+            SELECT c.id
+            FROM unnest(%s::int[], %s::real[]) AS c(id, distance)
+            LEFT JOIN LATERAL (
+                SELECT COUNT(*) AS size, MAX(distance) AS worst
+                FROM {table.neighbors} WHERE {table.key} = c.id
+            ) l ON true
+            WHERE (l.size < %s OR c.distance < l.worst)
+              AND NOT EXISTS (
+                  SELECT 1 FROM neighbor_refresh_queue q
+                  WHERE q.source_table = %s AND q.item_id = c.id
+              )
+            """,
+            ([n for n, _ in neighbors], [d for _, d in neighbors], k, table.source),
+        )
+        affected.update(row[0] for row in cur.fetchall())
+    affected.discard(item_id)
+    return affected
+
+
+def drain(conn, table: NeighborTable, k: int, batch_size: int, propagate: bool = True) -> dict:
+    stats = {"rebuilt": 0, "propagated": 0, "batches": 0}
+    while True:
+        start = time.perf_counter()
+        with conn, conn.cursor() as cur:
+            # HNSW returns at most ef_search rows; leave room for excluded rows.
+            cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(max(40, 4 * k)),))
+            ids = claim_batch(cur, table, batch_size)
+            if not ids:
+                return stats
+            queued = set(ids)
+            follow_up = set()
+            for item_id in ids:
+                neighbors = rebuild_list(cur, table, item_id, k)
+                if propagate:
+                    follow_up |= affected_lists(cur, table, item_id, neighbors, k)
+            follow_up -= queued
+            for item_id in sorted(follow_up):
+                rebuild_list(cur, table, item_id, k)
+        stats["rebuilt"] += len(ids)
+        stats["propagated"] += len(follow_up)
+        stats["batches"] += 1
+        logging.info(
+            f"{table.source}: rebuilt {len(ids)} lists (+{len(follow_up)} affected) "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild precomputed neighbor lists.")
+    parser.add_argument("--table", choices=list(TABLES) + ["all"], default="all")
+    parser.add_argument("--k", type=int, default=20, help="Neighbors stored per row")
+    parser.add_argument("--batch-size", type=int, default=200, help="Queued rows per transaction")
+    parser.add_argument("--full", action="store_true", help="Queue every row before draining")
+    parser.add_argument("--loop", type=float, default=0, help="Keep draining every N seconds")
+    args = parser.parse_args()
+
+    tables = list(TABLES.values()) if args.table == "all" else [TABLES[args.table]]
+    conn = get_db_connection()
+    try:
+        if args.full:
+            for table in tables:
+                logging.info(f"{table.source}: queued {queue_all(conn, table)} rows")
+        while True:
+            for table in tables:
+                # A full rebuild computes every list against the current data,
+                # so there is nothing to propagate on the first pass.
+                stats = drain(conn, table, args.k, args.batch_size, propagate=not args.full)
+                if stats["batches"]:
+                    logging.info(f"{table.source}: {stats}")
+            if not args.loop:
+                break
+            args.full = False
+            time.sleep(args.loop)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+main.py
+-------
+Reports the memory / recall trade-off of the quantized HNSW indexes
+(scripts/schema/versions/0004) against the full-precision index.
+
+For a sample of stored embeddings used as queries, it computes the exact top-k
+(sequential scan), then runs each search strategy the API can use and reports
+recall@k and latency:
+  - full:    single-stage HNSW on vector(1536)
+  - halfvec: shortlist on the halfvec index, exact re-rank
+  - bit:     shortlist on the binary index (Hamming), exact re-rank
+  - short:   shortlist on the 256-dimension embedding_short index, exact re-rank
+for several shortlist sizes, plus the on-disk size of every vector index.
+
+Usage:
+    python main.py --table article_chunks --queries 50 --k 10 --shortlists 100,200,400,800
+    python main.py --output report.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DB_HOST = os.getenv('POSTGRES_HOST', 'localhost')
+DB_PORT = os.getenv('POSTGRES_PORT', '5432')
+DB_NAME = os.getenv('POSTGRES_DB')
+DB_USER = os.getenv('POSTGRES_USER')
+DB_PASSWORD = os.getenv('POSTGRES_PASSWORD')
+
+EMBEDDING_DIM = 1536
+
+# Same expressions as the indexes and api/app/core/vector_search.py
+COARSE_ORDER = {
+    "halfvec": "embedding::halfvec({dim}) <=> %(q)s::vector::halfvec({dim})",
+    "bit": "binary_quantize(embedding)::bit({dim}) <~> binary_quantize(%(q)s::vector)::bit({dim})",
+    # scripts/schema/versions/0005
+    "short": "embedding_short <=> shorten_embedding(%(q)s::vector)",
+}
+
+
+def get_db_connection():
+    return psycopg2.connect(host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+
+
+def index_sizes(cur, table: str) -> list:
+    cur.execute(
+        """
+        SELECT i.indexname, pg_relation_size(format('%%I', i.indexname)::regclass), i.indexdef
+        FROM pg_indexes i
+        WHERE i.tablename = %s AND (i.indexdef ILIKE '%%USING hnsw%%' OR i.indexdef ILIKE '%%USING ivfflat%%')
+        ORDER BY 2 DESC
+        """,
+        (table,),
+    )
+    return [{"index": name, "bytes": size, "definition": definition} for name, size, definition in cur.fetchall()]
+
+
+def table_sizes(cur, table: str) -> dict:
+    cur.execute(
+        f"""
+        SELECT pg_table_size(%s), pg_indexes_size(%s), COUNT(*),
+               AVG(pg_column_size(embedding))
+        FROM {table}
+        """,
+        (table, table),
+    )
+    table_bytes, index_bytes, rows, avg_vector_bytes = cur.fetchone()
+    return {
+        "rows": rows,
+        "table_bytes": table_bytes,
+        "all_indexes_bytes": index_bytes,
+        "avg_vector_bytes": float(avg_vector_bytes or 0),
+        # What the quantized representations would take per row
+        "halfvec_bytes_per_row": 2 * EMBEDDING_DIM + 8,
+        "bit_bytes_per_row": EMBEDDING_DIM // 8 + 8,
+        "short_bytes_per_row": 4 * 256 + 8,
+    }
+
+
+def sample_queries(cur, table: str, n: int, seed: float) -> list:
+    cur.execute("SELECT setseed(%s)", (seed,))
+    cur.execute(f"SELECT id, embedding::text FROM {table} WHERE embedding IS NOT NULL ORDER BY random() LIMIT %s", (n,))
+    return cur.fetchall()
+
+
+def timed(cur, statement: str, params: dict) -> tuple:
+    start = time.perf_counter()
+    cur.execute(statement, params)
+    ids = [row[0] for row in cur.fetchall()]
+    return ids, (time.perf_counter() - start) * 1000.0
+
+
+def exact_top_k(cur, table: str, query: str, k: int) -> list:
+    cur.execute("SET enable_indexscan = off")
+    ids, _ = timed(cur, f"SELECT id FROM {table} ORDER BY embedding <=> %(q)s::vector LIMIT %(k)s", {"q": query, "k": k})
+    cur.execute("RESET enable_indexscan")
+    return ids
+
+
+def strategy_statement(table: str, strategy: str) -> str:
+    if strategy == "full":
+        return f"SELECT id FROM {table} ORDER BY embedding <=> %(q)s::vector LIMIT %(k)s"
+    coarse = COARSE_ORDER[strategy].format(dim=EMBEDDING_DIM)
+    return f"""
+        SELECT id FROM {table}
+        WHERE id IN (SELECT id FROM {table} ORDER BY {coarse} LIMIT %(shortlist)s)
+        ORDER BY (embedding <=> %(q)s::vector) + 0
+        LIMIT %(k)s
+    """
+
+
+def evaluate(cur, table: str, queries: list, k: int, strategy: str, shortlist: int) -> dict:
+    statement = strategy_statement(table, strategy)
+    recalls, latencies = [], []
+    cur.execute("SELECT set_config('hnsw.ef_search', %s, false)", (str(max(40, shortlist)),))
+    for _, query in queries:
+        truth = set(exact_top_k(cur, table, query, k))
+        ids, ms = timed(cur, statement, {"q": query, "k": k, "shortlist": shortlist})
+        recalls.append(len(truth & set(ids)) / k)
+        latencies.append(ms)
+    return {
+        "strategy": strategy,
+        "shortlist": shortlist if strategy != "full" else None,
+        "recall_at_k": round(statistics.mean(recalls), 4),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Quantized index memory / recall report.")
+    parser.add_argument("--table", choices=["articles", "article_chunks"], default="article_chunks")
+    parser.add_argument("--queries", type=int, default=50, help="Sampled query vectors")
+    parser.add_argument("--k", type=int, default=10, help="Top-k compared against exact search")
+    parser.add_argument("--shortlists", default="100,200,400,800", help="Shortlist sizes for two-stage search")
+    parser.add_argument("--strategies", default="full,halfvec,bit,short")
+    parser.add_argument("--seed", type=float, default=0.42, help="setseed() value for query sampling")
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            report = {
+                "table": args.table,
+                "k": args.k,
+                "queries": args.queries,
+                "sizes": table_sizes(cur, args.table),
+                "indexes": index_sizes(cur, args.table),
+                "results": [],
+            }
+            queries = sample_queries(cur, args.table, args.queries, args.seed)
+            for strategy in args.strategies.split(","):
+                shortlists = [args.k] if strategy == "full" else [int(s) for s in args.shortlists.split(",")]
+                for shortlist in shortlists:
+                    try:
+                        result = evaluate(cur, args.table, queries, args.k, strategy, shortlist)
+                    except psycopg2.Error as e:
+                        logging.warning(f"{strategy} failed (are schema versions 0004/0005 applied?): {e}")
+                        break
+                    report["results"].append(result)
+    finally:
+        conn.close()
+
+    print(f"\n{args.table}: {report['sizes']['rows']} rows, table {report['sizes']['table_bytes'] / 2**20:.1f} MiB")
+    for index in report["indexes"]:
+        print(f"  {index['index']:<48} {index['bytes'] / 2**20:8.1f} MiB")
+    print(f"\n{'strategy':<10}{'shortlist':>10}{'recall@' + str(args.k):>12}{'p50 ms':>10}{'max ms':>10}")
+    for r in report["results"]:
+        print(f"{r['strategy']:<10}{str(r['shortlist'] or '-'):>10}{r['recall_at_k']:>12}{r['p50_ms']:>10}{r['max_ms']:>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+migrate.py
+----------
+Applies the schema changes in versions/ to the database, in order, once.
+
+Each version module defines:
+  - DESCRIPTION: a one-line summary,
+  - STATEMENTS: a list of SQL statements (run in autocommit mode, so
+    CREATE INDEX CONCURRENTLY is allowed),
+  - optionally backfill(conn): a function for data migrations that need Python,
+  - optionally applies(conn): returns False when the database cannot take the
+    version yet (e.g. an extension is too old). The version is skipped and
+    stays pending, the later ones are still applied, and it is tried again
+    on the next run.
+
+Applied versions are recorded in the schema_migrations table.
+
+Usage:
+    python migrate.py            # apply pending versions
+    python migrate.py --list     # show applied / pending versions
+"""
+
+import argparse
+import importlib
+import logging
+import os
+import pkgutil
+
+import psycopg2
+from dotenv import load_dotenv
+
+import versions
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DB_HOST = os.getenv('POSTGRES_HOST', 'localhost')
+DB_PORT = os.getenv('POSTGRES_PORT', '5432')
+DB_NAME = os.getenv('POSTGRES_DB')
+DB_USER = os.getenv('POSTGRES_USER')
+DB_PASSWORD = os.getenv('POSTGRES_PASSWORD')
+
+
+def get_db_connection():
+    conn = psycopg2.connect(host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+    conn.autocommit = True
+    return conn
+
+
+def discover_versions() -> list:
+    """Returns the version modules sorted by name (e.g. 0001_..., 0002_...)."""
+    names = sorted(m.name for m in pkgutil.iter_modules(versions.__path__) if m.name[:4].isdigit())
+    return [(name, importlib.import_module(f"versions.{name}")) for name in names]
+
+
+def applied_versions(conn) -> set:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version TEXT PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            );
+            """
+        )
+        cur.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cur.fetchall()}
+
+
+def apply_version(conn, name: str, module) -> None:
+    logging.info(f"Applying {name}: {module.DESCRIPTION}")
+    with conn.cursor() as cur:
+        for statement in module.STATEMENTS:
+            logging.info(f"  {' '.join(statement.split())[:120]}")
+            cur.execute(statement)
+    if hasattr(module, "backfill"):
+        module.backfill(conn)
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (name,))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Apply database schema versions.")
+    parser.add_argument("--list", action="store_true", help="List versions and exit")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        done = applied_versions(conn)
+        for name, module in discover_versions():
+            if args.list:
+                print(f"[{'x' if name in done else ' '}] {name}: {module.DESCRIPTION}")
+            elif name not in done:
+                if hasattr(module, "applies") and not module.applies(conn):
+                    logging.warning(f"Leaving {name} pending: {module.DESCRIPTION}")
+                    continue
+                apply_version(conn, name, module)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""
+HNSW indexes for cosine similarity search on articles and article_chunks, and
+a btree index on article_chunks.article_id (the foreign key had none).
+"""
+
+DESCRIPTION = "HNSW cosine indexes on embeddings, index on article_chunks.article_id"
+
+STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS vector",
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS article_chunks_embedding_hnsw_idx
+    ON article_chunks USING hnsw (embedding vector_cosine_ops)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS articles_embedding_hnsw_idx
+    ON articles USING hnsw (embedding vector_cosine_ops)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS article_chunks_article_id_idx
+    ON article_chunks (article_id)
+    """,
+]
@@ -0,0 +1,150 @@
+"""
+Denormalizes the article attributes used by filtered similarity search
+(publish_datetime, content_vertical, content_type, tags) onto article_chunks.
+
+Triggers keep the copies in sync: new chunks copy them from their article, and
+changes to an article are pushed down to its chunks. Existing rows are
+backfilled in id ranges, then btree indexes are built for the filters, plus a
+partial HNSW index for every vertical too large to be searched exactly.
+Verticals that outgrow PARTIAL_INDEX_MIN_ROWS later can be indexed by calling
+create_vertical_indexes() again.
+"""
+
+import hashlib
+import logging
+import re
+
+from psycopg2 import sql
+
+DESCRIPTION = "Copy article filter attributes onto article_chunks, add filter and per-vertical HNSW indexes"
+
+BACKFILL_BATCH_SIZE = 10000
+
+# Matches the API's default VECTOR_SEARCH_EXACT_THRESHOLD: smaller verticals
+# are searched exactly and do not need their own ANN index.
+PARTIAL_INDEX_MIN_ROWS = 20000
+
+STATEMENTS = [
+    """
+    ALTER TABLE article_chunks
+        ADD COLUMN IF NOT EXISTS publish_datetime TIMESTAMP,
+        ADD COLUMN IF NOT EXISTS content_vertical TEXT,
+        ADD COLUMN IF NOT EXISTS content_type TEXT,
+        ADD COLUMN IF NOT EXISTS tags TEXT
+    """,
+    """
+    CREATE OR REPLACE FUNCTION article_chunks_copy_article_attributes() RETURNS trigger AS $$
+    BEGIN
+        SELECT a.publish_datetime, a.content_vertical, a.content_type, a.tags
+        INTO NEW.publish_datetime, NEW.content_vertical, NEW.content_type, NEW.tags
+        FROM articles a
+        WHERE a.id = NEW.article_id;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS article_chunks_copy_article_attributes ON article_chunks",
+    """
+    CREATE TRIGGER article_chunks_copy_article_attributes
+    BEFORE INSERT OR UPDATE OF article_id ON article_chunks
+    FOR EACH ROW EXECUTE FUNCTION article_chunks_copy_article_attributes()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION articles_push_attributes_to_chunks() RETURNS trigger AS $$
+    BEGIN
+        UPDATE article_chunks
+        SET publish_datetime = NEW.publish_datetime,
+            content_vertical = NEW.content_vertical,
+            content_type = NEW.content_type,
+            tags = NEW.tags
+        WHERE article_id = NEW.id;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS articles_push_attributes_to_chunks ON articles",
+    """
+    CREATE TRIGGER articles_push_attributes_to_chunks
+    AFTER UPDATE OF publish_datetime, content_vertical, content_type, tags ON articles
+    FOR EACH ROW
+    WHEN ((OLD.publish_datetime, OLD.content_vertical, OLD.content_type, OLD.tags)
+          IS DISTINCT FROM (NEW.publish_datetime, NEW.content_vertical, NEW.content_type, NEW.tags))
+    EXECUTE FUNCTION articles_push_attributes_to_chunks()
+    """,
+]
+
+# Built after the backfill; names match the SQLAlchemy model's index=True columns.
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_article_chunks_publish_datetime ON article_chunks (publish_datetime)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_article_chunks_content_vertical ON article_chunks (content_vertical)",
+]
+
+
+def backfill_attributes(conn) -> None:
+    """Copies the attributes onto existing chunks, one id range per transaction."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), -1) FROM article_chunks")
+        low, high = cur.fetchone()
+        for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+            cur.execute(
+                """
+                UPDATE article_chunks c
+                SET publish_datetime = a.publish_datetime,
+                    content_vertical = a.content_vertical,
+                    content_type = a.content_type,
+                    tags = a.tags
+                FROM articles a
+                WHERE a.id = c.article_id
+                  AND c.id >= %s AND c.id < %s
+                """,
+                (start, start + BACKFILL_BATCH_SIZE),
+            )
+            logging.info(f"  backfilled chunk ids {start}..{start + BACKFILL_BATCH_SIZE - 1} ({cur.rowcount} rows)")
+
+
+def vertical_index_name(vertical: str) -> str:
+    # Different verticals can share a slug ("Tech & Policy", "tech-policy"),
+    # so a hash of the raw value keeps the names apart. At most 63 characters,
+    # Postgres' identifier limit.
+    slug = re.sub(r"[^a-z0-9]+", "_", vertical.lower()).strip("_")[:20] or "blank"
+    digest = hashlib.blake2b(vertical.encode("utf-8"), digest_size=4).hexdigest()
+    return f"article_chunks_embedding_hnsw_{slug}_{digest}_idx"
+
+
+def create_vertical_indexes(conn, min_rows: int = PARTIAL_INDEX_MIN_ROWS) -> list:
+    """
+    Creates a partial HNSW index for each content_vertical with at least
+    `min_rows` chunks. A filtered query on such a vertical scans a graph that
+    only holds that vertical's chunks, so its top-k is never post-filtered.
+    """
+    created = []
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT content_vertical FROM article_chunks
+            WHERE content_vertical IS NOT NULL
+            GROUP BY content_vertical
+            HAVING COUNT(*) >= %s
+            """,
+            (min_rows,),
+        )
+        for (vertical,) in cur.fetchall():
+            name = vertical_index_name(vertical)
+            cur.execute(
+                sql.SQL(
+                    "CREATE INDEX CONCURRENTLY IF NOT EXISTS {} ON article_chunks "
+                    "USING hnsw (embedding vector_cosine_ops) WHERE content_vertical = {}"
+                ).format(sql.Identifier(name), sql.Literal(vertical))
+            )
+            logging.info(f"  partial index {name} for vertical {vertical!r}")
+            created.append(name)
+    return created
+
+
+def backfill(conn) -> None:
+    backfill_attributes(conn)
+    with conn.cursor() as cur:
+        for statement in INDEXES:
+            cur.execute(statement)
+        cur.execute("ANALYZE article_chunks")
+    create_vertical_indexes(conn)
@@ -0,0 +1,76 @@
+"""
+Precomputed nearest-neighbor lists for "more like this" lookups.
+
+article_neighbors / article_chunk_neighbors hold the top-K neighbors of each
+row, keyed by (id, rank) so a lookup is a single primary-key range scan.
+neighbor_refresh_queue records rows whose embedding was inserted or changed;
+scripts/neighbor_builder drains it. Every existing row is queued once here so
+the first builder run fills the tables.
+"""
+
+DESCRIPTION = "article_neighbors, article_chunk_neighbors and neighbor_refresh_queue"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS article_neighbors (
+        article_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+        rank SMALLINT NOT NULL,
+        neighbor_id INTEGER NOT NULL REFERENCES articles(id) ON DELETE CASCADE,
+        distance REAL NOT NULL,
+        PRIMARY KEY (article_id, rank)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_article_neighbors_neighbor_id ON article_neighbors (neighbor_id)",
+    """
+    CREATE TABLE IF NOT EXISTS article_chunk_neighbors (
+        chunk_id INTEGER NOT NULL REFERENCES article_chunks(id) ON DELETE CASCADE,
+        rank SMALLINT NOT NULL,
+        neighbor_id INTEGER NOT NULL REFERENCES article_chunks(id) ON DELETE CASCADE,
+        distance REAL NOT NULL,
+        PRIMARY KEY (chunk_id, rank)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_article_chunk_neighbors_neighbor_id ON article_chunk_neighbors (neighbor_id)",
+    """
+    CREATE TABLE IF NOT EXISTS neighbor_refresh_queue (
+        source_table TEXT NOT NULL,
+        item_id INTEGER NOT NULL,
+        queued_at TIMESTAMP NOT NULL DEFAULT now(),
+        PRIMARY KEY (source_table, item_id)
+    )
+    """,
+    """
+    CREATE OR REPLACE FUNCTION queue_neighbor_refresh() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.embedding IS NOT NULL THEN
+            INSERT INTO neighbor_refresh_queue (source_table, item_id)
+            VALUES (TG_TABLE_NAME, NEW.id)
+            ON CONFLICT (source_table, item_id) DO NOTHING;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS articles_queue_neighbor_refresh ON articles",
+    """
+    CREATE TRIGGER articles_queue_neighbor_refresh
+    AFTER INSERT OR UPDATE OF embedding ON articles
+    FOR EACH ROW EXECUTE FUNCTION queue_neighbor_refresh()
+    """,
+    "DROP TRIGGER IF EXISTS article_chunks_queue_neighbor_refresh ON article_chunks",
+    """
+    CREATE TRIGGER article_chunks_queue_neighbor_refresh
+    AFTER INSERT OR UPDATE OF embedding ON article_chunks
+    FOR EACH ROW EXECUTE FUNCTION queue_neighbor_refresh()
+    """,
+    """
+    INSERT INTO neighbor_refresh_queue (source_table, item_id)
+    SELECT 'articles', id FROM articles WHERE embedding IS NOT NULL
+    ON CONFLICT (source_table, item_id) DO NOTHING
+    """,
+    """
+    INSERT INTO neighbor_refresh_queue (source_table, item_id)
+    SELECT 'article_chunks', id FROM article_chunks WHERE embedding IS NOT NULL
+    ON CONFLICT (source_table, item_id) DO NOTHING
+    """,
+]
@@ -0,0 +1,53 @@
+"""
+Quantized HNSW indexes for two-stage similarity search (pgvector >= 0.7).
+
+Instead of storing quantized copies of `embedding` next to it (which would add
+~3 KB per row to tables that are already too large), the indexes are built on
+expressions: `embedding::halfvec(1536)` (half precision, ~half the index size)
+and `binary_quantize(embedding)::bit(1536)` (1 bit per dimension, ~1/32).
+Building the index is the backfill; new and updated rows are indexed as they
+are written. Queries must use the same expressions to hit these indexes (see
+api/app/core/vector_search.py) and re-rank the shortlist on full precision.
+
+On an older pgvector the version is left pending, without blocking the
+versions after it, and is applied by the first run after
+`ALTER EXTENSION vector UPDATE`.
+"""
+
+import logging
+
+DESCRIPTION = "halfvec and binary-quantized HNSW expression indexes on articles and article_chunks"
+
+STATEMENTS = [
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS article_chunks_embedding_halfvec_hnsw_idx
+    ON article_chunks USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS article_chunks_embedding_bit_hnsw_idx
+    ON article_chunks USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS articles_embedding_halfvec_hnsw_idx
+    ON articles USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+    """,
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS articles_embedding_bit_hnsw_idx
+    ON articles USING hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+    """,
+]
+
+
+def applies(conn) -> bool:
+    """halfvec and bit need pgvector >= 0.7.0."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+        row = cur.fetchone()
+    version = tuple(int(p) for p in row[0].split(".")[:2] if p.isdigit()) if row else ()
+    if version < (0, 7):
+        logging.warning(
+            f"pgvector {row[0] if row else '(not installed)'} has no halfvec/bit types; "
+            "the quantized indexes need >= 0.7.0 (ALTER EXTENSION vector UPDATE)"
+        )
+        return False
+    return True
@@ -0,0 +1,78 @@
+"""
+Reduced-dimension (Matryoshka) copies of the embeddings for shortlisting.
+
+text-embedding-3 vectors can be shortened by keeping the first N dimensions
+and re-normalizing; this is what the API's `dimensions` parameter does. The
+shortened vector is stored in `embedding_short vector(256)` on articles and
+article_chunks and indexed with HNSW. Searches shortlist on it and re-rank on
+the full vector (api/app/core/vector_search.py).
+
+Existing rows are derived in the database from the stored vectors (no
+re-embedding). A trigger fills the column for writers that do not supply it.
+"""
+
+import logging
+
+DESCRIPTION = "embedding_short vector(256) on articles and article_chunks, backfill and HNSW indexes"
+
+SHORT_DIM = 256
+BACKFILL_BATCH_SIZE = 5000
+TABLES = ("articles", "article_chunks")
+
+STATEMENTS = [
+    f"""
+    CREATE OR REPLACE FUNCTION shorten_embedding(v vector) RETURNS vector({SHORT_DIM}) AS $$
+        SELECT (array_agg(x / NULLIF(norm, 0) ORDER BY i))::vector({SHORT_DIM})
+        FROM unnest(((v::real[])[1:{SHORT_DIM}])::float8[]) WITH ORDINALITY AS u(x, i),
+             (SELECT sqrt(sum(y * y)) AS norm
+              FROM unnest(((v::real[])[1:{SHORT_DIM}])::float8[]) AS y) AS n
+    $$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION fill_embedding_short() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.embedding IS NULL THEN
+            NEW.embedding_short := NULL;
+        ELSIF TG_OP = 'INSERT' AND NEW.embedding_short IS NULL
+           OR TG_OP = 'UPDATE' AND NEW.embedding IS DISTINCT FROM OLD.embedding
+                               AND NEW.embedding_short IS NOT DISTINCT FROM OLD.embedding_short THEN
+            NEW.embedding_short := shorten_embedding(NEW.embedding);
+        END IF;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+]
+for _table in TABLES:
+    STATEMENTS += [
+        f"ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS embedding_short vector({SHORT_DIM})",
+        f"DROP TRIGGER IF EXISTS {_table}_fill_embedding_short ON {_table}",
+        f"""
+        CREATE TRIGGER {_table}_fill_embedding_short
+        BEFORE INSERT OR UPDATE OF embedding, embedding_short ON {_table}
+        FOR EACH ROW EXECUTE FUNCTION fill_embedding_short()
+        """,
+    ]
+
+
+def backfill(conn) -> None:
+    with conn.cursor() as cur:
+        for table in TABLES:
+            cur.execute(f"SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), -1) FROM {table}")
+            low, high = cur.fetchone()
+            for start in range(low, high + 1, BACKFILL_BATCH_SIZE):
+                cur.execute(
+                    f"""
+                    UPDATE {table} SET embedding_short = shorten_embedding(embedding)
+                    WHERE id >= %s AND id < %s AND embedding IS NOT NULL AND embedding_short IS NULL
+                    """,
+                    (start, start + BACKFILL_BATCH_SIZE),
+                )
+                logging.info(f"  {table}: ids {start}..{start + BACKFILL_BATCH_SIZE - 1} ({cur.rowcount} rows)")
+            cur.execute(
+                f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_embedding_short_hnsw_idx
+                ON {table} USING hnsw (embedding_short vector_cosine_ops)
+                """
+            )
+            cur.execute(f"ANALYZE {table}")
@@ -0,0 +1,49 @@
+"""
+NOTIFY on new articles and chunks for the API's live feed (/feed/stream).
+
+Every insert into articles or article_chunks sends a small JSON payload on the
+`article_events` channel: {"table": ..., "id": ..., "article_id": ...}. Only
+ids are sent (payloads are capped at 8000 bytes); the API loads the rows once
+per worker and fans them out to its subscribers. Notifications are delivered
+on commit, so listeners never see rows from rolled-back transactions.
+
+Doing this in a trigger covers every writer (the bandito consumer's
+insert_article, the embedding pipeline's chunk inserts, the ETL scripts)
+without each of them having to remember to publish.
+"""
+
+DESCRIPTION = "article_events NOTIFY triggers on articles and article_chunks"
+
+STATEMENTS = [
+    """
+    CREATE OR REPLACE FUNCTION notify_article_event() RETURNS trigger AS $$
+    DECLARE
+        parent_id INTEGER;
+    BEGIN
+        -- Separate branches: NEW.article_id only exists on article_chunks.
+        IF TG_TABLE_NAME = 'articles' THEN
+            parent_id := NEW.id;
+        ELSE
+            parent_id := NEW.article_id;
+        END IF;
+        PERFORM pg_notify(
+            'article_events',
+            json_build_object('table', TG_TABLE_NAME, 'id', NEW.id, 'article_id', parent_id)::text
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS articles_notify_article_event ON articles",
+    """
+    CREATE TRIGGER articles_notify_article_event
+    AFTER INSERT ON articles
+    FOR EACH ROW EXECUTE FUNCTION notify_article_event()
+    """,
+    "DROP TRIGGER IF EXISTS article_chunks_notify_article_event ON article_chunks",
+    """
+    CREATE TRIGGER article_chunks_notify_article_event
+    AFTER INSERT ON article_chunks
+    FOR EACH ROW EXECUTE FUNCTION notify_article_event()
+    """,
+]
@@ -0,0 +1,30 @@
+"""
+Unique index on articles.page_url.
+
+article_exists() looked page_url up with a sequential scan, and concurrent
+consumers could both insert the same article between their check and their
+insert. With the unique index the lookup is an index probe, and writers use
+INSERT ... ON CONFLICT (page_url) DO NOTHING, so the database settles races.
+
+Duplicates already in the table are removed first, keeping the oldest row of
+each page_url. Their chunks go with them (article_chunks has no ON DELETE
+CASCADE; the kept row has its own chunks). If a writer inserts a new
+duplicate before the index is built, CREATE UNIQUE INDEX CONCURRENTLY fails
+and leaves an invalid index behind; drop it and run the version again.
+"""
+
+DESCRIPTION = "Remove duplicate articles and add a unique index on articles.page_url"
+
+_DUPLICATE_IDS = """
+    SELECT a.id FROM articles a
+    JOIN articles b ON b.page_url = a.page_url AND b.id < a.id
+"""
+
+STATEMENTS = [
+    f"DELETE FROM article_chunks WHERE article_id IN ({_DUPLICATE_IDS})",
+    f"DELETE FROM articles WHERE id IN ({_DUPLICATE_IDS})",
+    """
+    CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS articles_page_url_key
+    ON articles (page_url)
+    """,
+]
@@ -0,0 +1,35 @@
+"""
+crawl_frontier: the crawl state of every URL the producer has discovered.
+
+States: discovered (seen, not queued yet), queued (published to RabbitMQ),
+fetched (stored, or found already stored), failed (attempts counts the
+failures, last_error the latest) and skipped (not an article, or not an
+allowed domain). The producer only re-publishes failed URLs with attempts
+left and queued URLs whose message has evidently been lost, so a restart
+does not re-enqueue in-flight work.
+
+Stored articles are entered as fetched. The table is also created by the
+bandito services (PGManager.create_frontier_table_if_not_exists).
+"""
+
+DESCRIPTION = "crawl_frontier table of discovered URLs and their crawl state"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS crawl_frontier (
+        url TEXT PRIMARY KEY,
+        state TEXT NOT NULL
+            CHECK (state IN ('discovered', 'queued', 'fetched', 'failed', 'skipped')),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT NULL,
+        discovered_at TIMESTAMP NOT NULL DEFAULT now(),
+        updated_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+    """,
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS crawl_frontier_state_idx ON crawl_frontier (state)",
+    """
+    INSERT INTO crawl_frontier (url, state)
+    SELECT page_url, 'fetched' FROM articles WHERE page_url IS NOT NULL
+    ON CONFLICT (url) DO NOTHING
+    """,
+]
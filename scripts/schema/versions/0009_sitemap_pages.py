@@ -0,0 +1,26 @@
+"""
+sitemap_pages: per-page state for incremental sitemap crawling.
+
+The producer stores each sitemap page's ETag and Last-Modified (sent back as
+If-None-Match / If-Modified-Since) and a hash of the page's extracted link
+set. A 304, or a 200 whose link set hashes the same, means the page has
+nothing new, and its links are not looked at again. The table is also
+created by the producer on startup
+(PGManager.create_sitemap_table_if_not_exists).
+"""
+
+DESCRIPTION = "sitemap_pages table of sitemap page validators and link-set hashes"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS sitemap_pages (
+        url TEXT PRIMARY KEY,
+        etag TEXT NULL,
+        last_modified TEXT NULL,
+        links_hash TEXT NULL,
+        link_count INTEGER NOT NULL DEFAULT 0,
+        fetched_at TIMESTAMP NOT NULL DEFAULT now(),
+        changed_at TIMESTAMP NOT NULL DEFAULT now()
+    )
+    """,
+]
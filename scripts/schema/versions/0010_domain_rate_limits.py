@@ -0,0 +1,27 @@
+"""
+domain_rate_limits: the per-domain request rate shared by every producer and
+consumer process.
+
+Each row is a token bucket in its GCRA form: `next_slot` is the time the
+domain's next request is due, moved forward by 1/rate for every request any
+process sends. `rate` adapts to the site (additive increase while responses
+are fast, multiplicative decrease on 429s, 5xx and timeouts) and
+`blocked_until` holds requests back for a Retry-After. The table is also
+created by the crawlers on startup
+(PGManager.create_rate_limit_table_if_not_exists).
+"""
+
+DESCRIPTION = "domain_rate_limits table of shared, adaptive per-domain request rates"
+
+STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS domain_rate_limits (
+        domain TEXT PRIMARY KEY,
+        rate DOUBLE PRECISION NOT NULL CHECK (rate > 0),
+        next_slot TIMESTAMPTZ NOT NULL DEFAULT now(),
+        blocked_until TIMESTAMPTZ NULL,
+        adjusted_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        decreased_at TIMESTAMPTZ NOT NULL DEFAULT '-infinity'
+    )
+    """,
+]
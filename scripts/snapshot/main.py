@@ -0,0 +1,377 @@
+"""
+main.py
+-------
+Columnar snapshots of `articles` and `article_chunks`, including embeddings,
+for rebuilding dev/analytics environments without re-embedding or pg_dump.
+
+Export writes one file per table per publish month:
+
+    <out>/articles/month=2025-01/part-0.arrow
+    <out>/article_chunks/month=2025-01/part-0.arrow
+    <out>/<table>/month=unknown/...      (rows without publish_datetime)
+    <out>/manifest.json                  (format, dimensions, row counts)
+
+Embeddings are stored as fixed-size lists of float32 (1536 per row), so
+readers get a contiguous (rows x 1536) matrix without parsing text.
+
+  - `--format arrow` (default) writes uncompressed Arrow IPC files. They can be
+    memory-mapped, so opening millions of vectors costs no reads or copies up
+    front:
+
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        vectors = table["embedding"].combine_chunks().values.to_numpy().reshape(-1, 1536)
+
+  - `--format parquet` writes zstd-compressed Parquet, for archiving or for
+    tools that expect it. The text columns compress well, the embeddings
+    hardly at all, and the files have to be decoded on read.
+
+Import bulk-loads a snapshot back with binary COPY into a temporary staging
+table, then runs INSERT ... ON CONFLICT (id) DO NOTHING. Re-running an import
+is safe, ids are preserved, and the id sequences are advanced past them.
+Articles are loaded before chunks. The insert triggers still run, so
+denormalized chunk attributes, embedding_short and the neighbor queue are
+filled in as they would be for new rows.
+
+Chunks are partitioned by their denormalized publish_datetime (schema
+version 0002). The import updates every HNSW index row by row, so a large
+import can take a while. It is faster to import before the ANN indexes are
+built (schema version 0001) and build them once afterwards.
+
+Usage:
+    python main.py export --out ./snapshot
+    python main.py export --out ./snapshot --format parquet --table articles
+    python main.py import --src ./snapshot
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import struct
+import time
+from datetime import datetime
+
+import numpy as np
+import psycopg2
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+DB_HOST = os.getenv('POSTGRES_HOST', 'localhost')
+DB_PORT = os.getenv('POSTGRES_PORT', '5432')
+DB_NAME = os.getenv('POSTGRES_DB')
+DB_USER = os.getenv('POSTGRES_USER')
+DB_PASSWORD = os.getenv('POSTGRES_PASSWORD')
+
+EMBEDDING_DIM = 1536
+
+# Columns in snapshot order, with their kind. Derived columns (the chunk
+# attributes copied from articles, embedding_short) are left out and
+# recomputed by the triggers on import.
+TABLES = {
+    "articles": [
+        ("id", "int"),
+        ("display_datetime", "timestamp"),
+        ("last_modified_datetime", "timestamp"),
+        ("publish_datetime", "timestamp"),
+        ("create_datetime", "timestamp"),
+        ("content_vertical", "text"),
+        ("og_description", "text"),
+        ("content_type", "text"),
+        ("page_url", "text"),
+        ("og_title", "text"),
+        ("content_title", "text"),
+        ("og_site_name", "text"),
+        ("tags", "text"),
+        ("authors", "text"),
+        ("content_tier", "text"),
+        ("article_s3_url", "text"),
+        ("embedding", "vector"),
+    ],
+    "article_chunks": [
+        ("id", "int"),
+        ("article_id", "int"),
+        ("chunk_text", "text"),
+        ("token_size", "int"),
+        ("embedding", "vector"),
+    ],
+}
+
+ARROW_TYPES = {
+    "int": pa.int32(),
+    "timestamp": pa.timestamp("us"),
+    "text": pa.string(),
+    "vector": pa.list_(pa.float32(), EMBEDDING_DIM),
+}
+
+EXTENSIONS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+# Microseconds between the Unix epoch and PostgreSQL's (2000-01-01)
+PG_EPOCH_US = 946_684_800_000_000
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+COPY_TRAILER = struct.pack(">h", -1)
+NULL_FIELD = struct.pack(">i", -1)
+
+
+def get_db_connection():
+    return psycopg2.connect(host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+
+
+def table_schema(table: str) -> pa.Schema:
+    return pa.schema([(name, ARROW_TYPES[kind]) for name, kind in TABLES[table]])
+
+
+# ------------------------------------------------------------------------------
+# Export
+# ------------------------------------------------------------------------------
+def parse_vectors(values: list) -> pa.FixedSizeListArray:
+    """
+    Converts vector_send() output (pgvector's binary format: int16 dimensions,
+    int16 unused, big-endian float4 values; or None) into a fixed-size float32
+    list array. Selecting the binary form avoids parsing vector text, which
+    is several times slower.
+    """
+    flat = np.zeros((len(values), EMBEDDING_DIM), dtype=np.float32)
+    present = [i for i, v in enumerate(values) if v is not None]
+    if present:
+        raw = b"".join(bytes(values[i])[4:] for i in present)
+        flat[present] = np.frombuffer(raw, dtype=">f4").reshape(len(present), EMBEDDING_DIM)
+    nulls = pa.array([v is None for v in values]) if len(present) < len(values) else None
+    return pa.FixedSizeListArray.from_arrays(pa.array(flat.reshape(-1)), EMBEDDING_DIM, mask=nulls)
+
+
+def to_record_batch(table: str, rows: list) -> pa.RecordBatch:
+    columns = list(zip(*rows))
+    arrays = []
+    for (name, kind), values in zip(TABLES[table], columns):
+        if kind == "vector":
+            arrays.append(parse_vectors(list(values)))
+        else:
+            arrays.append(pa.array(values, type=ARROW_TYPES[kind]))
+    return pa.RecordBatch.from_arrays(arrays, schema=table_schema(table))
+
+
+class PartitionWriter:
+    """Appends record batches to one Arrow IPC or Parquet file."""
+
+    def __init__(self, path: str, schema: pa.Schema, fmt: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if fmt == "arrow":
+            self.sink = pa.OSFile(path, "wb")
+            self.writer = pa.ipc.new_file(self.sink, schema)
+        else:
+            self.sink = None
+            self.writer = pq.ParquetWriter(path, schema, compression="zstd")
+        self.fmt = fmt
+
+    def write(self, batch: pa.RecordBatch) -> None:
+        if self.fmt == "arrow":
+            self.writer.write_batch(batch)
+        else:
+            self.writer.write_table(pa.Table.from_batches([batch]))
+
+    def close(self) -> None:
+        self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+
+
+def list_months(conn, table: str) -> list:
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT DISTINCT date_trunc('month', publish_datetime) FROM {table} ORDER BY 1 NULLS LAST"
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def export_table(conn, table: str, out_dir: str, fmt: str, batch_size: int) -> dict:
+    """
+    Writes one file per publish month. Each month is read with a server-side
+    cursor in batches, so memory stays bounded by `batch_size`.
+    """
+    select_list = ", ".join(
+        f"vector_send({name})" if kind == "vector" else name for name, kind in TABLES[table]
+    )
+    counts = {}
+    for month in list_months(conn, table):
+        label = month.strftime("%Y-%m") if month else "unknown"
+        path = os.path.join(out_dir, table, f"month={label}", f"part-0{EXTENSIONS[fmt]}")
+        writer = PartitionWriter(path, table_schema(table), fmt)
+        rows_written = 0
+        try:
+            with conn.cursor(name=f"snapshot_{table}") as cur:
+                cur.itersize = batch_size
+                if month is None:
+                    cur.execute(f"SELECT {select_list} FROM {table} WHERE publish_datetime IS NULL ORDER BY id")
+                else:
+                    cur.execute(
+                        f"""
+                        SELECT {select_list} FROM {table}
+                        WHERE publish_datetime >= %(month)s
+                          AND publish_datetime < %(month)s + interval '1 month'
+                        ORDER BY id
+                        """,
+                        {"month": month},
+                    )
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    writer.write(to_record_batch(table, rows))
+                    rows_written += len(rows)
+        finally:
+            writer.close()
+        conn.commit()
+        counts[os.path.relpath(path, out_dir)] = rows_written
+        logging.info(f"{table} {label}: {rows_written} rows")
+    return counts
+
+
+# ------------------------------------------------------------------------------
+# Import
+# ------------------------------------------------------------------------------
+def encode_column(array: pa.Array, kind: str) -> list:
+    """
+    Encodes one column of a record batch as binary COPY fields (length prefix
+    plus value, or the NULL marker), one per row.
+    """
+    if kind == "vector":
+        valid = array.is_valid().to_numpy(zero_copy_only=False)
+        values = array.values.slice(array.offset * EMBEDDING_DIM, len(array) * EMBEDDING_DIM)
+        # pgvector's binary format: int16 dimensions, int16 unused, float4[] (big-endian)
+        matrix = values.to_numpy(zero_copy_only=False).reshape(-1, EMBEDDING_DIM).astype(">f4")
+        header = struct.pack(">ihh", 4 + 4 * EMBEDDING_DIM, EMBEDDING_DIM, 0)
+        return [header + matrix[i].tobytes() if valid[i] else NULL_FIELD for i in range(len(array))]
+    if kind == "timestamp":
+        return [
+            NULL_FIELD if v is None else struct.pack(">iq", 8, v - PG_EPOCH_US)
+            for v in array.cast(pa.int64()).to_pylist()
+        ]
+    if kind == "int":
+        return [NULL_FIELD if v is None else struct.pack(">ii", 4, v) for v in array.to_pylist()]
+    fields = []
+    for v in array.to_pylist():
+        if v is None:
+            fields.append(NULL_FIELD)
+        else:
+            data = v.encode("utf-8")
+            fields.append(struct.pack(">i", len(data)) + data)
+    return fields
+
+
+def encode_copy(table: str, batch: pa.RecordBatch) -> io.BytesIO:
+    columns = [encode_column(batch.column(name), kind) for name, kind in TABLES[table]]
+    tuple_header = struct.pack(">h", len(columns))
+    buffer = io.BytesIO()
+    buffer.write(COPY_HEADER)
+    for fields in zip(*columns):
+        buffer.write(tuple_header)
+        buffer.write(b"".join(fields))
+    buffer.write(COPY_TRAILER)
+    buffer.seek(0)
+    return buffer
+
+
+def read_batches(path: str, batch_size: int):
+    if path.endswith(EXTENSIONS["parquet"]):
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_size)
+        return
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+
+
+def partition_files(src_dir: str, table: str) -> list:
+    root = os.path.join(src_dir, table)
+    if not os.path.isdir(root):
+        return []
+    files = []
+    for partition in sorted(os.listdir(root)):
+        for name in sorted(os.listdir(os.path.join(root, partition))):
+            if name.endswith(tuple(EXTENSIONS.values())):
+                files.append(os.path.join(root, partition, name))
+    return files
+
+
+def import_table(conn, table: str, src_dir: str, batch_size: int) -> int:
+    """
+    Loads every partition file of `table`, committing after each file.
+    Returns the number of rows inserted (rows whose id already exists are
+    skipped).
+    """
+    columns = ", ".join(name for name, _ in TABLES[table])
+    stage = f"snapshot_stage_{table}"
+    inserted = 0
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {stage} (LIKE {table} INCLUDING DEFAULTS)")
+        for path in partition_files(src_dir, table):
+            file_rows = 0
+            for batch in read_batches(path, batch_size):
+                cur.copy_expert(f"COPY {stage} ({columns}) FROM STDIN WITH (FORMAT binary)", encode_copy(table, batch))
+                file_rows += batch.num_rows
+            cur.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {stage} ORDER BY id ON CONFLICT (id) DO NOTHING"
+            )
+            inserted += cur.rowcount
+            logging.info(f"{table}: {os.path.relpath(path, src_dir)} -> {cur.rowcount} of {file_rows} rows inserted")
+            cur.execute(f"TRUNCATE {stage}")
+            conn.commit()
+        cur.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), GREATEST((SELECT max(id) FROM {table}), 1))"
+        )
+    conn.commit()
+    return inserted
+
+
+# ------------------------------------------------------------------------------
+# Main
+# ------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Export/import columnar snapshots of articles and chunks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write a snapshot")
+    export_parser.add_argument("--out", required=True, help="Snapshot directory")
+    export_parser.add_argument("--format", choices=sorted(EXTENSIONS), default="arrow")
+    import_parser = subparsers.add_parser("import", help="Bulk-load a snapshot")
+    import_parser.add_argument("--src", required=True, help="Snapshot directory")
+    for sub in (export_parser, import_parser):
+        sub.add_argument("--table", choices=list(TABLES), action="append", help="Limit to a table (repeatable)")
+        sub.add_argument("--batch-size", type=int, default=5000, help="Rows per cursor fetch / COPY batch")
+    args = parser.parse_args()
+
+    # Dict order: articles before article_chunks (foreign key)
+    tables = [t for t in TABLES if not args.table or t in args.table]
+    conn = get_db_connection()
+    try:
+        started = time.perf_counter()
+        if args.command == "export":
+            manifest = {
+                "created_at": datetime.utcnow().isoformat(),
+                "format": args.format,
+                "embedding_dim": EMBEDDING_DIM,
+                "tables": {},
+            }
+            for table in tables:
+                manifest["tables"][table] = export_table(conn, table, args.out, args.format, args.batch_size)
+            with open(os.path.join(args.out, "manifest.json"), "w") as f:
+                json.dump(manifest, f, indent=2)
+            total = sum(sum(counts.values()) for counts in manifest["tables"].values())
+            logging.info(f"Exported {total} rows to {args.out} in {time.perf_counter() - started:.1f}s")
+        else:
+            for table in tables:
+                inserted = import_table(conn, table, args.src, args.batch_size)
+                logging.info(f"{table}: {inserted} rows inserted")
+            logging.info(f"Import finished in {time.perf_counter() - started:.1f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()